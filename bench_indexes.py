@@ -0,0 +1,154 @@
+"""Query-plan benchmark for the query-path index pack (schema migration 5).
+
+Seeds a scratch database with the synthetic dataset generator, then runs the
+lookups behind the busiest pages twice: with the pack's indexes dropped
+and after creating them. Prints each query's plan and best-of-N timing
+side by side.
+
+    python bench_indexes.py                  # scratch SQLite file, small scale
+    python bench_indexes.py --scale large
+    BENCH_DATABASE_URL=postgresql://... python bench_indexes.py
+
+The target database must be empty; it is seeded and its indexes dropped.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+parser.add_argument('--scale', choices=('demo', 'small', 'large'), default='small')
+parser.add_argument('--repeat', type=int, default=5, help='Timing runs per query (best is reported).')
+parser.add_argument('--plans', action='store_true', help='Print the full query plans.')
+args = parser.parse_args()
+
+scratch = None
+if not os.environ.get('BENCH_DATABASE_URL'):
+    scratch = os.path.join(tempfile.gettempdir(), 'bench_indexes.db')
+    if os.path.exists(scratch):
+        os.remove(scratch)
+os.environ['FLASK_ENV'] = 'development'
+os.environ['DATABASE_URL'] = os.environ.get('BENCH_DATABASE_URL') or f'sqlite:///{scratch}'
+
+from project import app, db
+from project.datagen import SCALES, generate_dataset
+from project.schema import query_path_indexes
+from sqlalchemy import text
+
+# The lookups behind the busiest pages, with a representative key for each
+def queries(rng):
+    volumes = SCALES[args.scale]
+    student = rng.randint(1, volumes['students'])
+    course = rng.randint(1, volumes['courses'])
+    faculty = rng.randint(1, volumes['faculty'])
+    today = date.today()
+    now = datetime.utcnow()
+    return [
+        ('student attendance history',
+         'SELECT a.status, s.session_date FROM attendance a JOIN course_session s ON s.id = a.session_id '
+         'WHERE a.student_id = :v ORDER BY s.session_date DESC', {'v': student}),
+        ('student transcript',
+         'SELECT * FROM grade WHERE student_id = :v ORDER BY course_id', {'v': student}),
+        ('exam gradebook',
+         'SELECT * FROM grade WHERE exam_id = :v ORDER BY student_id', {'v': course * 2}),
+        ('course grades by exam',
+         'SELECT * FROM grade WHERE course_id = :v ORDER BY exam_id', {'v': course}),
+        ('week timetable',
+         'SELECT * FROM course_session WHERE session_date BETWEEN :a AND :b',
+         {'a': today - timedelta(days=7), 'b': today}),
+        ('faculty courses', 'SELECT * FROM course WHERE faculty_id = :v', {'v': faculty}),
+        ('department courses', 'SELECT * FROM course WHERE department_id = :v', {'v': 3}),
+        ('course roster',
+         'SELECT st.* FROM enrollments e JOIN student st ON st.id = e.student_id WHERE e.course_id = :v',
+         {'v': course}),
+        ('course exams', 'SELECT * FROM exam WHERE course_id = :v ORDER BY exam_date', {'v': course}),
+        ('fee statement',
+         'SELECT * FROM fee_payment WHERE student_id = :v ORDER BY paid_at DESC', {'v': student}),
+        ('recent payments', 'SELECT * FROM fee_payment ORDER BY paid_at DESC LIMIT 50', {}),
+        ('student invoices',
+         'SELECT * FROM invoice WHERE student_id = :v ORDER BY issued_at DESC', {'v': student}),
+        ('my notifications',
+         'SELECT * FROM notification WHERE recipient_id = :v ORDER BY created_at DESC LIMIT 20',
+         {'v': f'student{student}@school.edu'}),
+        ('admin notifications', 'SELECT * FROM notification ORDER BY created_at DESC LIMIT 50', {}),
+        ('audit log', 'SELECT * FROM audit_log ORDER BY created_at DESC LIMIT 50', {}),
+        ('audit log by action',
+         'SELECT * FROM audit_log WHERE action = :v ORDER BY created_at DESC LIMIT 50', {'v': 'record_payment'}),
+        ('audit log by actor',
+         'SELECT * FROM audit_log WHERE actor_username = :v ORDER BY created_at DESC LIMIT 50', {'v': f'faculty{faculty}@school.edu'}),
+        ('upcoming bookings',
+         'SELECT * FROM resource_booking WHERE start_time >= :v ORDER BY start_time LIMIT 50', {'v': now}),
+        ('active bookings', 'SELECT * FROM resource_booking WHERE end_time >= :v AND start_time <= :v',
+         {'v': now}),
+        ('active notices', 'SELECT * FROM notice WHERE expires_at IS NULL OR expires_at > :v', {'v': now}),
+        ('faculty leaves',
+         'SELECT * FROM faculty_leave WHERE faculty_id = :v ORDER BY start_date DESC', {'v': faculty}),
+    ]
+
+def explain(conn, sql, params):
+    if conn.dialect.name == 'sqlite':
+        rows = conn.execute(text('EXPLAIN QUERY PLAN ' + sql), params)
+        return [str(r[-1]) for r in rows]
+    return [str(r[0]) for r in conn.execute(text('EXPLAIN ' + sql), params)]
+
+def measure(conn, cases):
+    results = []
+    for name, sql, params in cases:
+        best = None
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            conn.execute(text(sql), params).fetchall()
+            elapsed = time.perf_counter() - t0
+            best = elapsed if best is None else min(best, elapsed)
+        results.append((name, explain(conn, sql, params), best))
+    return results
+
+def summary(plan):
+    # One-line gist of the plan: the index (or scan) chosen for each table
+    return '; '.join(line.strip() for line in plan)[:70]
+
+def main():
+    rng = random.Random(42)
+    with app.app_context():
+        if db.session.execute(text('SELECT COUNT(*) FROM student')).scalar():
+            sys.exit('Refusing to seed a non-empty database; point BENCH_DATABASE_URL at a scratch database.')
+        indexes = query_path_indexes()
+        with db.engine.begin() as conn:
+            for index in indexes:
+                index.drop(conn, checkfirst=True)
+        print(f'Seeding the {args.scale} dataset...')
+        t0 = time.perf_counter()
+        counts = generate_dataset(args.scale)
+        print(f'Seeded {sum(counts.values()):,} rows in {time.perf_counter() - t0:.1f}s.')
+        cases = queries(rng)
+        with db.engine.connect() as conn:
+            if conn.dialect.name == 'sqlite':
+                conn.execute(text('ANALYZE'))
+            before = measure(conn, cases)
+        t0 = time.perf_counter()
+        with db.engine.begin() as conn:
+            for index in indexes:
+                index.create(conn, checkfirst=True)
+            conn.execute(text('ANALYZE'))
+        print(f'Created {len(indexes)} indexes in {time.perf_counter() - t0:.1f}s.\n')
+        # Fresh connections, so no statement prepared against the old schema is reused
+        db.engine.dispose()
+        with db.engine.connect() as conn:
+            after = measure(conn, cases)
+        db.engine.dispose()
+
+    print(f"{'query':28} {'before ms':>10} {'after ms':>10} {'speedup':>8}  plan after")
+    for (name, plan_before, t_before), (_, plan_after, t_after) in zip(before, after):
+        speedup = t_before / t_after if t_after else float('inf')
+        print(f'{name:28} {t_before * 1000:10.2f} {t_after * 1000:10.2f} {speedup:7.1f}x  {summary(plan_after)}')
+        if args.plans:
+            print('    before: ' + '\n            '.join(plan_before))
+            print('    after:  ' + '\n            '.join(plan_after))
+    if scratch:
+        os.remove(scratch)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""Route benchmark: latency and statement counts for the hot pages.
+
+Runs the cases in project/benchmark.py through the Flask test client
+against a generated dataset, writes the results as JSON and checks them
+against a budget file.
+
+    python bench_routes.py                          # fresh scratch SQLite file, large scale
+    python bench_routes.py --scale small --output before.json
+    python bench_routes.py --compare before.json    # side by side with an earlier run
+    python bench_routes.py --update-budgets         # re-pin bench_budgets.json to this run
+    BENCH_DATABASE_URL=postgresql://... python bench_routes.py
+
+An empty target database is seeded at --scale first; a populated one is
+benchmarked as is (pass the --scale it was generated with). The mutating
+cases (timetable generation, attendance, imports) add rows to it.
+Exits non-zero when a request fails or a route is over budget.
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+parser.add_argument('--scale', choices=('demo', 'small', 'large'), default='large')
+parser.add_argument('--repeat', type=int, default=5, help='Timed calls per route (the median is compared).')
+parser.add_argument('--warmup', type=int, default=1, help='Untimed calls per route first.')
+parser.add_argument('--import-rows', type=int, default=200, help='CSV rows per import call.')
+parser.add_argument('--only', action='append', help='Run only this case (repeatable).')
+parser.add_argument('--output', help='Results file (default: bench_results/<commit>-<scale>.json).')
+parser.add_argument('--compare', help='Earlier results file to print side by side.')
+parser.add_argument('--budgets', default='bench_budgets.json', help='Budget file to check against.')
+parser.add_argument('--update-budgets', action='store_true', help='Write this run to the budget file instead.')
+args = parser.parse_args()
+
+scratch = None
+if not os.environ.get('BENCH_DATABASE_URL'):
+    scratch = os.path.join(tempfile.gettempdir(), 'bench_routes.db')
+    if os.path.exists(scratch):
+        os.remove(scratch)
+os.environ['FLASK_ENV'] = 'development'
+os.environ['DATABASE_URL'] = os.environ.get('BENCH_DATABASE_URL') or f'sqlite:///{scratch}'
+
+from project import app, db, benchmark
+from project.datagen import generate_dataset
+from project.models import Student
+
+# Jobs run inside the request so import timings cover the import; no debug panel or slow log in the way,
+# and no cached dashboard aggregates so every call measures the queries behind the page
+app.config.update(JOBS_RUN_INLINE=True, QUERY_DEBUG_PANEL=False, SLOW_REQUEST_MS=0, SLOW_QUERY_MS=0,
+                  DASHBOARD_METRICS_TTL=0)
+# Statement counts are in the results; per-request N+1 warnings would only bury them
+logging.getLogger('project.query_stats').setLevel(logging.ERROR)
+
+def main():
+    with app.app_context():
+        db.create_all()
+        if not db.session.query(Student.id).first():
+            print(f'Seeding the {args.scale} dataset...')
+            t0 = time.perf_counter()
+            counts = generate_dataset(args.scale)
+            print(f'Seeded {sum(counts.values()):,} rows in {time.perf_counter() - t0:.1f}s.')
+        cases = benchmark.default_cases(import_rows=args.import_rows)
+        if args.only:
+            cases = [c for c in cases if c.name in args.only]
+        print(f"{'route':28} {'code':>4} {'queries':>8} {'median':>13}")
+        document = benchmark.run_benchmarks(cases, repeat=args.repeat, warmup=args.warmup, scale=args.scale,
+                                            echo=print)
+        db.engine.dispose()
+    if scratch:
+        os.remove(scratch)
+
+    output = args.output or os.path.join(
+        'bench_results', f"{(document['commit'] or 'nocommit')[:10]}-{args.scale}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    benchmark.dump(document, output)
+    print(f'\nResults written to {output}.')
+    if args.compare:
+        print('\n' + '\n'.join(benchmark.compare(benchmark.load(args.compare), document)))
+
+    failures = [f'{name}: request failed' for name in benchmark.failed_requests(document)]
+    if args.update_budgets:
+        budgets = benchmark.budgets_from(document)
+        if args.only and os.path.exists(args.budgets):
+            # Re-pin just the routes that ran
+            budgets['routes'] = dict(benchmark.load(args.budgets)['routes'], **budgets['routes'])
+        benchmark.dump(budgets, args.budgets)
+        print(f'Budgets written to {args.budgets}.')
+    elif os.path.exists(args.budgets):
+        budgets = benchmark.load(args.budgets)
+        if budgets.get('scale') != args.scale:
+            print(f"Budgets in {args.budgets} are for the {budgets.get('scale')} scale; not checked.")
+        else:
+            failures += benchmark.check_budgets(document, budgets)
+    if failures:
+        print('\nFailed:\n  ' + '\n  '.join(failures))
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
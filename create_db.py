@@ -1,10 +1,11 @@
 from project import app, db
 from project.models import User
+from project.schema import upgrade_schema
 from werkzeug.security import generate_password_hash
 import os
 
 with app.app_context():
-    db.create_all()
+    upgrade_schema()
     admin_user = os.environ.get('ADMIN_USERNAME')
     admin_pw_hash = os.environ.get('ADMIN_PASSWORD_HASH')
     admin_pw_plain = os.environ.get('ADMIN_PASSWORD')
@@ -0,0 +1,14 @@
+# gunicorn --config gunicorn.conf.py run:app
+#
+# For /metrics to aggregate across workers, export PROMETHEUS_MULTIPROC_DIR
+# pointing at an empty directory before starting gunicorn (clear it on each
+# deploy).
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("GUNICORN_WORKERS", 4))
+
+def child_exit(server, worker):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -25,13 +25,15 @@ elif env == "testing":
 
 db = SQLAlchemy(app)
 
-# Ensure database tables are created
-try:
-    from project import models
-    with app.app_context():
-        db.create_all()
-except Exception as e:
-    print(f"Error creating database tables: {e}")
+# Verify the database schema once at startup (creating or upgrading it when allowed)
+from project import models
+from project.schema import bootstrap_schema
+bootstrap_schema(app)
+
+# Count SQL statements per request and flag repeated ones (N+1)
+from project import query_stats
+from project import telemetry
+from project import slow_log
 
 # Configure session lifetime
 timeout_minutes = app.config.get('SESSION_TIMEOUT_MINUTES', 120)
@@ -65,7 +67,6 @@ except Exception:
 try:
     from project.models import User
     with app.app_context():
-        # db.create_all()  # Already called above
         admin_user = os.environ.get("ADMIN_USERNAME")
         admin_pw_hash = os.environ.get("ADMIN_PASSWORD_HASH")
         admin_pw_plain = os.environ.get("ADMIN_PASSWORD")
@@ -94,4 +95,5 @@ except Exception:
     pass
 
 from project import routes
+from project import datagen
 
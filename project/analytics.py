@@ -0,0 +1,109 @@
+from project import db
+from project.models import Student, Course, Department, Semester, StudentMetrics
+from sqlalchemy import case, cast, func
+
+def student_gpa_subquery():
+    """One row per graded student: (student_id, gpa), read from the metrics rollup."""
+    return (
+        db.session.query(
+            StudentMetrics.student_id.label('student_id'),
+            (StudentMetrics.gpa_points / StudentMetrics.gpa_credits).label('gpa'),
+        )
+        .filter(StudentMetrics.gpa_credits > 0)
+        .subquery()
+    )
+
+def student_attendance_subquery():
+    """One row per student with attendance: (student_id, total, present_late, rate)."""
+    present_late = StudentMetrics.attendance_present + StudentMetrics.attendance_late
+    return (
+        db.session.query(
+            StudentMetrics.student_id.label('student_id'),
+            StudentMetrics.attendance_total.label('total'),
+            present_late.label('present_late'),
+            (present_late * 100.0 / StudentMetrics.attendance_total).label('rate'),
+        )
+        .filter(StudentMetrics.attendance_total > 0)
+        .subquery()
+    )
+
+def attendance_status_counts():
+    row = db.session.query(
+        func.sum(StudentMetrics.attendance_present),
+        func.sum(StudentMetrics.attendance_absent),
+        func.sum(StudentMetrics.attendance_late),
+        func.sum(StudentMetrics.attendance_excused),
+    ).one()
+    return dict(zip(('present', 'absent', 'late', 'excused'), (n or 0 for n in row)))
+
+# Per-student attendance rate buckets, as (label, lower bound inclusive)
+ATTENDANCE_BANDS = [('90-100%', 90), ('75-89%', 75), ('50-74%', 50), ('Below 50%', 0)]
+
+def attendance_rate_bands(att=None):
+    att = att if att is not None else student_attendance_subquery()
+    band = case(*[(att.c.rate >= lo, label) for label, lo in ATTENDANCE_BANDS[:-1]], else_=ATTENDANCE_BANDS[-1][0])
+    rows = db.session.query(band, func.count()).select_from(att).group_by(band).all()
+    found = dict(rows)
+    return [{'label': label, 'students': found.get(label, 0)} for label, _ in ATTENDANCE_BANDS]
+
+def _breakdown(key_col, label_col, label_join, gpa, att):
+    rows = (
+        db.session.query(
+            key_col,
+            label_col,
+            func.count(Student.id),
+            func.avg(gpa.c.gpa),
+            func.avg(att.c.rate),
+        )
+        .select_from(Student)
+        .outerjoin(label_join[0], label_join[1])
+        .outerjoin(gpa, gpa.c.student_id == Student.id)
+        .outerjoin(att, att.c.student_id == Student.id)
+        .group_by(key_col, label_col)
+        .all()
+    )
+    out = []
+    for key, label, n, avg_gpa, avg_att in rows:
+        out.append({
+            'id': key,
+            'name': label,
+            'students': n,
+            'avg_gpa': float(avg_gpa) if avg_gpa is not None else None,
+            'avg_attendance': float(avg_att) if avg_att is not None else None,
+        })
+    out.sort(key=lambda r: (r['name'] is None, str(r['name'] or '')))
+    return out
+
+def department_breakdown(gpa=None, att=None):
+    gpa = gpa if gpa is not None else student_gpa_subquery()
+    att = att if att is not None else student_attendance_subquery()
+    return _breakdown(Student.department_id, Department.name,
+                      (Department, Department.id == Student.department_id), gpa, att)
+
+def semester_breakdown(gpa=None, att=None):
+    gpa = gpa if gpa is not None else student_gpa_subquery()
+    att = att if att is not None else student_attendance_subquery()
+    label = Semester.academic_year + ' / Sem ' + cast(Semester.number, db.String)
+    return _breakdown(Student.semester_id, label,
+                      (Semester, Semester.id == Student.semester_id), gpa, att)
+
+def compute_analytics():
+    """Institution-wide analytics for the /analytics page.
+
+    Per-student figures come from the student_metrics rollup; everything
+    else is a grouped aggregate. Nothing is loaded per student.
+    """
+    gpa = student_gpa_subquery()
+    att = student_attendance_subquery()
+    avg_gpa = db.session.query(func.avg(gpa.c.gpa)).scalar()
+    avg_attendance = db.session.query(func.avg(att.c.rate)).scalar()
+    return {
+        'total_students': Student.query.count(),
+        'total_courses': Course.query.count(),
+        'avg_gpa': float(avg_gpa) if avg_gpa is not None else None,
+        'avg_attendance': float(avg_attendance) if avg_attendance is not None else None,
+        'attendance_counts': attendance_status_counts(),
+        'attendance_bands': attendance_rate_bands(att),
+        'department_breakdown': department_breakdown(gpa, att),
+        'semester_breakdown': semester_breakdown(gpa, att),
+    }
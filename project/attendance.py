@@ -0,0 +1,280 @@
+from project import app, db
+from project.models import Attendance, Course, CourseSession, Notification, Student, enrollments
+from project.student_metrics import refresh_student_metrics
+from project.telemetry import observe_notifications
+from sqlalchemy import bindparam, func, select
+from datetime import date, datetime, timedelta
+import click
+
+ATTENDANCE_STATUSES = ('present', 'absent', 'late', 'excused')
+UNIQUE_CONSTRAINT = 'uix_attendance_session_student'
+UPDATE_COLUMNS = ('status', 'remarks', 'marked_by', 'marked_at')
+
+def marking_closed(course_session, role, today=None):
+    """True when a non-admin is past ATTENDANCE_MARKING_CUTOFF_DAYS for the session."""
+    if role == 'admin':
+        return False
+    cutoff_days = int(app.config.get('ATTENDANCE_MARKING_CUTOFF_DAYS', 30))
+    today = today or datetime.today().date()
+    return (today - course_session.session_date).days > cutoff_days
+
+def enrolled_student_ids(course_id):
+    return {sid for (sid,) in db.session.execute(
+        select(enrollments.c.student_id).where(enrollments.c.course_id == course_id))}
+
+def _upsert_statement(dialect_name, allow_edit):
+    """INSERT ... ON CONFLICT on the session/student constraint, or None if unsupported."""
+    table = Attendance.__table__
+    if dialect_name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+        conflict = {'constraint': UNIQUE_CONSTRAINT}
+    elif dialect_name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+        conflict = {'index_elements': ['session_id', 'student_id']}
+    else:
+        return None
+    stmt = insert(table)
+    if not allow_edit:
+        return stmt.on_conflict_do_nothing(**conflict)
+    return stmt.on_conflict_do_update(**conflict, set_={c: stmt.excluded[c] for c in UPDATE_COLUMNS})
+
+def save_attendance(session_id, entries, marked_by, allow_edit=None):
+    """Write a session's attendance in bulk (caller commits).
+
+    `entries` maps student_id -> (status, remarks). Existing rows are
+    overwritten only when ATTENDANCE_ALLOW_EDIT is on. Returns
+    (inserted, updated) counts.
+    """
+    if allow_edit is None:
+        allow_edit = bool(app.config.get('ATTENDANCE_ALLOW_EDIT', True))
+    if not entries:
+        return 0, 0
+    table = Attendance.__table__
+    existing = {sid for (sid,) in db.session.execute(
+        select(table.c.student_id).where(table.c.session_id == session_id))}
+    now = datetime.utcnow()
+    rows = [
+        {'session_id': session_id, 'student_id': sid, 'status': status,
+         'remarks': remarks or None, 'marked_by': marked_by, 'marked_at': now}
+        for sid, (status, remarks) in entries.items()
+    ]
+    new_ids = [sid for sid in entries if sid not in existing]
+    changed_ids = [sid for sid in entries if sid in existing] if allow_edit else []
+
+    stmt = _upsert_statement(db.session.get_bind().dialect.name, allow_edit)
+    if stmt is not None:
+        db.session.execute(stmt, rows)
+    else:
+        inserts = [r for r in rows if r['student_id'] not in existing]
+        if inserts:
+            db.session.execute(table.insert(), inserts)
+        if changed_ids:
+            updates = [dict({c: r[c] for c in UPDATE_COLUMNS}, b_session_id=session_id, b_student_id=r['student_id'])
+                       for r in rows if r['student_id'] in existing]
+            db.session.execute(
+                table.update().where(table.c.session_id == bindparam('b_session_id'),
+                                     table.c.student_id == bindparam('b_student_id')),
+                updates)
+    # Core writes bypass the ORM flush listeners that keep StudentMetrics current
+    refresh_student_metrics(new_ids + changed_ids)
+    return len(new_ids), len(changed_ids)
+
+def parse_roster(payload, enrolled_ids):
+    """Validate a kiosk JSON roster into save_attendance() entries.
+
+    Accepts {"records": [{"student_id": 1, "status": "present", "remarks": ""}]}.
+    Returns (entries, errors); errors name the offending record index.
+    """
+    records = payload.get('records') if isinstance(payload, dict) else None
+    if not isinstance(records, list):
+        return {}, ['Expected a JSON object with a "records" list.']
+    entries, errors = {}, []
+    for i, rec in enumerate(records):
+        if not isinstance(rec, dict):
+            errors.append(f'records[{i}]: expected an object.')
+            continue
+        try:
+            sid = int(rec.get('student_id'))
+        except (TypeError, ValueError):
+            errors.append(f'records[{i}]: invalid student_id.')
+            continue
+        status = str(rec.get('status') or '').strip().lower()
+        if status not in ATTENDANCE_STATUSES:
+            errors.append(f'records[{i}]: status must be one of {", ".join(ATTENDANCE_STATUSES)}.')
+            continue
+        if sid not in enrolled_ids:
+            errors.append(f'records[{i}]: student {sid} is not enrolled in this course.')
+            continue
+        if sid in entries:
+            errors.append(f'records[{i}]: duplicate entry for student {sid}.')
+            continue
+        entries[sid] = (status, str(rec.get('remarks') or '').strip()[:200])
+    return entries, errors
+
+# --- Monthly report ---
+
+def month_bounds(year, month):
+    first = date(year, month, 1)
+    last = date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+    return first, last
+
+def monthly_attendance_matrix(courses, year, month):
+    """Student x session attendance for each course in the month.
+
+    Sessions, enrolments and attendance for all the courses are fetched in
+    one query each and pivoted in memory, so a department or semester costs
+    the same three queries as a single course. Returns one
+    {'course', 'sessions', 'rows'} entry per course; each row is
+    {'student', 'attendance', 'attended', 'rate'} with a status or '-' per
+    session.
+    """
+    course_ids = [c.id for c in courses]
+    if not course_ids:
+        return []
+    first, last = month_bounds(year, month)
+    in_month = (CourseSession.course_id.in_(course_ids), CourseSession.session_date >= first,
+                CourseSession.session_date <= last)
+    sessions = {}
+    for s in CourseSession.query.filter(*in_month).order_by(CourseSession.session_date.asc(), CourseSession.id.asc()):
+        sessions.setdefault(s.course_id, []).append(s)
+    roster = {}
+    for course_id, student in (
+        db.session.query(enrollments.c.course_id, Student)
+        .join(Student, Student.id == enrollments.c.student_id)
+        .filter(enrollments.c.course_id.in_(course_ids))
+        .order_by(Student.name.asc(), Student.id.asc())
+    ):
+        roster.setdefault(course_id, []).append(student)
+    marks = {
+        (session_id, student_id): status
+        for session_id, student_id, status in (
+            db.session.query(Attendance.session_id, Attendance.student_id, Attendance.status)
+            .join(CourseSession, CourseSession.id == Attendance.session_id)
+            .filter(*in_month)
+        )
+    }
+    reports = []
+    for course in courses:
+        course_sessions = sessions.get(course.id, [])
+        rows = []
+        for student in roster.get(course.id, []):
+            cells = [marks.get((s.id, student.id), '-') for s in course_sessions]
+            attended = sum(1 for c in cells if c in ('present', 'late'))
+            rows.append({
+                'student': student,
+                'attendance': cells,
+                'attended': attended,
+                'rate': (attended / len(course_sessions) * 100) if course_sessions else 0,
+            })
+        reports.append({'course': course, 'sessions': course_sessions, 'rows': rows})
+    return reports
+
+def monthly_attendance_csv(reports, year, month):
+    """(header, rows) for exporting the reports as CSV, one row per course/student.
+
+    Columns are the days of the month so courses with different session
+    dates share one header: blank means no session that day, '-' means a
+    session without a mark.
+    """
+    days = month_bounds(year, month)[1].day
+    header = (['Course', 'Code', 'Student', 'Email'] + [f'{d:02d}' for d in range(1, days + 1)]
+              + ['Sessions', 'Attended', 'Rate'])
+
+    def rows():
+        for report in reports:
+            course = report['course']
+            day_index = [s.session_date.day for s in report['sessions']]
+            for row in report['rows']:
+                by_day = [''] * days
+                for day, status in zip(day_index, row['attendance']):
+                    by_day[day - 1] = status
+                yield ([course.name, course.code or '', row['student'].name, row['student'].email]
+                       + by_day + [len(day_index), row['attended'], f"{row['rate']:.1f}"])
+
+    return header, rows()
+
+# --- Low-attendance detection ---
+
+def low_attendance(threshold, course_ids=None, department_id=None):
+    """Enrolled students whose attendance rate in a course is below `threshold` percent.
+
+    One statement: per-course session totals and per-student attended
+    counts (present or late) are grouped subqueries joined to enrolments.
+    Scope with `course_ids`, `department_id`, or neither for every course.
+    Returns dicts ordered by course then rate.
+    """
+    totals = select(CourseSession.course_id, func.count(CourseSession.id).label('total')) \
+        .group_by(CourseSession.course_id).subquery()
+    attended = (
+        select(CourseSession.course_id, Attendance.student_id, func.count(Attendance.id).label('attended'))
+        .join(CourseSession, CourseSession.id == Attendance.session_id)
+        .where(Attendance.status.in_(('present', 'late')))
+        .group_by(CourseSession.course_id, Attendance.student_id)
+        .subquery()
+    )
+    n_attended = func.coalesce(attended.c.attended, 0)
+    q = (
+        select(Course.id, Course.name, Student.id, Student.name, Student.email, Student.guardian_email,
+               Student.roll_number, totals.c.total, n_attended)
+        .select_from(enrollments)
+        .join(Course, Course.id == enrollments.c.course_id)
+        .join(Student, Student.id == enrollments.c.student_id)
+        .join(totals, totals.c.course_id == enrollments.c.course_id)
+        .outerjoin(attended, (attended.c.course_id == enrollments.c.course_id)
+                   & (attended.c.student_id == enrollments.c.student_id))
+        .where(n_attended * 100.0 < totals.c.total * threshold)
+        .order_by(Course.name.asc(), Course.id.asc(), (n_attended * 1.0 / totals.c.total).asc(), Student.name.asc())
+    )
+    if course_ids is not None:
+        q = q.where(enrollments.c.course_id.in_(course_ids))
+    if department_id is not None:
+        q = q.where(Course.department_id == department_id)
+    return [
+        {'course_id': cid, 'course_name': cname, 'student_id': sid, 'student_name': sname,
+         'email': email, 'guardian_email': guardian, 'roll_number': roll,
+         'total': total, 'attended': n, 'rate': n / total * 100}
+        for cid, cname, sid, sname, email, guardian, roll, total, n in db.session.execute(q)
+    ]
+
+def queue_low_attendance_notifications(alerts, threshold):
+    """Queue student and guardian notifications for `alerts` with one bulk insert (caller commits)."""
+    now = datetime.utcnow()
+    rows = []
+    for a in alerts:
+        if a['guardian_email']:
+            rows.append({
+                'recipient_type': 'parent',
+                'recipient_id': a['guardian_email'],
+                'title': f"Low Attendance Alert: {a['student_name']}",
+                'message': (f"Dear Parent, your ward {a['student_name']}'s attendance in {a['course_name']} is "
+                            f"{a['rate']:.1f}%, which is below the required threshold of {threshold}%."),
+                'read': False,
+                'created_at': now,
+            })
+        rows.append({
+            'recipient_type': 'student',
+            'recipient_id': a['email'],
+            'title': f"Low Attendance Alert: {a['course_name']}",
+            'message': (f"Your attendance in {a['course_name']} is {a['rate']:.1f}%, "
+                        f"which is below the required threshold of {threshold}%."),
+            'read': False,
+            'created_at': now,
+        })
+    if rows:
+        db.session.execute(Notification.__table__.insert(), rows)
+        observe_notifications((r['recipient_type'] for r in rows), 'low_attendance')
+    return len(rows)
+
+@app.cli.command('notify-low-attendance')
+@click.option('--threshold', default=75.0, show_default=True, help='Alert below this attendance percentage.')
+@click.option('--department', 'department_id', type=int, default=None, help='Limit to one department id.')
+@click.option('--dry-run', is_flag=True, help='Only report how many students are below the threshold.')
+def notify_low_attendance_command(threshold, department_id, dry_run):
+    """Queue low-attendance notifications for every course (or one department)."""
+    alerts = low_attendance(threshold, department_id=department_id)
+    if dry_run:
+        click.echo(f'{len(alerts)} enrolments below {threshold}%.')
+        return
+    created = queue_low_attendance_notifications(alerts, threshold)
+    db.session.commit()
+    click.echo(f'{len(alerts)} enrolments below {threshold}%; queued {created} notifications.')
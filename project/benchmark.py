@@ -0,0 +1,232 @@
+"""Route benchmark: latency and statement counts for the hot pages.
+
+Each case is one request issued through the Flask test client against the
+current database (normally one filled by the dataset generator). Every
+call is timed and its statements counted with capture_queries(); the
+median, min and max latency and the statement count are kept per case.
+
+Results are plain JSON, so runs from different commits can be compared
+with compare(), and check_budgets() turns a route that got slower or
+chattier than its budget (beyond the budget file's tolerance) into a
+failure. bench_routes.py drives all of this from the command line.
+"""
+from project import app, db
+from project.models import Course, CourseSession, Department, Faculty, ParentStudentLink, Student, enrollments
+from project.query_stats import capture_queries
+from sqlalchemy import func, select
+from datetime import date, datetime, timedelta
+from io import BytesIO
+import json
+import platform
+import statistics
+import subprocess
+import time
+
+class Case:
+    """One benchmarked request, made as `user` with `role`.
+
+    `data` builds the form for the i-th call (mutating cases need fresh rows
+    on every call); `files` names the form field holding CSV text to upload.
+    """
+
+    def __init__(self, name, role, user, path, method='GET', data=None, files=None):
+        self.name = name
+        self.role = role
+        self.user = user
+        self.path = path
+        self.method = method
+        self.data = data
+        self.files = files
+
+    def request_kwargs(self, i):
+        if self.data is None:
+            return {}
+        form = self.data(i)
+        if self.files:
+            form[self.files] = (BytesIO(form[self.files].encode('utf-8')), 'bench.csv')
+            return {'data': form, 'content_type': 'multipart/form-data'}
+        return {'data': form}
+
+def _csv(header, rows):
+    return '\n'.join([','.join(header)] + [','.join(map(str, r)) for r in rows]) + '\n'
+
+def default_cases(import_rows=200):
+    """The hot routes, keyed on representative rows of the current database."""
+    today = date.today()
+    monday = today - timedelta(days=today.weekday())
+    faculty = db.session.execute(
+        select(Faculty.email).join(Course, Course.faculty_id == Faculty.id).order_by(Course.id).limit(1)).scalar()
+    student_id, student = db.session.execute(
+        select(Student.id, Student.email).join(enrollments, enrollments.c.student_id == Student.id)
+        .order_by(Student.id).limit(1)).one()
+    parent = db.session.execute(
+        select(ParentStudentLink.parent_username).order_by(ParentStudentLink.id).limit(1)).scalar()
+    session_id, course_id = db.session.execute(
+        select(CourseSession.id, CourseSession.course_id).where(CourseSession.session_date <= today)
+        .order_by(CourseSession.session_date.desc(), CourseSession.id).limit(1)).one()
+    roster = [sid for (sid,) in db.session.execute(
+        select(enrollments.c.student_id).where(enrollments.c.course_id == course_id))]
+    department_id = db.session.execute(select(func.min(Department.id))).scalar()
+    codes = [code for (code,) in db.session.execute(
+        select(Course.code).where(Course.code.isnot(None)).order_by(Course.id).limit(50))]
+    # Keeps imported emails and codes unique when the same database is benchmarked again
+    tag = format(int(time.time()), 'x')
+
+    def emails(kind, i):
+        return [f'bench-{kind}-{tag}-{i}-{n}@school.edu' for n in range(import_rows)]
+
+    def attendance_form(i):
+        statuses = ('present', 'absent', 'late', 'present')
+        return {f'status_{s}': statuses[(s + i) % len(statuses)] for s in roster}
+
+    cases = [
+        Case('dashboard[admin]', 'admin', 'admin', '/dashboard'),
+        Case('dashboard[faculty]', 'faculty', faculty, '/dashboard'),
+        Case('dashboard[student]', 'student', student, '/dashboard'),
+        Case('dashboard[parent]', 'parent', parent, '/dashboard'),
+        Case('analytics', 'admin', 'admin', '/analytics'),
+        Case('timetable', 'admin', 'admin', '/timetable'),
+        # A week further out on every call, so each one plans from scratch
+        Case('timetable_generate', 'admin', 'admin', '/timetable/generate', method='POST',
+             data=lambda i: {'week_start': (monday + timedelta(weeks=30 + i)).isoformat()}),
+        Case('calendar', 'admin', 'admin', '/calendar'),
+        Case('finance_fees', 'admin', 'admin', '/finance/fees'),
+        Case('finance_fees[student]', 'student', student, '/finance/fees'),
+        Case('student_transcript', 'admin', 'admin', f'/students/{student_id}/transcript'),
+        Case('monthly_attendance_report', 'admin', 'admin',
+             f'/attendance/monthly_report?department_id={department_id}&month={today.month}&year={today.year}'),
+        Case('mark_attendance', 'admin', 'admin', f'/sessions/{session_id}/attendance', method='POST',
+             data=attendance_form),
+        Case('import_students', 'admin', 'admin', '/import/students', method='POST', files='file',
+             data=lambda i: {'file': _csv(('name', 'email', 'phone'),
+                                          ((f'Bench Student {n}', e, '1234567') for n, e in enumerate(emails('s', i))))}),
+        Case('import_faculties', 'admin', 'admin', '/import/faculties', method='POST', files='file',
+             data=lambda i: {'file': _csv(('name', 'email', 'phone'),
+                                          ((f'Bench Faculty {n}', e, '1234567') for n, e in enumerate(emails('f', i))))}),
+        Case('import_subjects', 'admin', 'admin', '/import/subjects', method='POST', files='file',
+             data=lambda i: {'file': _csv(('name', 'code', 'credits', 'faculty_email'),
+                                          ((f'Bench Subject {n}', f'B{tag}-{i}-{n}', 3, faculty)
+                                           for n in range(import_rows)))}),
+        # Enrols the students the import_students case created on the same call number
+        Case('import_enrollments', 'admin', 'admin', '/import/enrollments', method='POST', files='file',
+             data=lambda i: {'file': _csv(('student_email', 'course_code'),
+                                          ((e, codes[n % len(codes)]) for n, e in enumerate(emails('s', i))))}),
+    ]
+    return cases
+
+def run_case(client, case, repeat=5, warmup=1):
+    """Time `case` `repeat` times after `warmup` untimed calls."""
+    with client.session_transaction() as sess:
+        sess['logged_in'] = True
+        sess['user'] = case.user
+        sess['role'] = case.role
+    timings, counts, status = [], [], None
+    for i in range(warmup + repeat):
+        kwargs = case.request_kwargs(i)
+        with capture_queries() as stats:
+            started = time.perf_counter()
+            response = client.open(case.path, method=case.method, **kwargs)
+            response.get_data()
+            elapsed = time.perf_counter() - started
+        db.session.remove()
+        status = response.status_code
+        if i >= warmup:
+            timings.append(elapsed * 1000)
+            counts.append(stats.count)
+    return {
+        'method': case.method,
+        'path': case.path,
+        'status': status,
+        'queries': max(counts),
+        'ms_median': round(statistics.median(timings), 2),
+        'ms_min': round(min(timings), 2),
+        'ms_max': round(max(timings), 2),
+    }
+
+def _commit():
+    try:
+        sha = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'],
+                                    capture_output=True, text=True, check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return sha, dirty
+
+def run_benchmarks(cases, repeat=5, warmup=1, scale=None, echo=None):
+    """Run every case and return the results document."""
+    client = app.test_client()
+    sha, dirty = _commit()
+    results = {}
+    for case in cases:
+        results[case.name] = result = run_case(client, case, repeat=repeat, warmup=warmup)
+        if echo:
+            echo(f"{case.name:28} {result['status']:4d} {result['queries']:6d} q {result['ms_median']:10.2f} ms")
+    return {
+        'commit': sha,
+        'dirty': dirty,
+        'created_at': datetime.utcnow().isoformat(timespec='seconds'),
+        'scale': scale,
+        'database': db.engine.dialect.name,
+        'python': platform.python_version(),
+        'repeat': repeat,
+        'routes': results,
+    }
+
+def failed_requests(document):
+    """Names of the cases whose last response was an error."""
+    return [name for name, r in document['routes'].items() if r['status'] >= 400]
+
+def check_budgets(document, budgets):
+    """Regressions against a budget file as readable lines; empty when within budget.
+
+    A route fails when its statement count exceeds the budget by more than
+    `query_tolerance` (default 0: counts are deterministic for a dataset)
+    or its median latency exceeds the budget by more than `tolerance`
+    (a fraction, default 0.25).
+    """
+    tolerance = budgets.get('tolerance', 0.25)
+    query_tolerance = budgets.get('query_tolerance', 0)
+    failures = []
+    for name, budget in budgets['routes'].items():
+        result = document['routes'].get(name)
+        if result is None:
+            continue
+        if 'queries' in budget and result['queries'] > budget['queries'] * (1 + query_tolerance):
+            failures.append(f"{name}: {result['queries']} statements (budget {budget['queries']})")
+        if 'ms' in budget and result['ms_median'] > budget['ms'] * (1 + tolerance):
+            failures.append(f"{name}: {result['ms_median']:.1f} ms median (budget {budget['ms']} ms "
+                            f"+{tolerance:.0%})")
+    return failures
+
+def budgets_from(document, tolerance=0.25, query_tolerance=0):
+    """A budget file pinned to this run's counts and latencies."""
+    return {
+        'scale': document['scale'],
+        'commit': document['commit'],
+        'tolerance': tolerance,
+        'query_tolerance': query_tolerance,
+        'routes': {name: {'queries': r['queries'], 'ms': round(r['ms_median'], 1)}
+                   for name, r in document['routes'].items()},
+    }
+
+def compare(base, head):
+    """Side-by-side lines for two results documents (base first)."""
+    lines = [f"{'route':28} {'queries':>15} {'median ms':>21} {'change':>8}"]
+    for name, new in head['routes'].items():
+        old = base['routes'].get(name)
+        if old is None:
+            lines.append(f"{name:28} {new['queries']:>15} {new['ms_median']:>21.1f} {'new':>8}")
+            continue
+        change = (new['ms_median'] / old['ms_median'] - 1) if old['ms_median'] else 0.0
+        lines.append(f"{name:28} {old['queries']:>6} -> {new['queries']:<6} "
+                     f"{old['ms_median']:>9.1f} -> {new['ms_median']:<9.1f} {change:>+8.0%}")
+    return lines
+
+def load(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+def dump(document, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(document, f, indent=2, sort_keys=True)
+        f.write('\n')
@@ -1,4 +1,5 @@
 import os
+import tempfile
 
 class BaseConfig:
     SECRET_KEY = os.environ.get("SECRET_KEY", "dev-secret-key")
@@ -8,7 +9,41 @@ class BaseConfig:
     SESSION_TIMEOUT_MINUTES = int(os.environ.get("SESSION_TIMEOUT_MINUTES", 120))
     ALLOW_SELF_REGISTRATION = os.environ.get("ALLOW_SELF_REGISTRATION", "true").lower() in ("1","true","yes","on")
     PASSWORD_RESET_ENABLED = os.environ.get("PASSWORD_RESET_ENABLED", "true").lower() in ("1","true","yes","on")
-    MAX_BULK_IMPORT_ROWS = int(os.environ.get("MAX_BULK_IMPORT_ROWS", 1000))
+    MAX_BULK_IMPORT_ROWS = int(os.environ.get("MAX_BULK_IMPORT_ROWS", 50000))
+    # Bulk-import password hashing: process pool size (0 = one per CPU) and the batch size worth a pool
+    PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", 0))
+    PASSWORD_HASH_PARALLEL_MIN = int(os.environ.get("PASSWORD_HASH_PARALLEL_MIN", 16))
+    # Apply pending schema migrations at startup; otherwise refuse to serve until `flask upgrade-schema`
+    SCHEMA_AUTO_UPGRADE = os.environ.get("SCHEMA_AUTO_UPGRADE", "true").lower() in ("1","true","yes","on")
+    # While the schema is mismatched or could not be verified, re-check it this often (seconds)
+    SCHEMA_RECHECK_SECONDS = int(os.environ.get("SCHEMA_RECHECK_SECONDS", 30))
+    # Background jobs run on an in-process thread pool; inline runs them on the request thread
+    JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 2))
+    JOBS_RUN_INLINE = os.environ.get("JOBS_RUN_INLINE", "false").lower() in ("1","true","yes","on")
+    # A running job with no progress for this long is treated as crashed and may be resumed
+    JOB_STALE_MINUTES = int(os.environ.get("JOB_STALE_MINUTES", 10))
+    # Per-request SQL statement counts; a statement shape repeated this often in one request is logged as a likely N+1
+    QUERY_STATS_ENABLED = os.environ.get("QUERY_STATS_ENABLED", "true").lower() in ("1","true","yes","on")
+    QUERY_REPEAT_THRESHOLD = int(os.environ.get("QUERY_REPEAT_THRESHOLD", 5))
+    # X-Query-Count/-Time-Ms/-Repeats response headers and the statement panel on HTML pages
+    QUERY_STATS_HEADER = os.environ.get("QUERY_STATS_HEADER", "false").lower() in ("1","true","yes","on")
+    QUERY_DEBUG_PANEL = os.environ.get("QUERY_DEBUG_PANEL", "false").lower() in ("1","true","yes","on")
+    # JSON-lines log of requests and statements slower than these thresholds (0 turns either off)
+    SLOW_REQUEST_MS = int(os.environ.get("SLOW_REQUEST_MS", 1000))
+    SLOW_QUERY_MS = int(os.environ.get("SLOW_QUERY_MS", 250))
+    SLOW_LOG_PATH = os.environ.get(
+        "SLOW_LOG_PATH",
+        os.path.join(os.path.dirname(os.path.dirname(__file__)), "instance", "slow.jsonl")
+    )
+    # Capture query plans for slow statements; ANALYZE re-runs the statement (PostgreSQL only)
+    SLOW_LOG_EXPLAIN = os.environ.get("SLOW_LOG_EXPLAIN", "true").lower() in ("1","true","yes","on")
+    SLOW_LOG_EXPLAIN_ANALYZE = os.environ.get("SLOW_LOG_EXPLAIN_ANALYZE", "false").lower() in ("1","true","yes","on")
+    # Seconds the admin dashboard's aggregates are reused before being recomputed (0 disables the cache);
+    # past that they are still served, for up to MAX_STALE more seconds, while one background refresh runs
+    DASHBOARD_METRICS_TTL = int(os.environ.get("DASHBOARD_METRICS_TTL", 60))
+    DASHBOARD_METRICS_MAX_STALE = int(os.environ.get("DASHBOARD_METRICS_MAX_STALE", 300))
+    # Bearer token required to scrape /metrics (open when unset)
+    METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
     # Scheduling & Timetabling governance
     FACULTY_MAX_SESSIONS_PER_DAY = int(os.environ.get("FACULTY_MAX_SESSIONS_PER_DAY", os.environ.get("TEACHER_MAX_SESSIONS_PER_DAY", 4)))
     FACULTY_MAX_SESSIONS_PER_WEEK = int(os.environ.get("FACULTY_MAX_SESSIONS_PER_WEEK", os.environ.get("TEACHER_MAX_SESSIONS_PER_WEEK", 20)))
@@ -52,8 +87,16 @@ class BaseConfig:
         "USER_AVATARS_DIR",
         os.path.join(os.path.dirname(__file__), "static", "uploads", "avatars")
     )
+    # Uploaded CSVs are kept here while their import job runs (and until it is resumed after a failure)
+    IMPORT_SPOOL_DIR = os.environ.get(
+        "IMPORT_SPOOL_DIR",
+        os.path.join(os.path.dirname(os.path.dirname(__file__)), "instance", "import_spool")
+    )
 
 class DevelopmentConfig(BaseConfig):
+    QUERY_STATS_HEADER = os.environ.get("QUERY_STATS_HEADER", "true").lower() in ("1","true","yes","on")
+    QUERY_DEBUG_PANEL = os.environ.get("QUERY_DEBUG_PANEL", "true").lower() in ("1","true","yes","on")
+
     @staticmethod
     def database_uri(instance_path: str) -> str:
         db_url = os.environ.get("DATABASE_URL")
@@ -67,6 +110,12 @@ class DevelopmentConfig(BaseConfig):
 class TestingConfig(BaseConfig):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = os.environ.get("TEST_DATABASE_URL", "sqlite:///:memory:")
+    JOBS_RUN_INLINE = True
+    QUERY_STATS_HEADER = True
+    IMPORT_SPOOL_DIR = os.path.join(tempfile.gettempdir(), "school-import-spool")
+    SLOW_LOG_PATH = os.path.join(tempfile.gettempdir(), "school-slow.jsonl")
+    DASHBOARD_METRICS_TTL = 0
 
 class ProductionConfig(BaseConfig):
     SQLALCHEMY_DATABASE_URI = os.environ.get("DATABASE_URL")
+    SCHEMA_AUTO_UPGRADE = os.environ.get("SCHEMA_AUTO_UPGRADE", "false").lower() in ("1","true","yes","on")
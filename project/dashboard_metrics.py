@@ -0,0 +1,74 @@
+"""Aggregates behind the admin/staff dashboard.
+
+Four grouped statements regardless of institution size: headline counts,
+invoice totals, attendance per department (summed from the per-student
+metrics rollup, joined to students and grouped by department) and the
+latest admissions. The result is plain data, served from a snapshot (see
+snapshots.py) that is fresh for DASHBOARD_METRICS_TTL seconds or until a
+write to one of its tables commits, and is refreshed in the background.
+"""
+from project import app, db
+from project.models import AdmissionApplication, Course, Department, Faculty, Invoice, Student, StudentMetrics
+from project.snapshots import get_snapshot
+from sqlalchemy import func, select
+
+# Tables the admin aggregates read; attendance and grade changes reach them through student_metrics
+ADMIN_METRICS_TABLES = tuple(m.__tablename__ for m in (
+    Student, Faculty, Course, AdmissionApplication, Invoice, StudentMetrics, Department))
+
+def _counts():
+    def count(model, *where):
+        return select(func.count()).select_from(model).where(*where).scalar_subquery()
+    row = db.session.execute(select(
+        count(Student), count(Faculty), count(Course),
+        count(AdmissionApplication, AdmissionApplication.status == 'enrolled'),
+    )).one()
+    return dict(zip(('student_count', 'faculty_count', 'course_count', 'enrolled_admissions'), row))
+
+def _fees():
+    due, paid = db.session.execute(select(func.sum(Invoice.amount_due), func.sum(Invoice.paid_amount))).one()
+    return {'total_due': due or 0.0, 'total_paid': paid or 0.0}
+
+def _attendance():
+    present_late = StudentMetrics.attendance_present + StudentMetrics.attendance_late
+    rows = db.session.execute(
+        select(Student.department_id, Department.name,
+               func.sum(StudentMetrics.attendance_total), func.sum(present_late))
+        .select_from(Student)
+        .outerjoin(Department, Department.id == Student.department_id)
+        .outerjoin(StudentMetrics, StudentMetrics.student_id == Student.id)
+        .group_by(Student.department_id, Department.name)
+        .order_by(Student.department_id)
+    ).all()
+    total = sum(t or 0 for _, _, t, _ in rows)
+    attended = sum(p or 0 for _, _, _, p in rows)
+    by_department = [
+        {'name': name, 'rate': round((p or 0) / t * 100) if t else 0}
+        for dept_id, name, t, p in rows if dept_id is not None and name is not None
+    ]
+    return {'attendance_rate': (attended / total * 100) if total else 0, 'dept_attendance': by_department}
+
+def _recent_admissions(limit=5):
+    rows = db.session.execute(
+        select(Student.name, Department.name, Student.status)
+        .outerjoin(Department, Department.id == Student.department_id)
+        .order_by(Student.admission_date.desc())
+        .limit(limit)
+    ).all()
+    return [{'name': name, 'dept': dept or 'General', 'status': (status or '').capitalize()}
+            for name, dept, status in rows]
+
+def compute_admin_metrics():
+    metrics = {}
+    metrics.update(_counts())
+    metrics.update(_fees())
+    metrics.update(_attendance())
+    metrics['recent_admissions'] = _recent_admissions()
+    return metrics
+
+def admin_dashboard_metrics():
+    """The admin/staff dashboard aggregates (institution-wide, so admin and staff share one snapshot)."""
+    return get_snapshot(('dashboard', 'admin'), compute_admin_metrics,
+                        depends_on=ADMIN_METRICS_TABLES,
+                        ttl=app.config.get('DASHBOARD_METRICS_TTL', 0),
+                        max_stale=app.config.get('DASHBOARD_METRICS_MAX_STALE', 300))
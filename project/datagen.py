@@ -0,0 +1,433 @@
+"""Synthetic dataset generator for load and performance testing.
+
+`flask generate-data --scale large` fills an empty database with a
+realistic school: department sizes follow a long tail, each student has
+an attendance propensity and an ability that drive their attendance
+marks and exam scores, fees are mostly but not fully paid, and audit and
+notification timestamps cluster in working hours and recent weeks.
+
+Rows are built as plain dicts in a fixed id space and written with Core
+executemany inserts in chunks, one commit per table, so even the `large`
+scale finishes in minutes on SQLite and PostgreSQL. Generated student,
+faculty and parent accounts all share DATAGEN_PASSWORD.
+"""
+from project import app, db
+from project.models import (Attendance, AuditLog, Course, CourseSession, Department, Exam, Faculty, FacultyLeave,
+                            FeePayment, Grade, Invoice, Notice, Notification, ParentStudentLink, Resource,
+                            ResourceBooking, Semester, Student, Subject, User, enrollments, GRADE_POINTS)
+from project.student_metrics import rebuild_student_metrics
+from sqlalchemy import text
+from werkzeug.security import generate_password_hash
+from datetime import date, datetime, time as dtime, timedelta
+from itertools import islice
+import click
+import math
+import random
+import time
+
+DATAGEN_PASSWORD = 'password'
+CHUNK = 5000
+
+SCALES = {
+    'demo': dict(departments=5, faculty=20, students=200, courses=30, enrolments_per_student=4,
+                 attendance=8000, grades=2000, invoices=400, payments=400, audit=5000, notifications=2000,
+                 resources=10, bookings=200, notices=20),
+    'small': dict(departments=10, faculty=200, students=5000, courses=300, enrolments_per_student=5,
+                  attendance=200000, grades=50000, invoices=20000, payments=20000, audit=100000,
+                  notifications=50000, resources=30, bookings=2000, notices=100),
+    'large': dict(departments=50, faculty=2000, students=60000, courses=3000, enrolments_per_student=5,
+                  attendance=2000000, grades=500000, invoices=200000, payments=200000, audit=1000000,
+                  notifications=500000, resources=200, bookings=20000, notices=500),
+}
+VOLUMES = tuple(SCALES['large'])
+
+FIRST_NAMES = ('Aarav', 'Aisha', 'Arjun', 'Chen', 'Diya', 'Elena', 'Fatima', 'Hana', 'Ishaan', 'James', 'Kavya',
+               'Leo', 'Maya', 'Noah', 'Olivia', 'Priya', 'Rahul', 'Sara', 'Tariq', 'Uma', 'Vikram', 'Yusuf', 'Zoe')
+LAST_NAMES = ('Agarwal', 'Brown', 'Das', 'Fernandez', 'Garcia', 'Iyer', 'Khan', 'Kim', 'Menon', 'Nair', 'Okafor',
+              'Patel', 'Reddy', 'Rossi', 'Shah', 'Singh', 'Smith', 'Tanaka', 'Varma', 'Wang', 'Williams')
+FIELDS = ('Computer Science', 'Mathematics', 'Physics', 'Chemistry', 'Biology', 'History', 'Economics',
+          'Literature', 'Mechanical Engineering', 'Electrical Engineering', 'Civil Engineering', 'Commerce')
+COURSE_TOPICS = ('Foundations of', 'Advanced', 'Applied', 'Introduction to', 'Topics in', 'Seminar in', 'Lab:')
+AUDIT_ACTIONS = (('login', 40), ('logout', 25), ('update_student', 8), ('mark_attendance', 10), ('add_grade', 6),
+                 ('record_payment', 4), ('create_invoice', 3), ('bulk_import_job', 1), ('update_course', 3))
+SLOTS = ((9, 0), (10, 0), (11, 15), (13, 30), (14, 30), (15, 45))
+
+class DatasetExistsError(RuntimeError):
+    pass
+
+def _weights(n, skew=0.8):
+    # Long-tailed sizes: a few big departments, many small ones
+    return [1 / (i + 1) ** skew for i in range(n)]
+
+def _person(rng):
+    return f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}'
+
+def _department_name(d):
+    field, series = FIELDS[(d - 1) % len(FIELDS)], (d - 1) // len(FIELDS)
+    return f'{field} {series + 1}' if series else field
+
+def _letter(score):
+    for threshold, letter in ((90, 'A+'), (85, 'A'), (80, 'A-'), (75, 'B+'), (70, 'B'), (65, 'B-'), (60, 'C+'),
+                              (55, 'C'), (50, 'C-'), (45, 'D+'), (40, 'D')):
+        if score >= threshold:
+            return letter
+    return 'F'
+
+def _working_time(rng, day):
+    hour = min(max(int(rng.gauss(13, 3)), 0), 23)
+    return datetime.combine(day, dtime(hour, rng.randrange(60), rng.randrange(60)))
+
+def _recent_day(rng, today, horizon=365, mean=45):
+    return today - timedelta(days=min(int(rng.expovariate(1 / mean)), horizon))
+
+class DatasetGenerator:
+    """Builds and inserts one dataset; `volumes` maps VOLUMES keys to row counts."""
+
+    def __init__(self, volumes, seed=42, echo=None):
+        self.v = volumes
+        self.rng = random.Random(seed)
+        self.echo = echo or (lambda msg: None)
+        self.today = date.today()
+        self.now = datetime.utcnow()
+        self.counts = {}
+
+    def insert(self, table, rows):
+        """Insert an iterable of row dicts in chunks and commit; returns the row count."""
+        rows = iter(rows)
+        started, n = time.perf_counter(), 0
+        while True:
+            chunk = list(islice(rows, CHUNK))
+            if not chunk:
+                break
+            db.session.execute(table.insert(), chunk)
+            n += len(chunk)
+        db.session.commit()
+        elapsed = time.perf_counter() - started
+        self.counts[table.name] = self.counts.get(table.name, 0) + n
+        self.echo(f'  {table.name:22} {n:>10,} rows  {elapsed:6.1f}s  ({n / elapsed if elapsed else 0:,.0f} rows/s)')
+        return n
+
+    def run(self):
+        if db.session.query(Student.id).first() or db.session.query(Course.id).first():
+            raise DatasetExistsError('generate-data needs an empty database (students and courses already exist).')
+        started = time.perf_counter()
+        self.people()
+        self.courses()
+        self.sessions_and_attendance()
+        self.exams_and_grades()
+        self.finance()
+        self.activity()
+        self.facilities()
+        _reset_sequences()
+        rebuild_student_metrics()
+        self.echo(f'Done in {time.perf_counter() - started:.1f}s.')
+        return self.counts
+
+    def people(self):
+        rng, v = self.rng, self.v
+        n_dept = v['departments']
+        self.dept_weights = _weights(n_dept)
+        self.insert(Department.__table__, (
+            {'id': d, 'name': _department_name(d), 'code': f'D{d:03d}'} for d in range(1, n_dept + 1)))
+        year = self.today.year if self.today.month >= 7 else self.today.year - 1
+        self.semester_start = self.today - timedelta(days=100)
+        self.insert(Semester.__table__, [
+            {'id': 1, 'number': 1, 'academic_year': f'{year}-{year + 1}', 'start_date': self.semester_start,
+             'end_date': self.semester_start + timedelta(days=140), 'is_active': True}])
+        depts = range(1, n_dept + 1)
+        self.faculty_dept = rng.choices(depts, self.dept_weights, k=v['faculty'])
+        self.insert(Faculty.__table__, (
+            {'id': f, 'name': _person(rng), 'email': f'faculty{f}@school.edu', 'phone': f'555{f:07d}',
+             'department_id': self.faculty_dept[f - 1], 'designation': rng.choice(('Professor', 'Associate Professor',
+                                                                                  'Assistant Professor', 'Lecturer')),
+             'employment_status': 'Full-time' if rng.random() < 0.85 else 'Part-time', 'max_weekly_hours': 40,
+             'joining_date': self.today - timedelta(days=rng.randrange(30, 7300))}
+            for f in range(1, v['faculty'] + 1)))
+        self.student_dept = rng.choices(depts, self.dept_weights, k=v['students'])
+        # Per-student traits that shape every generated record about them
+        self.presence = [rng.betavariate(9, 2) for _ in range(v['students'])]
+        self.ability = [rng.gauss(68, 12) for _ in range(v['students'])]
+        guardians = {}
+        students = []
+        for s in range(1, v['students'] + 1):
+            # Roughly a third of students have a guardian account; some guardians have two children
+            guardian = None
+            if rng.random() < 0.35:
+                guardian = f'parent{s // 2 if rng.random() < 0.15 else s}@family.example'
+                guardians.setdefault(guardian, []).append(s)
+            students.append({
+                'id': s, 'name': _person(rng), 'email': f'student{s}@school.edu', 'phone': f'556{s:07d}',
+                'registration_number': f'REG{s:07d}', 'roll_number': f'R{s:07d}',
+                'department_id': self.student_dept[s - 1], 'semester_id': 1, 'current_year': rng.randint(1, 4),
+                'status': 'active' if rng.random() < 0.96 else rng.choice(('inactive', 'graduated')),
+                'gender': rng.choice(('Male', 'Female')), 'admission_date': self.today - timedelta(days=rng.randrange(30, 1460)),
+                'guardian_email': guardian, 'guardian_name': _person(rng) if guardian else None,
+            })
+        self.insert(Student.__table__, students)
+        pw_hash = generate_password_hash(DATAGEN_PASSWORD)
+        users = [{'username': 'admin', 'password_hash': pw_hash, 'role': 'admin'}] \
+            if not User.query.filter_by(username='admin').first() else []
+        users += [{'username': f'faculty{f}@school.edu', 'password_hash': pw_hash, 'role': 'faculty'}
+                  for f in range(1, v['faculty'] + 1)]
+        users += [{'username': st['email'], 'password_hash': pw_hash, 'role': 'student'} for st in students]
+        users += [{'username': g, 'password_hash': pw_hash, 'role': 'parent'} for g in guardians]
+        self.insert(User.__table__, users)
+        self.insert(ParentStudentLink.__table__, (
+            {'parent_username': g, 'student_id': s} for g, kids in guardians.items() for s in kids))
+        self.guardians = list(guardians)
+
+    def courses(self):
+        rng, v = self.rng, self.v
+        n_dept = v['departments']
+        faculty_by_dept = {}
+        for f, d in enumerate(self.faculty_dept, start=1):
+            faculty_by_dept.setdefault(d, []).append(f)
+        self.insert(Subject.__table__, (
+            {'id': c, 'name': f'Subject {c}', 'code': f'SUB{c:05d}', 'department_id': (c - 1) % n_dept + 1,
+             'credits': 3} for c in range(1, v['courses'] + 1)))
+        self.course_dept = rng.choices(range(1, n_dept + 1), self.dept_weights, k=v['courses'])
+        rows = []
+        for c in range(1, v['courses'] + 1):
+            d = self.course_dept[c - 1]
+            staff = faculty_by_dept.get(d) or [rng.randint(1, v['faculty'])]
+            rows.append({
+                'id': c, 'name': f'{rng.choice(COURSE_TOPICS)} {FIELDS[(d - 1) % len(FIELDS)]} {c}',
+                'code': f'C{c:05d}', 'faculty_id': rng.choice(staff), 'department_id': d, 'semester_id': 1,
+                'subject_id': c, 'credits': rng.choice((2, 3, 3, 4)), 'capacity': 120, 'syllabus_progress': rng.randint(0, 100),
+                'room': f'R{rng.randint(100, 499)}', 'start_date': self.semester_start,
+                'end_date': self.semester_start + timedelta(days=140),
+            })
+        self.insert(Course.__table__, rows)
+        # Most enrolments stay within the student's department
+        courses_by_dept = {}
+        for c, d in enumerate(self.course_dept, start=1):
+            courses_by_dept.setdefault(d, []).append(c)
+        all_courses = range(1, v['courses'] + 1)
+        self.roster = {}
+        pairs = []
+        k = min(v['enrolments_per_student'], v['courses'])
+        for s in range(1, v['students'] + 1):
+            own = courses_by_dept.get(self.student_dept[s - 1], [])
+            picked = set(rng.sample(own, min(len(own), max(k - 1, 1)))) if own else set()
+            while len(picked) < k:
+                picked.add(rng.choice(all_courses))
+            for c in picked:
+                self.roster.setdefault(c, []).append(s)
+                pairs.append({'student_id': s, 'course_id': c})
+        self.insert(enrollments, pairs)
+        self.enrolments = len(pairs)
+
+    def sessions_and_attendance(self):
+        rng, v = self.rng, self.v
+        # Enough held sessions per course to reach the attendance target, plus a third as many upcoming
+        held_days = (self.today - self.semester_start).days
+        held = min(max(1, math.ceil(v['attendance'] / max(self.enrolments, 1))), held_days)
+        upcoming = min(max(1, held // 3), 40)
+        sessions, marks, sid = [], [], 0
+        target = v['attendance']
+        for c in range(1, v['courses'] + 1):
+            offset = rng.randrange(held_days // held)
+            days = [self.semester_start + timedelta(days=offset + k * held_days // held) for k in range(held)]
+            days += [self.today + timedelta(days=1 + k * 40 // upcoming) for k in range(upcoming)]
+            for k, day in enumerate(days):
+                sid += 1
+                hour, minute = rng.choice(SLOTS)
+                sessions.append({'id': sid, 'course_id': c, 'session_date': day, 'title': f'Lecture {k + 1}',
+                                 'start_time': dtime(hour, minute), 'end_time': dtime(hour + 1, minute),
+                                 'location': f'R{100 + c % 400}'})
+                if day <= self.today:
+                    marks.append((sid, c, day))
+        self.insert(CourseSession.__table__, sessions)
+        self.counts['course_session'] = len(sessions)
+
+        def attendance():
+            n = 0
+            for sid, c, day in marks:
+                for s in self.roster.get(c, ()):
+                    if n >= target:
+                        return
+                    p = self.presence[s - 1]
+                    r = rng.random()
+                    status = ('present' if r < p * 0.92 else 'late' if r < p else
+                              'excused' if r < p + (1 - p) * 0.15 else 'absent')
+                    n += 1
+                    yield {'session_id': sid, 'student_id': s, 'status': status, 'marked_by': 'datagen',
+                           'marked_at': datetime.combine(day, dtime(17, 0))}
+        self.insert(Attendance.__table__, attendance())
+
+    def exams_and_grades(self):
+        rng, v = self.rng, self.v
+        exams, eid = [], 0
+        for c in range(1, v['courses'] + 1):
+            for k, name in enumerate(('Midterm', 'Final Exam')):
+                eid += 1
+                exams.append({'id': eid, 'name': name, 'course_id': c, 'max_marks': 100, 'location': f'Hall {c % 9 + 1}',
+                              'exam_date': datetime.combine(self.semester_start + timedelta(days=60 + k * 70), dtime(10))})
+        self.insert(Exam.__table__, exams)
+        course_noise = [rng.gauss(0, 6) for _ in range(v['courses'])]
+        target = v['grades']
+
+        def grades():
+            # Midterm score, final letter grade and final exam score per enrolment, course by
+            # course, until the target is met; past that, another round with fresh marks
+            n = 0
+            while True:
+                for c in range(1, v['courses'] + 1):
+                    midterm, final = exams[2 * c - 2], exams[2 * c - 1]
+                    for s in self.roster.get(c, ()):
+                        for exam in (midterm, None, final):
+                            if n >= target:
+                                return
+                            n += 1
+                            mark = self.ability[s - 1] + course_noise[c - 1] + rng.gauss(0, 8)
+                            if exam is None:
+                                letter = _letter(mark)
+                                yield {'student_id': s, 'course_id': c, 'exam_id': None, 'score': None,
+                                       'letter': letter, 'points': GRADE_POINTS[letter], 'grade_letter': letter,
+                                       'semester': 1, 'recorded_at': self.now - timedelta(days=rng.randrange(200))}
+                            else:
+                                yield {'student_id': s, 'course_id': c, 'exam_id': exam['id'],
+                                       'score': min(max(round(mark), 0), 100), 'letter': None, 'points': None,
+                                       'grade_letter': None, 'semester': 1, 'recorded_at': exam['exam_date']}
+                if not self.enrolments:
+                    return
+        self.insert(Grade.__table__, grades())
+
+    def finance(self):
+        rng, v = self.rng, self.v
+        # Invoices with a paid amount, one entry each; every one is settled by at
+        # least one payment, so no more invoices are paid than there are payments
+        paid_invoices = []
+
+        def invoices():
+            for i in range(v['invoices']):
+                s = i % v['students'] + 1
+                amount = float(rng.choice((1500, 2500, 3200, 4800, 250, 120)))
+                issued = self.now - timedelta(days=rng.randrange(365))
+                paid = amount if rng.random() < 0.7 else rng.choice((0.0, round(amount * rng.random(), 2)))
+                if paid and len(paid_invoices) >= v['payments']:
+                    paid = 0.0
+                if paid:
+                    paid_invoices.append([s, paid, issued.date(), 1])
+                yield {'student_id': s, 'amount_due': amount, 'description': 'Tuition Fee' if amount > 1000 else 'Lab Fee',
+                       'issued_at': issued, 'due_date': (issued + timedelta(days=30)).date(), 'paid_amount': paid,
+                       'status': 'paid' if paid >= amount else 'partial' if paid else 'unpaid',
+                       'currency': 'USD', 'waiver_amount': 0.0}
+        self.insert(Invoice.__table__, invoices())
+        # The remaining payments become extra instalments on random paid invoices
+        splittable = [inv for inv in paid_invoices if inv[1] >= 10]
+        if splittable:
+            for _ in range(v['payments'] - len(paid_invoices)):
+                rng.choice(splittable)[3] += 1
+
+        def payments():
+            for s, paid, issued, parts in paid_invoices:
+                cents = round(paid * 100)
+                cuts = sorted(rng.sample(range(1, cents), parts - 1))
+                for lo, hi in zip([0] + cuts, cuts + [cents]):
+                    day = min(issued + timedelta(days=rng.randrange(45)), self.today)
+                    yield {'student_id': s, 'amount': (hi - lo) / 100,
+                           'method': rng.choices(('online', 'card', 'cash', 'cheque'), (50, 30, 15, 5))[0],
+                           'reference': f'TXN{rng.randrange(10 ** 9):09d}', 'currency': 'USD', 'status': 'completed',
+                           'paid_at': _working_time(rng, day)}
+        self.insert(FeePayment.__table__, payments())
+
+    def activity(self):
+        rng, v = self.rng, self.v
+        actions, action_weights = zip(*AUDIT_ACTIONS)
+
+        def audit():
+            for _ in range(v['audit']):
+                role = rng.choices(('student', 'faculty', 'admin', 'parent'), (60, 25, 10, 5))[0]
+                actor = ('admin' if role == 'admin' else
+                         f'faculty{rng.randint(1, v["faculty"])}@school.edu' if role == 'faculty' else
+                         rng.choice(self.guardians) if role == 'parent' and self.guardians else
+                         f'student{rng.randint(1, v["students"])}@school.edu')
+                action = rng.choices(actions, action_weights)[0]
+                yield {'action': action, 'actor_username': actor, 'actor_role': role,
+                       'target': None if action in ('login', 'logout') else f'#{rng.randint(1, v["students"])}',
+                       'details': None, 'created_at': _working_time(rng, _recent_day(rng, self.today))}
+        self.insert(AuditLog.__table__, audit())
+
+        def notifications():
+            for _ in range(v['notifications']):
+                kind = rng.choices(('student', 'faculty', 'parent'), (80, 10, 10))[0]
+                recipient = (f'faculty{rng.randint(1, v["faculty"])}@school.edu' if kind == 'faculty' else
+                             rng.choice(self.guardians) if kind == 'parent' and self.guardians else
+                             f'student{rng.randint(1, v["students"])}@school.edu')
+                created = _working_time(rng, _recent_day(rng, self.today, mean=20))
+                yield {'recipient_type': kind, 'recipient_id': recipient, 'title': 'Update',
+                       'message': rng.choice(('Your timetable has changed.', 'New marks have been published.',
+                                              'A fee invoice has been issued.', 'Campus notice posted.')),
+                       'read': created < self.now - timedelta(days=7) or rng.random() < 0.3, 'created_at': created}
+        self.insert(Notification.__table__, notifications())
+        self.insert(Notice.__table__, (
+            {'title': f'Notice {i}', 'content': 'Please check the details on the notice board.',
+             'target_role': rng.choice(('all', 'all', 'student', 'faculty', 'parent')),
+             'department_id': rng.randint(1, v['departments']) if rng.random() < 0.3 else None,
+             'created_by': 'admin', 'created_at': self.now - timedelta(days=rng.randrange(120)),
+             'expires_at': self.now + timedelta(days=rng.randrange(-60, 60)) if rng.random() < 0.7 else None}
+            for i in range(1, v['notices'] + 1)))
+
+    def facilities(self):
+        rng, v = self.rng, self.v
+        if not v['resources']:
+            return
+        self.insert(Resource.__table__, (
+            {'id': r, 'name': f'Room {r}', 'type': rng.choice(('classroom', 'lab', 'hall', 'equipment')),
+             'capacity': rng.choice((30, 60, 120, 200)), 'location': f'Block {chr(65 + r % 6)}', 'status': 'available'}
+            for r in range(1, v['resources'] + 1)))
+        # Consecutive hourly slots per resource, half of them before today
+        first = datetime.combine(self.today, dtime(8)) - timedelta(hours=v['bookings'] // (2 * v['resources']))
+
+        def bookings():
+            for b in range(v['bookings']):
+                start = first + timedelta(hours=b // v['resources'])
+                yield {'resource_id': b % v['resources'] + 1, 'title': 'Booking', 'booked_by': 'admin',
+                       'status': rng.choices(('approved', 'pending', 'rejected'), (80, 15, 5))[0],
+                       'start_time': start, 'end_time': start + timedelta(minutes=50)}
+        self.insert(ResourceBooking.__table__, bookings())
+
+        def leaves():
+            for f in range(1, v['faculty'] + 1):
+                if rng.random() < 0.3:
+                    day = self.today + timedelta(days=rng.randint(-90, 60))
+                    yield {'faculty_id': f, 'start_date': day, 'end_date': day + timedelta(days=rng.randint(0, 4)),
+                           'reason': rng.choice(('Conference', 'Medical', 'Personal')), 'approved': rng.random() < 0.8}
+        self.insert(FacultyLeave.__table__, leaves())
+
+def _reset_sequences():
+    # Explicit ids leave PostgreSQL sequences behind; point them past the generated rows
+    if db.session.get_bind().dialect.name != 'postgresql':
+        return
+    for table in db.metadata.sorted_tables:
+        if 'id' in table.c and table.c.id.primary_key and table.c.id.autoincrement:
+            db.session.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+                f"COALESCE((SELECT MAX(id) FROM {table.name}), 0) + 1, false)"))
+    db.session.commit()
+
+def generate_dataset(scale='demo', seed=42, echo=None, **overrides):
+    """Fill an empty database at `scale`, with per-volume overrides; returns {table: rows}."""
+    volumes = dict(SCALES[scale])
+    volumes.update({k: n for k, n in overrides.items() if n is not None})
+    return DatasetGenerator(volumes, seed=seed, echo=echo).run()
+
+def _volume_options(fn):
+    for key in reversed(VOLUMES):
+        fn = click.option(f'--{key.replace("_", "-")}', key, type=int, default=None,
+                          help=f'Override the scale\'s {key.replace("_", " ")}.')(fn)
+    return fn
+
+@app.cli.command('generate-data')
+@click.option('--scale', type=click.Choice(list(SCALES)), default='demo', show_default=True)
+@click.option('--seed', default=42, show_default=True, help='Random seed (same seed, same dataset).')
+@_volume_options
+def generate_data_command(scale, seed, **overrides):
+    """Fill an empty database with a synthetic dataset for load and performance testing."""
+    click.echo(f'Generating the {scale} dataset...')
+    try:
+        generate_dataset(scale, seed=seed, echo=click.echo, **overrides)
+    except DatasetExistsError as e:
+        raise click.ClickException(str(e))
+    click.echo(f'Log in as any generated user with the password "{DATAGEN_PASSWORD}".')
@@ -0,0 +1,91 @@
+"""Faculty-facing teaching overview.
+
+The faculty dashboard's figures come from three statements: one with the
+course, this-week and past-week session counts; one for the sessions from
+a week ago onward, cut to the past week plus the next few (with their
+course); and one for the attendance tallies of the past week's sessions,
+grouped by session and status. faculty_performance() uses the same
+grouped tally over every session the faculty has taught.
+"""
+from project import app, db
+from project.models import Attendance, Course, CourseSession
+from sqlalchemy import func, select
+from sqlalchemy.orm import contains_eager
+from datetime import date, timedelta
+
+# Statuses that count as attended
+ATTENDED = ('present', 'late')
+
+def session_attendance_counts(*where):
+    """{session_id: {status: count}} for the sessions matching `where`, in one grouped query."""
+    rows = db.session.execute(
+        select(Attendance.session_id, Attendance.status, func.count())
+        .join(CourseSession, CourseSession.id == Attendance.session_id)
+        .join(Course, Course.id == CourseSession.course_id)
+        .where(*where)
+        .group_by(Attendance.session_id, Attendance.status)
+    ).all()
+    counts = {}
+    for session_id, status, n in rows:
+        counts.setdefault(session_id, {})[status] = n
+    return counts
+
+def faculty_overview(faculty_id, today=None, upcoming_limit=5):
+    """Weekly load, upcoming sessions and the past week's sessions with their attendance stats."""
+    today = today or date.today()
+    week_start = today - timedelta(days=today.weekday())
+    week_end = week_start + timedelta(days=6)
+    week_ago = today - timedelta(days=7)
+    taught = Course.faculty_id == faculty_id
+
+    def count_sessions(*where):
+        return (select(func.count()).select_from(CourseSession).join(Course)
+                .where(taught, *where).scalar_subquery())
+
+    course_count, week_sessions, recent_count = db.session.execute(select(
+        select(func.count()).select_from(Course).where(taught).scalar_subquery(),
+        count_sessions(CourseSession.session_date.between(week_start, week_end)),
+        count_sessions(CourseSession.session_date >= week_ago, CourseSession.session_date < today),
+    )).one()
+
+    # The past week's sessions come first in date order, the upcoming ones right after them
+    sessions = db.session.execute(
+        select(CourseSession).join(CourseSession.course).options(contains_eager(CourseSession.course))
+        .where(taught, CourseSession.session_date >= week_ago)
+        .order_by(CourseSession.session_date.asc(), CourseSession.id.asc())
+        .limit(recent_count + upcoming_limit)
+    ).scalars().all()
+    recent = [s for s in sessions if s.session_date < today]
+    upcoming = [s for s in sessions if s.session_date >= today][:upcoming_limit]
+
+    counts = session_attendance_counts(taught, CourseSession.id.in_([s.id for s in recent])) if recent else {}
+    recent_sessions = []
+    for s in reversed(recent):
+        tally = counts.get(s.id, {})
+        total = sum(tally.values())
+        recent_sessions.append({
+            'id': s.id,
+            'course': s.course,
+            'session_date': s.session_date,
+            'title': s.title,
+            'attendance_marked': total > 0,
+            'stats': f"{tally.get('present', 0)}P, {tally.get('late', 0)}L / {total}" if total else "",
+        })
+
+    default_hours = int(app.config.get('SESSION_DEFAULT_DURATION_HOURS', 1))
+    return {
+        'active_courses_count': course_count,
+        'weekly_hours': week_sessions * default_hours,
+        'upcoming_sessions': upcoming,
+        'recent_sessions': recent_sessions,
+    }
+
+def faculty_attendance_summary(faculty_id):
+    """(sessions taught, attendance rate or None) across all of the faculty's courses."""
+    taught = Course.faculty_id == faculty_id
+    total_sessions = db.session.execute(
+        select(func.count()).select_from(CourseSession).join(Course).where(taught)).scalar()
+    counts = session_attendance_counts(taught)
+    total = sum(n for tally in counts.values() for n in tally.values())
+    attended = sum(tally.get(status, 0) for tally in counts.values() for status in ATTENDED)
+    return total_sessions, (attended / total * 100.0) if total else None
@@ -0,0 +1,608 @@
+"""Bulk CSV imports.
+
+Each importer prefetches the keys it checks against (emails, registration
+numbers, department names, course codes, ...) with one query per key,
+validates rows in a single pass against those dicts and the keys already
+accepted from the same file, and writes accepted rows with chunked
+executemany INSERTs. Nothing is looked up per row, so the cost grows with
+the file rather than with the tables it is checked against.
+
+Uploads run as 'import_csv' background jobs: the file is spooled to disk
+and read as a stream, every chunk is committed together with the job's
+checkpoint and that chunk's row errors, and a resumed job skips the rows
+its last checkpoint covers.
+"""
+from project import app, db
+from project.jobs import job_handler, job_result, job_resumable, resume_job, submit_job
+from project.models import BackgroundJob, Course, Department, Faculty, ImportRowError, Student, User, enrollments
+from project.telemetry import observe_import_rows
+from sqlalchemy import bindparam, select
+from werkzeug.security import generate_password_hash
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from itertools import islice
+import click
+import csv
+import json
+import logging
+import multiprocessing
+import os
+import re
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+IMPORT_CHUNK_SIZE = 1000
+IMPORT_MODES = ('insert', 'validate', 'sync')
+DIFF_SAMPLE_SIZE = 50
+PASSWORD_STRATEGIES = ('none', 'fixed', 'email', 'csv')
+
+def iter_csv_file(path):
+    """Stream dict rows from a spooled upload."""
+    with open(path, newline='', encoding='utf-8-sig', errors='ignore') as f:
+        yield from csv.DictReader(f)
+
+def valid_email(email):
+    return bool(email and re.match(r"^[^@\s]+@[^@\s]+\.[^@\s]+$", email))
+
+def valid_phone(phone):
+    return bool(phone and re.match(r"^[0-9\-\+\s]{7,20}$", phone))
+
+def _date(value):
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+PARSERS = {'text': str, 'int': int, 'float': float, 'date': _date}
+
+def _pool_context():
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+class PasswordHasher:
+    """Hashes an import's passwords, on a process pool once there are enough.
+
+    generate_password_hash is CPU-bound and holds the GIL, so only processes
+    scale it across cores. Executor.map returns hashes in input order. The
+    pool is started on first use and kept for the rest of the import. Its
+    workers come from a forkserver (spawn where that is unavailable), never
+    a plain fork: the pool is started from a job thread, and forking a
+    threaded process would copy held locks and pooled DB connections.
+    """
+    def __init__(self, workers=None, parallel_min=None):
+        if workers is None:
+            workers = int(app.config.get('PASSWORD_HASH_WORKERS', 0))
+        if parallel_min is None:
+            parallel_min = int(app.config.get('PASSWORD_HASH_PARALLEL_MIN', 16))
+        self.workers = workers or os.cpu_count() or 1
+        self.parallel_min = parallel_min
+        self.count = 0
+        self.seconds = 0.0
+        self._pool = None
+
+    def hash(self, passwords):
+        started = time.perf_counter()
+        hashes = None
+        if self.workers > 1 and len(passwords) >= self.parallel_min:
+            try:
+                if self._pool is None:
+                    self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=_pool_context())
+                chunksize = max(1, len(passwords) // (self.workers * 4))
+                hashes = list(self._pool.map(generate_password_hash, passwords, chunksize=chunksize))
+            except (OSError, BrokenProcessPool) as e:
+                logger.warning('Parallel password hashing unavailable, hashing serially: %s', e)
+                self.close()
+                self.workers = 1
+        if hashes is None:
+            hashes = [generate_password_hash(p) for p in passwords]
+        self.count += len(hashes)
+        self.seconds += time.perf_counter() - started
+        return hashes
+
+    @property
+    def rate(self):
+        return self.count / self.seconds if self.seconds else 0.0
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+class ImportResult:
+    COUNTERS = ('created', 'updated', 'skipped', 'users_created', 'error_count')
+    STATUSES = ('new', 'unchanged', 'changed', 'invalid')
+
+    def __init__(self, **state):
+        for name in self.COUNTERS:
+            setattr(self, name, state.get(name, 0))
+        self.hashes_per_second = state.get('hashes_per_second')
+        self.diff = dict.fromkeys(self.STATUSES, 0)
+        self.diff.update(state.get('diff') or {})
+        self.column_changes = dict(state.get('column_changes') or {})
+        self.samples = {status: list(rows) for status, rows in (state.get('samples') or {'new': [], 'changed': []}).items()}
+        self.errors = []  # (row number, message) not yet persisted
+
+    def error(self, line, message):
+        self.errors.append((line, message))
+        self.error_count += 1
+
+    def tally(self, status, line, key, changes=None):
+        """Count a classified row towards the diff, keeping a sample of new and changed rows."""
+        self.diff[status] += 1
+        for column in changes or ():
+            self.column_changes[column] = self.column_changes.get(column, 0) + 1
+        sample = self.samples.get(status)
+        if sample is not None and len(sample) < DIFF_SAMPLE_SIZE:
+            entry = {'row': line, 'key': key}
+            if changes:
+                entry['changes'] = {column: [old, new] for column, (old, new) in changes.items()}
+            sample.append(entry)
+
+    def as_dict(self):
+        data = {name: getattr(self, name) for name in self.COUNTERS}
+        data.update(hashes_per_second=self.hashes_per_second, diff=self.diff,
+                    column_changes=self.column_changes, samples=self.samples)
+        return data
+
+class Importer:
+    """Classify-then-write pipeline shared by the CSV imports.
+
+    parse() turns a CSV row into column values, or None when the row is
+    unusable. classify() matches the values by the natural `key` against
+    rows prefetched in one query and the rows seen earlier in the file:
+    new, changed or unchanged, or invalid for duplicates and clashes on
+    the `unique` columns. Only cells that are present and well-formed
+    take part, so a blank cell never counts as a change.
+
+    In 'insert' mode new rows are written in chunks and the rest skipped;
+    in 'validate' mode nothing is written or skipped and every row is
+    tallied into the result's diff. 'sync' (for importers listing it in `modes`) also
+    tallies, inserts new rows and updates just the changed columns of
+    changed ones, one executemany per distinct set of changed columns.
+    """
+    table = None
+    key = None
+    columns = ()  # compared/written besides the key
+    fields = ()  # optional (column, parser) pairs copied straight from the CSV
+    unique = ()  # other unique columns, checked against the database and the file
+    defaults = {}
+    modes = ('insert', 'validate')
+
+    def __init__(self, mode='insert', chunk_size=None):
+        if mode not in self.modes:
+            raise ValueError(f"Unsupported import mode: {mode}")
+        self.mode = mode
+        self.chunk_size = chunk_size or IMPORT_CHUNK_SIZE
+
+    def normalize(self, column, value):
+        return value
+
+    def describe(self, key):
+        return f"{self.key} '{key}'"
+
+    def sample_key(self, key):
+        return key
+
+    def prefetch(self):
+        wanted = ['id', self.key] + [c for c in self.unique if c != self.key]
+        if self.mode != 'insert':
+            wanted += [c for c in self.columns if c not in wanted]
+        key = self.table.c[self.key]
+        self.existing = {}
+        self.owners = {column: {} for column in self.unique}
+        for rec in db.session.execute(select(*[self.table.c[c] for c in wanted]).where(key.isnot(None))).mappings():
+            k = self.normalize(self.key, rec[self.key])
+            self.existing[k] = rec
+            for column in self.unique:
+                if rec[column] is not None:
+                    self.owners[column][self.normalize(column, rec[column])] = k
+        self.seen = {}
+
+    def parse(self, line, row, result):
+        raise NotImplementedError
+
+    def parse_fields(self, line, row, result):
+        """Optional columns; blank cells are left out and malformed ones reported and left out."""
+        values = {}
+        for column, kind in self.fields:
+            raw = (row.get(column) or '').strip()
+            if raw:
+                try:
+                    values[column] = PARSERS[kind](raw)
+                except ValueError:
+                    hint = ' (expected YYYY-MM-DD)' if kind == 'date' else ''
+                    result.error(line, f"invalid {column} '{raw}'{hint}")
+        return values
+
+    def parse_department(self, line, row, values, result):
+        """Resolve the department cell into values; False (row rejected) for an unknown department."""
+        department = (row.get('department') or '').strip()
+        if department:
+            department_id = self.departments.get(department.lower())
+            if department_id is None:
+                result.error(line, f"unknown department '{department}'")
+                return False
+            values['department_id'] = department_id
+        return True
+
+    def classify(self, line, row, result):
+        """(status, key, values, changes); status is new, changed, unchanged, invalid or,
+        in insert mode where existing rows are not compared, exists."""
+        values = self.parse(line, row, result)
+        if values is None:
+            return 'invalid', None, None, None
+        key = values.get(self.key)
+        if key is not None:
+            if key in self.seen:
+                result.error(line, f"duplicate {self.describe(key)} (first seen on row {self.seen[key]})")
+                return 'invalid', key, values, None
+            self.seen[key] = line
+        owner_key = key if key is not None else ('row', line)
+        for column in self.unique:
+            owner = self.owners[column].get(values.get(column))
+            if owner is not None and owner != owner_key:
+                result.error(line, f"{column} '{values[column]}' already exists")
+                return 'invalid', key, values, None
+        existing = self.existing.get(key) if key is not None else None
+        changes = None
+        if existing is None:
+            status = 'new'
+        elif self.mode == 'insert':
+            return 'exists', key, values, None
+        else:
+            changes = {c: (existing[c], v) for c, v in values.items()
+                       if c != self.key and c in existing and self.normalize(c, existing[c]) != v}
+            status = 'changed' if changes else 'unchanged'
+            if changes and self.mode == 'sync':
+                self.updates.append((existing['id'], {c: v for c, (_, v) in changes.items()}))
+        for column in self.unique:
+            if values.get(column) is not None:
+                self.owners[column][values[column]] = owner_key
+        return status, key, values, changes
+
+    def insert_row(self, values):
+        row = dict.fromkeys((self.key,) + tuple(self.columns))
+        row.update(values)
+        for column, default in self.defaults.items():
+            if row[column] is None:
+                row[column] = default
+        return row
+
+    def on_new(self, line, row, values, result):
+        pass
+
+    def close(self, result):
+        pass
+
+    def run(self, rows, result=None, start=0, on_chunk=None):
+        """Import or validate `rows` (dicts from csv.DictReader); the caller commits.
+
+        Rows numbered up to `start` are skipped. `on_chunk(line, result)` is
+        called after each chunk, at least every chunk_size rows, once rows
+        up to `line` have been written.
+        """
+        self.prefetch()
+        result = result or ImportResult()
+        pending = []
+        self.updates = []
+        checkpoint = line = start
+        try:
+            for line, row in enumerate(rows, start=1):
+                if line <= start:
+                    continue
+                status, key, values, changes = self.classify(line, row, result)
+                if self.mode != 'insert':
+                    result.tally(status, line, self.sample_key(key), changes)
+                if self.mode != 'validate' and status == 'new':
+                    pending.append(self.insert_row(values))
+                    self.on_new(line, row, values, result)
+                elif self.mode == 'insert' or (self.mode == 'sync' and status != 'changed'):
+                    result.skipped += 1
+                if (len(pending) + len(self.updates) >= self.chunk_size
+                        or (on_chunk and line - checkpoint >= self.chunk_size)):
+                    self.write(pending, result)
+                    pending = []
+                    if on_chunk:
+                        on_chunk(line, result)
+                    checkpoint = line
+            self.write(pending, result)
+            if on_chunk and line > checkpoint:
+                on_chunk(line, result)
+        finally:
+            self.close(result)
+        return result
+
+    def write(self, pending, result):
+        if pending:
+            self.insert(pending, result)
+        if self.updates:
+            self.update(self.updates, result)
+            self.updates = []
+
+    def insert(self, rows, result):
+        db.session.execute(self.table.insert(), rows)
+        result.created += len(rows)
+
+    def update(self, updates, result):
+        by_columns = {}
+        for id_, changed in updates:
+            by_columns.setdefault(tuple(sorted(changed)), []).append(dict(changed, b_id=id_))
+        for columns, params in by_columns.items():
+            stmt = (self.table.update().where(self.table.c.id == bindparam('b_id'))
+                    .values({c: bindparam(c) for c in columns}))
+            db.session.execute(stmt, params)
+        result.updated += len(updates)
+
+def department_ids():
+    return {name.lower(): id_ for id_, name in db.session.execute(select(Department.id, Department.name))}
+
+def _column_set(column):
+    return {v for (v,) in db.session.execute(select(column).where(column.isnot(None)))}
+
+class PersonImporter(Importer):
+    """Students and faculty: matched on email (or another of `keys`), department by name, optional login."""
+    model = None
+    role = None
+    keys = ('email',)
+    modes = IMPORT_MODES
+
+    def __init__(self, password_strategy='none', fixed_password='', fixed_password_hash=None, hasher=None,
+                 match_on='email', **kwargs):
+        super().__init__(**kwargs)
+        if match_on not in self.keys:
+            raise ValueError(f"Cannot match {self.model.__tablename__} rows on {match_on}")
+        self.key = match_on
+        # The natural keys not matched on must still stay unique
+        self.unique = tuple(c for c in self.keys if c != match_on)
+        self.password_strategy = password_strategy if password_strategy in PASSWORD_STRATEGIES else 'none'
+        self.fixed_password = fixed_password
+        # Jobs receive the fixed password already hashed so it is never stored in their params
+        self.fixed_password_hash = fixed_password_hash
+        self.hasher = hasher or PasswordHasher()
+        self.accounts = []
+
+    @property
+    def table(self):
+        return self.model.__table__
+
+    @property
+    def columns(self):
+        return ('email', 'name', 'phone', 'department_id') + tuple(c for c, _ in self.fields if c != self.key)
+
+    def normalize(self, column, value):
+        return value.lower() if column == 'email' else value
+
+    def prefetch(self):
+        super().prefetch()
+        self.departments = department_ids()
+        wants_accounts = self.password_strategy != 'none' and self.mode != 'validate'
+        self.usernames = _column_set(User.username) if wants_accounts else set()
+
+    def parse(self, line, row, result):
+        name = (row.get('name') or '').strip()
+        email = (row.get('email') or '').strip().lower()
+        phone = (row.get('phone') or '').strip()
+        if not name or not valid_email(email) or not valid_phone(phone):
+            result.error(line, 'invalid name/email/phone')
+            return None
+        values = {'name': name, 'email': email, 'phone': phone}
+        values.update(self.parse_fields(line, row, result))
+        if not self.parse_department(line, row, values, result):
+            return None
+        return values
+
+    def on_new(self, line, row, values, result):
+        self.queue_account(line, row, values['email'], result)
+
+    def queue_account(self, line, row, email, result):
+        if self.password_strategy == 'none':
+            return
+        if self.password_strategy == 'fixed' and self.fixed_password_hash:
+            if email in self.usernames:
+                result.error(line, f'User account for {email} already exists')
+            else:
+                self.usernames.add(email)
+                self.accounts.append((email, None))
+            return
+        password = {
+            'fixed': self.fixed_password,
+            'email': email,
+            'csv': (row.get('password') or '').strip(),
+        }[self.password_strategy]
+        if not password:
+            result.error(line, f"No password provided for strategy '{self.password_strategy}'")
+        elif email in self.usernames:
+            result.error(line, f'User account for {email} already exists')
+        else:
+            self.usernames.add(email)
+            self.accounts.append((email, password))
+
+    def insert(self, rows, result):
+        super().insert(rows, result)
+        if self.accounts:
+            hashes = iter(self.hasher.hash([p for _, p in self.accounts if p is not None]))
+            db.session.execute(User.__table__.insert(), [
+                {'username': username,
+                 'password_hash': next(hashes) if password is not None else self.fixed_password_hash,
+                 'role': self.role}
+                for username, password in self.accounts
+            ])
+            result.users_created += len(self.accounts)
+            self.accounts = []
+
+    def close(self, result):
+        self.hasher.close()
+        if self.hasher.count:
+            result.hashes_per_second = self.hasher.rate
+
+class StudentImporter(PersonImporter):
+    model = Student
+    role = 'student'
+    keys = ('email', 'registration_number', 'roll_number')
+    defaults = {'status': 'active'}
+    fields = (
+        ('registration_number', 'text'), ('roll_number', 'text'), ('gender', 'text'),
+        ('admission_date', 'date'), ('address', 'text'), ('date_of_birth', 'date'),
+        ('guardian_name', 'text'), ('guardian_phone', 'text'), ('guardian_email', 'text'),
+        ('status', 'text'), ('nationality', 'text'), ('blood_group', 'text'),
+        ('religion', 'text'), ('community', 'text'), ('sslc_marks', 'int'), ('hsc_marks', 'int'),
+        ('current_year', 'int'), ('section', 'text'), ('father_name', 'text'), ('mother_name', 'text'),
+        ('emergency_contact_name', 'text'), ('emergency_contact_phone', 'text'),
+        ('previous_school', 'text'), ('aadhar_no', 'text'), ('community_cert_no', 'text'),
+        ('annual_income', 'float'), ('income_cert_no', 'text'),
+    )
+
+class FacultyImporter(PersonImporter):
+    model = Faculty
+    role = 'faculty'
+    fields = (
+        ('designation', 'text'), ('specialization', 'text'), ('qualification', 'text'),
+        ('subject_expertise', 'text'), ('date_of_birth', 'date'), ('joining_date', 'date'),
+        ('pan_number', 'text'), ('aadhaar_number', 'text'), ('experience_years', 'int'),
+    )
+
+class SubjectImporter(Importer):
+    """Courses keyed by code; rows without a code are always new."""
+    table = Course.__table__
+    key = 'code'
+    fields = (
+        ('description', 'text'), ('credits', 'int'), ('room', 'text'),
+        ('capacity', 'int'), ('level', 'text'), ('syllabus_url', 'text'),
+        ('course_type', 'text'), ('academic_year', 'text'),
+    )
+    columns = ('name', 'faculty_id', 'department_id') + tuple(c for c, _ in fields)
+
+    def prefetch(self):
+        super().prefetch()
+        self.faculty = {email.lower(): id_ for id_, email in db.session.execute(select(Faculty.id, Faculty.email))}
+        self.departments = department_ids()
+
+    def parse(self, line, row, result):
+        name = (row.get('name') or '').strip()
+        faculty_email = (row.get('faculty_email') or '').strip().lower()
+        if not name or not valid_email(faculty_email):
+            result.error(line, 'missing name or invalid faculty_email')
+            return None
+        faculty_id = self.faculty.get(faculty_email)
+        if faculty_id is None:
+            result.error(line, f'faculty not found: {faculty_email}')
+            return None
+        values = {'name': name, 'code': (row.get('code') or '').strip() or None, 'faculty_id': faculty_id}
+        values.update(self.parse_fields(line, row, result))
+        if not self.parse_department(line, row, values, result):
+            return None
+        return values
+
+class EnrollmentImporter(Importer):
+    """Enrolments keyed by the (student, course) pair; an existing pair is unchanged."""
+    table = enrollments
+    key = 'pair'
+
+    def prefetch(self):
+        self.students = {email.lower(): id_ for id_, email in db.session.execute(select(Student.id, Student.email))}
+        self.courses = {code: id_ for id_, code in db.session.execute(
+            select(Course.id, Course.code).where(Course.code.isnot(None)))}
+        self.existing = {(sid, cid): {} for sid, cid in db.session.execute(
+            select(enrollments.c.student_id, enrollments.c.course_id))}
+        self.owners = {}
+        self.seen = {}
+
+    def parse(self, line, row, result):
+        student_email = (row.get('student_email') or '').strip().lower()
+        course_code = (row.get('course_code') or '').strip()
+        if not valid_email(student_email) or not course_code:
+            result.error(line, 'invalid student_email or missing course_code')
+            return None
+        student_id = self.students.get(student_email)
+        course_id = self.courses.get(course_code)
+        if student_id is None or course_id is None:
+            result.error(line, 'student or course not found')
+            return None
+        return {'pair': (student_id, course_id)}
+
+    def describe(self, key):
+        return 'enrollment'
+
+    def sample_key(self, key):
+        return None
+
+    def insert_row(self, values):
+        student_id, course_id = values['pair']
+        return {'student_id': student_id, 'course_id': course_id}
+
+IMPORTERS = {
+    'students': StudentImporter,
+    'faculties': FacultyImporter,
+    'subjects': SubjectImporter,
+    'enrollments': EnrollmentImporter,
+}
+
+# --- Background import jobs ---
+
+def spool_upload(file_storage):
+    """Save an upload under IMPORT_SPOOL_DIR without reading it into memory."""
+    spool_dir = app.config['IMPORT_SPOOL_DIR']
+    os.makedirs(spool_dir, exist_ok=True)
+    path = os.path.join(spool_dir, f'{uuid.uuid4().hex}.csv')
+    file_storage.save(path)
+    return path
+
+def submit_import(kind, file_storage, options=None, created_by=None):
+    if kind not in IMPORTERS:
+        raise ValueError(f"Unknown import: {kind}")
+    path = spool_upload(file_storage)
+    return submit_job('import_csv', {'kind': kind, 'path': path, 'options': options or {}}, created_by=created_by)
+
+def _save_checkpoint(job_id, line, total, state, result):
+    """Persist a chunk's errors and the job's checkpoint, then commit the chunk."""
+    if result.errors:
+        db.session.execute(ImportRowError.__table__.insert(), [
+            {'job_id': job_id, 'row': row, 'message': message} for row, message in result.errors])
+        result.errors = []
+    observe_import_rows(state['kind'], line - state.get('checkpoint', 0))
+    state.update(result.as_dict(), checkpoint=line)
+    table = BackgroundJob.__table__
+    db.session.execute(table.update().where(table.c.id == job_id).values(
+        progress=line, total=total, result=json.dumps(state, default=str), updated_at=datetime.utcnow()))
+    db.session.commit()
+
+@job_handler('import_csv')
+def run_import_job(progress, params):
+    job_id = progress.job_id
+    state = job_result(db.session.get(BackgroundJob, job_id)) or {}
+    path = params['path']
+    if not os.path.exists(path):
+        raise RuntimeError('The uploaded file is no longer available; upload it again.')
+    if 'rows' not in state:
+        rows_in_file = sum(1 for _ in iter_csv_file(path))
+        mode = params.get('options', {}).get('mode', 'insert')
+        # Validation writes nothing, so it checks the whole file however long
+        max_rows = rows_in_file if mode == 'validate' else int(app.config.get('MAX_BULK_IMPORT_ROWS', 50000))
+        state.update(kind=params['kind'], mode=mode, rows=min(rows_in_file, max_rows),
+                     truncated_from=rows_in_file if rows_in_file > max_rows else None)
+    total = state['rows']
+    importer = IMPORTERS[params['kind']](**params.get('options', {}))
+    result = ImportResult(**state)
+    importer.run(islice(iter_csv_file(path), total), result=result, start=state.get('checkpoint', 0),
+                 on_chunk=lambda line, r: _save_checkpoint(job_id, line, total, state, r))
+    state.update(result.as_dict(), checkpoint=total)
+    os.remove(path)
+    return state
+
+def import_errors(job_id):
+    return (db.session.query(ImportRowError.row, ImportRowError.message)
+            .filter(ImportRowError.job_id == job_id)
+            .order_by(ImportRowError.row.asc(), ImportRowError.id.asc()))
+
+@app.cli.command('resume-imports')
+def resume_imports_command():
+    """Finish import jobs that failed or whose worker died, in this process."""
+    jobs = BackgroundJob.query.filter(BackgroundJob.kind == 'import_csv',
+                                      BackgroundJob.status.in_(('failed', 'running'))).all()
+    resumed = 0
+    for job in jobs:
+        if job_resumable(job):
+            job = resume_job(job, inline=True)
+            click.echo(f'Import job {job.id}: {job.status}')
+            resumed += 1
+    click.echo(f'Resumed {resumed} import job(s).')
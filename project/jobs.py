@@ -0,0 +1,142 @@
+"""Background jobs.
+
+A job is a BackgroundJob row plus a handler registered with @job_handler.
+submit_job() stores the row and runs the handler on a small thread pool
+(or inline when JOBS_RUN_INLINE is set, as in tests). Handlers report
+progress through the JobProgress they are given and return a JSON-able
+result; the page that started the job polls job_status().
+"""
+from project import app, db
+from project.models import BackgroundJob
+from project.telemetry import observe_job
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import json
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+JOB_HANDLERS = {}
+_executor = None
+
+def job_handler(kind):
+    def decorator(fn):
+        JOB_HANDLERS[kind] = fn
+        return fn
+    return decorator
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=int(app.config.get('JOB_WORKERS', 2)),
+                                       thread_name_prefix='job')
+    return _executor
+
+class JobProgress:
+    """Progress reporter handed to a job handler.
+
+    Updates go through their own short transaction so they are visible to
+    pollers while the handler's own session work is still uncommitted, and
+    are throttled to whole-percent changes.
+    """
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self._last = None
+
+    def __call__(self, done, total):
+        percent = int(done * 100 / total) if total else 100
+        if percent == self._last:
+            return
+        self._last = percent
+        table = BackgroundJob.__table__
+        with db.engine.begin() as conn:
+            conn.execute(table.update().where(table.c.id == self.job_id)
+                         .values(progress=done, total=total, updated_at=datetime.utcnow()))
+
+def submit_job(kind, params, created_by=None):
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    job = BackgroundJob(kind=kind, status='queued', params=json.dumps(params), created_by=created_by)
+    db.session.add(job)
+    db.session.commit()
+    return _dispatch(job)
+
+def _dispatch(job, inline=None):
+    if inline is None:
+        inline = app.config.get('JOBS_RUN_INLINE')
+    if inline:
+        run_job(job.id)
+        db.session.expire(job)
+    else:
+        _get_executor().submit(_run_in_app_context, job.id)
+    return job
+
+def job_resumable(job, now=None):
+    """Failed, or still 'running' with no update for JOB_STALE_MINUTES (its worker died)."""
+    if job.status == 'failed':
+        return True
+    if job.status != 'running':
+        return False
+    stale = timedelta(minutes=int(app.config.get('JOB_STALE_MINUTES', 10)))
+    return (now or datetime.utcnow()) - job.updated_at > stale
+
+def resume_job(job, inline=None):
+    """Queue an interrupted job again; its handler picks up from its own checkpoint."""
+    if not job_resumable(job):
+        raise ValueError(f"Job {job.id} is {job.status} and cannot be resumed.")
+    job.status = 'queued'
+    job.error = None
+    job.finished_at = None
+    db.session.commit()
+    return _dispatch(job, inline)
+
+def _run_in_app_context(job_id):
+    with app.app_context():
+        try:
+            run_job(job_id)
+        finally:
+            db.session.remove()
+
+def run_job(job_id):
+    """Execute a queued job in the current app context and record the outcome."""
+    job = db.session.get(BackgroundJob, job_id)
+    if job is None or job.status != 'queued':
+        return job
+    job.status = 'running'
+    db.session.commit()
+    started = time.perf_counter()
+    try:
+        outcome = JOB_HANDLERS[job.kind](JobProgress(job_id), json.loads(job.params or '{}'))
+        status, result = outcome if isinstance(outcome, tuple) else ('done', outcome)
+        job = db.session.get(BackgroundJob, job_id, populate_existing=True)
+        job.progress = job.total
+        job.status = status
+        job.result = json.dumps(result, default=str)
+    except Exception as e:
+        logger.exception("job %s (%s) failed", job_id, job.kind)
+        db.session.rollback()
+        job = db.session.get(BackgroundJob, job_id, populate_existing=True)
+        job.status = 'failed'
+        job.error = str(e)
+    job.finished_at = datetime.utcnow()
+    db.session.commit()
+    observe_job(job.kind, job.status, time.perf_counter() - started)
+    return job
+
+def job_result(job):
+    return json.loads(job.result) if job.result else None
+
+def job_status(job):
+    """JSON-able status for polling."""
+    return {
+        'id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'progress': job.progress,
+        'total': job.total,
+        'percent': job.percent,
+        'finished': job.finished,
+        'error': job.error,
+    }
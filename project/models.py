@@ -3,7 +3,9 @@ from datetime import datetime
 
 enrollments = db.Table('enrollments',
     db.Column('student_id', db.Integer, db.ForeignKey('student.id'), primary_key=True),
-    db.Column('course_id', db.Integer, db.ForeignKey('course.id'), primary_key=True)
+    db.Column('course_id', db.Integer, db.ForeignKey('course.id'), primary_key=True),
+    # The primary key leads with student_id; rosters look up by course
+    db.Index('ix_enrollments_course_student', 'course_id', 'student_id'),
 )
 
 class Department(db.Model):
@@ -96,6 +98,7 @@ class Student(db.Model):
     invoices = db.relationship('Invoice', backref='student', lazy=True, cascade="all, delete-orphan")
     payments = db.relationship('FeePayment', backref='student', lazy=True, cascade="all, delete-orphan")
     parent_links = db.relationship('ParentStudentLink', backref='student', lazy=True, cascade="all, delete-orphan")
+    metrics = db.relationship('StudentMetrics', backref='student', lazy=True, uselist=False, cascade="all, delete-orphan")
 
 class Faculty(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -148,6 +151,11 @@ class Course(db.Model):
     syllabus_progress = db.Column(db.Integer, default=0) # 0 to 100
     section_name = db.Column(db.String(50)) # e.g. Batch 2024-A
 
+    __table_args__ = (
+        db.Index('ix_course_faculty_id', 'faculty_id'),
+        db.Index('ix_course_department_id', 'department_id'),
+    )
+
     sessions = db.relationship('CourseSession', backref='course', lazy=True, cascade="all, delete-orphan")
     grades = db.relationship('Grade', backref='course', lazy=True, cascade="all, delete-orphan")
     materials = db.relationship('CourseMaterial', backref='course', lazy=True, cascade="all, delete-orphan")
@@ -180,7 +188,11 @@ class CourseSession(db.Model):
     location = db.Column(db.String(100))
     title = db.Column(db.String(120), nullable=True)
     attendances = db.relationship('Attendance', backref='session', lazy=True, cascade="all, delete-orphan")
-    __table_args__ = (db.UniqueConstraint('course_id', 'session_date', name='uix_course_session_date'),)
+    __table_args__ = (
+        db.UniqueConstraint('course_id', 'session_date', name='uix_course_session_date'),
+        # Week/month views filter on the date across all courses
+        db.Index('ix_course_session_date', 'session_date'),
+    )
 
     def __repr__(self):
         return f"CourseSession(course_id={self.course_id}, date='{self.session_date}', title='{self.title}')"
@@ -205,7 +217,10 @@ class Attendance(db.Model):
     marked_at = db.Column(db.DateTime, default=datetime.utcnow)
     marked_by = db.Column(db.String(120), nullable=True)
     # student relationship provided by backref in Student
-    __table_args__ = (db.UniqueConstraint('session_id', 'student_id', name='uix_attendance_session_student'),)
+    __table_args__ = (
+        db.UniqueConstraint('session_id', 'student_id', name='uix_attendance_session_student'),
+        db.Index('ix_attendance_student_session', 'student_id', 'session_id'),
+    )
 
     def __repr__(self):
         return f"Attendance(session_id={self.session_id}, student_id={self.student_id}, status='{self.status}')"
@@ -219,6 +234,8 @@ class FacultyLeave(db.Model):
     approved = db.Column(db.Boolean, default=True)
     approved_by = db.Column(db.String(80), nullable=True)
 
+    __table_args__ = (db.Index('ix_faculty_leave_faculty_start', 'faculty_id', 'start_date'),)
+
     def __repr__(self):
         return f"FacultyLeave(faculty_id={self.faculty_id}, {self.start_date}->{self.end_date}, approved={self.approved})"
 
@@ -236,6 +253,12 @@ class Grade(db.Model):
     academic_year = db.Column(db.String(20))
     remarks = db.Column(db.Text)
     recorded_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_grade_student_course', 'student_id', 'course_id'),
+        db.Index('ix_grade_course_exam', 'course_id', 'exam_id'),
+        db.Index('ix_grade_exam_student', 'exam_id', 'student_id'),
+    )
     
     exam = db.relationship('Exam', backref=db.backref('grades', lazy=True))
 
@@ -302,6 +325,8 @@ class Exam(db.Model):
     exam_date = db.Column(db.DateTime, nullable=False)
     location = db.Column(db.String(100))
     max_marks = db.Column(db.Integer, default=100)
+
+    __table_args__ = (db.Index('ix_exam_course_date', 'course_id', 'exam_date'),)
     
     course = db.relationship('Course', backref=db.backref('exams', lazy=True))
 
@@ -317,6 +342,12 @@ class AuditLog(db.Model):
     details = db.Column(db.Text, nullable=True)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index('ix_audit_log_created_at', 'created_at'),
+        db.Index('ix_audit_log_action_created', 'action', 'created_at'),
+        db.Index('ix_audit_log_actor_created', 'actor_username', 'created_at'),
+    )
+
     def __repr__(self):
         return f"AuditLog(action='{self.action}', actor='{self.actor_username}', target='{self.target}')"
 
@@ -342,6 +373,11 @@ class FeePayment(db.Model):
     currency = db.Column(db.String(10), nullable=False, default='USD')
     status = db.Column(db.String(20), nullable=True)
 
+    __table_args__ = (
+        db.Index('ix_fee_payment_student_paid', 'student_id', 'paid_at'),
+        db.Index('ix_fee_payment_paid_at', 'paid_at'),
+    )
+
     def __repr__(self):
         return f"FeePayment(student_id={self.student_id}, amount={self.amount}, method='{self.method}', paid_at='{self.paid_at}')"
 
@@ -389,7 +425,11 @@ class ResourceBooking(db.Model):
     end_time = db.Column(db.DateTime, nullable=False)
     booked_by = db.Column(db.String(80), nullable=True)  # username
     resource = db.relationship('Resource', backref=db.backref('bookings', lazy=True), lazy=True)
-    __table_args__ = (db.UniqueConstraint('resource_id', 'start_time', 'end_time', name='uix_resource_time_window'),)
+    __table_args__ = (
+        db.UniqueConstraint('resource_id', 'start_time', 'end_time', name='uix_resource_time_window'),
+        db.Index('ix_resource_booking_start_time', 'start_time'),
+        db.Index('ix_resource_booking_end_time', 'end_time'),
+    )
     purpose = db.Column(db.String(120), nullable=True)
     status = db.Column(db.String(20), nullable=False, default='pending')
 
@@ -441,6 +481,8 @@ class Invoice(db.Model):
     discount_percent = db.Column(db.Float, nullable=True)
     tax_percent = db.Column(db.Float, nullable=True)
 
+    __table_args__ = (db.Index('ix_invoice_student_issued', 'student_id', 'issued_at'),)
+
     @property
     def is_overdue(self):
         return self.due_date is not None and datetime.utcnow().date() > self.due_date and self.status != 'paid'
@@ -457,6 +499,11 @@ class Notification(db.Model):
     read = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index('ix_notification_recipient_created', 'recipient_id', 'created_at'),
+        db.Index('ix_notification_created_at', 'created_at'),
+    )
+
     def __repr__(self):
         return f"Notification(recipient='{self.recipient_id}', title='{self.title}')"
 
@@ -470,11 +517,106 @@ class Notice(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     expires_at = db.Column(db.DateTime, nullable=True)
 
+    __table_args__ = (db.Index('ix_notice_expires_at', 'expires_at'),)
+
     department = db.relationship('Department', backref='notices')
 
     def __repr__(self):
         return f"Notice(title='{self.title}', target='{self.target_role}')"
 
+# Per-student rollup of GPA, attendance and fee totals.
+# Maintained by project.student_metrics on every flush; never edit by hand.
+class StudentMetrics(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    student_id = db.Column(db.Integer, db.ForeignKey('student.id'), unique=True, nullable=False)
+    # Credit-weighted grade point sums: all grades, and final grades only (no exam)
+    gpa_points = db.Column(db.Float, nullable=False, default=0.0)
+    gpa_credits = db.Column(db.Integer, nullable=False, default=0)
+    final_points = db.Column(db.Float, nullable=False, default=0.0)
+    final_credits = db.Column(db.Integer, nullable=False, default=0)
+    attendance_total = db.Column(db.Integer, nullable=False, default=0)
+    attendance_present = db.Column(db.Integer, nullable=False, default=0)
+    attendance_late = db.Column(db.Integer, nullable=False, default=0)
+    attendance_absent = db.Column(db.Integer, nullable=False, default=0)
+    attendance_excused = db.Column(db.Integer, nullable=False, default=0)
+    invoiced_total = db.Column(db.Float, nullable=False, default=0.0)
+    paid_total = db.Column(db.Float, nullable=False, default=0.0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    @property
+    def gpa(self):
+        return (self.gpa_points / self.gpa_credits) if self.gpa_credits else None
+
+    @property
+    def cgpa(self):
+        return (self.final_points / self.final_credits) if self.final_credits else None
+
+    @property
+    def attendance_rate(self):
+        if not self.attendance_total:
+            return 0.0
+        return (self.attendance_present + self.attendance_late) / self.attendance_total * 100.0
+
+    @property
+    def attendance_counts(self):
+        return {
+            'present': self.attendance_present,
+            'absent': self.attendance_absent,
+            'late': self.attendance_late,
+            'excused': self.attendance_excused,
+        }
+
+    @property
+    def outstanding(self):
+        return max(self.invoiced_total - self.paid_total, 0.0)
+
+    def __repr__(self):
+        return f"StudentMetrics(student_id={self.student_id}, gpa={self.gpa}, attendance={self.attendance_rate:.1f})"
+
+# Applied schema migrations; see project.schema
+class SchemaVersion(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, unique=True)
+    description = db.Column(db.String(200), nullable=True)
+    applied_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"SchemaVersion({self.version}, '{self.description}')"
+
+# Long-running work executed off the request thread; see project.jobs
+class BackgroundJob(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False, index=True)
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, preview, done, failed
+    progress = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    params = db.Column(db.Text, nullable=True)  # JSON
+    result = db.Column(db.Text, nullable=True)  # JSON
+    error = db.Column(db.Text, nullable=True)
+    created_by = db.Column(db.String(120), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    @property
+    def percent(self):
+        if not self.total:
+            return 100 if self.status in ('preview', 'done') else 0
+        return min(100, int(self.progress * 100 / self.total))
+
+    @property
+    def finished(self):
+        return self.status in ('preview', 'done', 'failed')
+
+    def __repr__(self):
+        return f"BackgroundJob({self.id}, kind='{self.kind}', status='{self.status}')"
+
+class ImportRowError(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.Integer, db.ForeignKey('background_job.id'), nullable=False, index=True)
+    row = db.Column(db.Integer, nullable=False)  # 1-based data row in the uploaded CSV
+    message = db.Column(db.Text, nullable=False)
+
 # Convenience display helpers
 def student_display_name(student: Student) -> str:
     if getattr(student, 'roll_number', None):
@@ -484,3 +626,15 @@ def student_display_name(student: Student) -> str:
 
 
 
+
+GRADE_POINTS = {
+    'A+': 4.0, 'A': 4.0,
+    'A-': 3.7,
+    'B+': 3.3, 'B': 3.0, 'B-': 2.7,
+    'C+': 2.3, 'C': 2.0, 'C-': 1.7,
+    'D+': 1.3, 'D': 1.0,
+    'F': 0.0
+}
+
+def grade_points(letter: str) -> float:
+    return GRADE_POINTS.get(letter.upper(), 0.0)
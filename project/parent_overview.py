@@ -0,0 +1,62 @@
+"""Parent-facing overview of linked children.
+
+Everything a parent page shows about their children comes from a fixed
+number of statements, however many children or grades there are: one for
+the children with their metrics rollup rows, one for their courses (with
+each course's faculty). GPA, attendance and outstanding fees are read from
+the rollup; a child without a rollup row yet is computed on the fly.
+"""
+from project import db
+from project.models import Course, ParentStudentLink, Student, StudentMetrics, enrollments
+from project.student_metrics import METRIC_COLUMNS, metrics_for
+from sqlalchemy import select
+from sqlalchemy.orm import contains_eager
+
+def linked_students(parent_username):
+    """[(Student, StudentMetrics or None)] for the parent's children, in link order."""
+    return db.session.execute(
+        select(Student, StudentMetrics)
+        .join(ParentStudentLink, ParentStudentLink.student_id == Student.id)
+        .outerjoin(StudentMetrics, StudentMetrics.student_id == Student.id)
+        .where(ParentStudentLink.parent_username == parent_username)
+        .order_by(ParentStudentLink.id)
+    ).all()
+
+def courses_by_student(student_ids):
+    """{student_id: [Course]} with each course's faculty loaded, ordered by course id."""
+    found = {sid: [] for sid in student_ids}
+    if not found:
+        return found
+    rows = db.session.execute(
+        select(enrollments.c.student_id, Course)
+        .join(Course, Course.id == enrollments.c.course_id)
+        .outerjoin(Course.faculty)
+        .options(contains_eager(Course.faculty))
+        .where(enrollments.c.student_id.in_(found))
+        .order_by(enrollments.c.student_id, Course.id)
+    ).all()
+    for sid, course in rows:
+        found[sid].append(course)
+    return found
+
+def parent_overview(parent_username, courses_per_child=3):
+    """One dashboard entry per child: student, GPA, attendance rate, outstanding fees and first courses."""
+    children = linked_students(parent_username)
+    missing = [s.id for s, m in children if m is None]
+    computed = metrics_for(missing) if missing else {}
+    courses = courses_by_student([s.id for s, _ in children])
+    overview = []
+    for student, metrics in children:
+        metrics = metrics or computed.get(student.id) or StudentMetrics(
+            student_id=student.id, **{c: 0 for c in METRIC_COLUMNS})
+        overview.append({
+            'student': student,
+            'gpa': metrics.gpa,
+            'attendance_rate': metrics.attendance_rate,
+            'outstanding': metrics.outstanding,
+            'courses': courses[student.id][:courses_per_child],
+        })
+    return overview
+
+def department_ids(students):
+    return sorted({s.department_id for s in students if s.department_id})
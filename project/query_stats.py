@@ -0,0 +1,137 @@
+"""Per-request SQL statement counting and N+1 detection.
+
+Cursor-execute listeners on every Engine feed the collectors that are
+active on the current thread: one per request (opened in before_request,
+closed in teardown so streamed responses are counted to the end) plus any
+opened with capture_queries(). Statements are grouped by shape (the SQL
+with literals and IN-lists collapsed); a shape issued QUERY_REPEAT_THRESHOLD
+times or more in one request is reported as a likely N+1.
+
+Results surface as a warning in the log, as X-Query-* response headers
+when QUERY_STATS_HEADER is on (development and tests), and as a panel
+appended to HTML pages when QUERY_DEBUG_PANEL is on.
+"""
+from project import app
+from flask import g, render_template, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from contextlib import contextmanager
+from contextvars import ContextVar
+import logging
+import re
+import time
+
+logger = logging.getLogger(__name__)
+
+# Statements kept verbatim per collector (for the debug panel); counts and timings cover all of them
+MAX_RECORDED_STATEMENTS = 500
+
+_active = ContextVar('query_stats_active', default=())
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+def statement_shape(statement):
+    """`statement` with literals and expanded IN-lists collapsed, so a loop's queries share one shape."""
+    shape = _STRING_LITERAL.sub('?', statement)
+    shape = _NUMBER_LITERAL.sub('?', shape)
+    shape = _IN_LIST.sub('(?...)', shape)
+    return _WHITESPACE.sub(' ', shape).strip()
+
+class QueryStats:
+    """Statement count, time and per-shape tallies for one request or capture block."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes = {}
+        self.statements = []
+
+    def record(self, statement, seconds):
+        self.count += 1
+        self.seconds += seconds
+        shape = statement_shape(statement)
+        tally = self.shapes.setdefault(shape, [0, 0.0])
+        tally[0] += 1
+        tally[1] += seconds
+        if len(self.statements) < MAX_RECORDED_STATEMENTS:
+            self.statements.append((statement, seconds))
+
+    def repeated(self, threshold=None):
+        """[(shape, count, seconds)] for shapes issued at least `threshold` times, most frequent first."""
+        if threshold is None:
+            threshold = int(app.config.get('QUERY_REPEAT_THRESHOLD', 5))
+        hits = [(shape, n, s) for shape, (n, s) in self.shapes.items() if n >= threshold]
+        return sorted(hits, key=lambda h: (-h[1], -h[2]))
+
+@contextmanager
+def capture_queries():
+    """Collect the statements executed on this thread inside the block.
+
+        with capture_queries() as stats:
+            client.get('/dashboard')
+        self.assertLessEqual(stats.count, 20)
+    """
+    stats = QueryStats()
+    _active.set(_active.get() + (stats,))
+    try:
+        yield stats
+    finally:
+        _active.set(tuple(s for s in _active.get() if s is not stats))
+
+# The start time lives on the statement's ExecutionContext, so a statement
+# that raises (and never reaches after_cursor_execute) leaves nothing behind
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _active.get() and context is not None:
+        context.query_stats_start = time.perf_counter()
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    collectors = _active.get()
+    started = getattr(context, 'query_stats_start', None)
+    if not collectors or started is None:
+        return
+    elapsed = time.perf_counter() - started
+    for stats in collectors:
+        stats.record(statement, elapsed)
+
+@app.before_request
+def _start_query_stats():
+    if not app.config.get('QUERY_STATS_ENABLED', True):
+        return
+    stats = QueryStats()
+    g.query_stats = stats
+    _active.set(_active.get() + (stats,))
+
+@app.after_request
+def _report_query_stats(response):
+    stats = g.get('query_stats')
+    if stats is None:
+        return response
+    repeated = stats.repeated()
+    if app.config.get('QUERY_STATS_HEADER'):
+        response.headers['X-Query-Count'] = str(stats.count)
+        response.headers['X-Query-Time-Ms'] = f'{stats.seconds * 1000:.1f}'
+        response.headers['X-Query-Repeats'] = str(len(repeated))
+    if (app.config.get('QUERY_DEBUG_PANEL') and response.mimetype == 'text/html'
+            and not response.is_streamed and not response.direct_passthrough):
+        body = response.get_data(as_text=True)
+        marker = body.rfind('</body>')
+        if marker != -1:
+            panel = render_template('query_panel.html', stats=stats, repeated=repeated)
+            response.set_data(body[:marker] + panel + body[marker:])
+    return response
+
+@app.teardown_request
+def _finish_query_stats(exc):
+    stats = g.get('query_stats')
+    if stats is None:
+        return
+    _active.set(tuple(s for s in _active.get() if s is not stats))
+    endpoint = request.endpoint or request.path
+    for shape, n, seconds in stats.repeated():
+        logger.warning("Possible N+1 on %s: %d x %.1fms %s", endpoint, n, seconds * 1000, shape[:300])
+    logger.debug("%s %s: %d statements in %.1fms", request.method, endpoint, stats.count, stats.seconds * 1000)
@@ -1,11 +1,22 @@
-from flask import render_template, url_for, flash, redirect, request, jsonify, session, Response
+from flask import render_template, url_for, flash, redirect, request, jsonify, session, Response, abort
 from project import app, db
 import logging
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
-from project.models import Student, Faculty, Course, User, CourseSession, Attendance, Grade, AdmissionApplication, AuditLog, FeeAccount, FeePayment, BudgetCategory, BudgetTransaction, Resource, ResourceBooking, ResourceBookingApproval, Invoice, ParentStudentLink, UserPhoto, Department, Semester, Subject, Exam, Notice, FacultyLeave
+from project.models import Student, Faculty, Course, User, CourseSession, Attendance, Grade, AdmissionApplication, AuditLog, FeeAccount, FeePayment, BudgetCategory, BudgetTransaction, Resource, ResourceBooking, ResourceBookingApproval, Invoice, ParentStudentLink, UserPhoto, Department, Semester, Subject, Exam, Notice, Notification, FacultyLeave, BackgroundJob, enrollments, grade_points
+from project.analytics import compute_analytics
+from project.dashboard_metrics import admin_dashboard_metrics
+from project.faculty_overview import faculty_attendance_summary, faculty_overview
+from project.parent_overview import department_ids as parent_department_ids, linked_students, parent_overview
+from project.student_metrics import metrics_for_student, refresh_student_metrics
+from project.scheduling import CoursePlanner, generate_timetable, save_sessions, semester_bounds, apply_semester_plan, StalePlanError
+from project.jobs import submit_job, job_status, job_result, job_resumable, resume_job
+from project.exports import csv_response, format_timestamp, streamed
+from project.importer import IMPORTERS, FacultyImporter, StudentImporter, submit_import, import_errors
+from project.telemetry import observe_notifications, render_metrics
+from project.attendance import ATTENDANCE_STATUSES, enrolled_student_ids, marking_closed, parse_roster, save_attendance, monthly_attendance_matrix, monthly_attendance_csv, low_attendance, queue_low_attendance_notifications
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy import or_, and_, func, extract
+from sqlalchemy import or_
 from werkzeug.security import check_password_hash, generate_password_hash
 from werkzeug.utils import secure_filename
 from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
@@ -16,6 +27,7 @@ import re
 from datetime import datetime, timedelta
 from io import StringIO
 import csv
+import json
 
 @app.route("/")
 def index():
@@ -231,7 +243,7 @@ def assign_tutor(student):
         return faculty_member
     return None
 
-def get_recent_notices(role, user_email, limit=3):
+def get_recent_notices(role, user_email, limit=3, department_ids=None):
     today = datetime.utcnow()
     query = Notice.query.filter((Notice.expires_at == None) | (Notice.expires_at > today))
     
@@ -250,10 +262,9 @@ def get_recent_notices(role, user_email, limit=3):
             ((Notice.department_id == None) | (Notice.department_id == dept_id))
         )
     elif role == 'parent':
-        links = ParentStudentLink.query.filter_by(parent_username=user_email).all()
-        student_ids = [l.student_id for l in links]
-        students = Student.query.filter(Student.id.in_(student_ids)).all()
-        dept_ids = [s.department_id for s in students if s.department_id]
+        if department_ids is None:
+            department_ids = parent_department_ids(s for s, _ in linked_students(user_email))
+        dept_ids = department_ids
         query = query.filter(
             (Notice.target_role.in_(['all', 'parent'])) & 
             ((Notice.department_id == None) | (Notice.department_id.in_(dept_ids)))
@@ -273,42 +284,12 @@ def dashboard():
             photo = UserPhoto.query.filter_by(username=student.email).first()
             photo_url = url_for('static', filename=photo.file_path.lstrip('/')) if photo else None
             
-            # 1. GPA
-            grades = Grade.query.filter_by(student_id=student.id).all()
-            total_pts = 0.0
-            total_cr = 0
-            for g in grades:
-                # helper grade_points must be available in scope
-                pts = g.points if g.points is not None else grade_points(g.letter)
-                course = Course.query.get(g.course_id)
-                cr = course.credits or 1
-                total_pts += pts * cr
-                total_cr += cr
-            gpa = (total_pts / total_cr) if total_cr > 0 else None
-            
-            # 2. Attendance
-            # Get all sessions for enrolled courses
-            sessions_all = []
-            for c in student.courses:
-                sessions_all.extend(c.sessions)
-            session_ids = [s.id for s in sessions_all]
-            attendance_rate = 0.0
-            attendance_counts = {'present': 0, 'absent': 0, 'late': 0, 'excused': 0}
-            if session_ids:
-                recs = Attendance.query.filter(Attendance.session_id.in_(session_ids), Attendance.student_id == student.id).all()
-                if recs:
-                    for r in recs:
-                        if r.status in attendance_counts:
-                            attendance_counts[r.status] += 1
-                    present_late = attendance_counts['present'] + attendance_counts['late']
-                    attendance_rate = (present_late / len(recs)) * 100.0
-            
-            # 3. Fees
-            invoices = Invoice.query.filter_by(student_id=student.id).all()
-            payments = FeePayment.query.filter_by(student_id=student.id).all()
-            total_due = sum(inv.amount_due for inv in invoices)
-            total_paid = sum(p.amount for p in payments)
-            outstanding = max(total_due - total_paid, 0.0)
+            # 1-3. GPA, attendance and fees from the metrics rollup
+            metrics = metrics_for_student(student.id)
+            gpa = metrics.gpa
+            attendance_rate = metrics.attendance_rate
+            attendance_counts = metrics.attendance_counts
+            outstanding = metrics.outstanding
             
             # 4. Upcoming Sessions
             today = datetime.today().date()
@@ -340,57 +321,16 @@ def dashboard():
             photo = UserPhoto.query.filter_by(username=faculty_member.email).first()
             photo_url = url_for('static', filename=photo.file_path.lstrip('/')) if photo else None
             
-            # 1. Active Subjects
-            my_courses = Course.query.filter_by(faculty_id=faculty_member.id).all()
-            active_courses_count = len(my_courses)
-            
-            # 2. Weekly Hours
-            today = datetime.today().date()
-            week_start = today - timedelta(days=today.weekday())
-            week_end = week_start + timedelta(days=6)
-            
-            sessions_week = CourseSession.query.join(Course).filter(
-                Course.faculty_id == faculty_member.id,
-                CourseSession.session_date >= week_start,
-                CourseSession.session_date <= week_end
-            ).all()
-            
-            default_hours = int(app.config.get('SESSION_DEFAULT_DURATION_HOURS', 1))
-            weekly_hours = len(sessions_week) * default_hours
+            # Active subjects, weekly load, upcoming and recent sessions with attendance stats
+            overview = faculty_overview(faculty_member.id)
+            active_courses_count = overview['active_courses_count']
+            weekly_hours = overview['weekly_hours']
             max_weekly_hours = int(app.config.get('FACULTY_MAX_HOURS_PER_WEEK', 30))
+            upcoming_sessions = overview['upcoming_sessions']
+            recent_sessions = overview['recent_sessions']
             
-            # 3. Pending Leaves
+            # Pending Leaves
             pending_leaves_count = FacultyLeave.query.filter_by(faculty_id=faculty_member.id, approved=False).count()
-            
-            # 4. Upcoming Sessions
-            upcoming_sessions = CourseSession.query.join(Course).filter(
-                Course.faculty_id == faculty_member.id,
-                CourseSession.session_date >= today
-            ).order_by(CourseSession.session_date.asc()).limit(5).all()
-            
-            # 5. Recent Sessions (for attendance)
-            week_ago = today - timedelta(days=7)
-            recent_sessions_objs = CourseSession.query.join(Course).filter(
-                Course.faculty_id == faculty_member.id,
-                CourseSession.session_date < today,
-                CourseSession.session_date >= week_ago
-            ).order_by(CourseSession.session_date.desc()).all()
-            
-            recent_sessions = []
-            for s in recent_sessions_objs:
-                recs = Attendance.query.filter_by(session_id=s.id).all()
-                marked = len(recs) > 0
-                present = sum(1 for r in recs if r.status == 'present')
-                late = sum(1 for r in recs if r.status == 'late')
-                total = len(recs)
-                recent_sessions.append({
-                    'id': s.id,
-                    'course': s.course,
-                    'session_date': s.session_date,
-                    'title': s.title,
-                    'attendance_marked': marked,
-                    'stats': f"{present}P, {late}L / {total}" if marked else ""
-                })
 
             recent_notices = get_recent_notices(session.get('role'), session.get('user'))
 
@@ -408,99 +348,38 @@ def dashboard():
 
     # Parent View
     if session.get('role') == 'parent':
-        user_email = session.get('user')
-        links = ParentStudentLink.query.filter_by(parent_username=user_email).all()
-        children_data = []
-        for link in links:
-            student = Student.query.get(link.student_id)
-            if student:
-                # 1. GPA
-                grades = Grade.query.filter_by(student_id=student.id).all()
-                total_pts = 0.0
-                total_cr = 0
-                for g in grades:
-                    pts = g.points if g.points is not None else grade_points(g.letter)
-                    course = Course.query.get(g.course_id)
-                    cr = course.credits or 1
-                    total_pts += pts * cr
-                    total_cr += cr
-                gpa = (total_pts / total_cr) if total_cr > 0 else None
-                
-                # 2. Attendance
-                sessions_all = []
-                for c in student.courses:
-                    sessions_all.extend(c.sessions)
-                session_ids = [s.id for s in sessions_all]
-                attendance_rate = 0.0
-                if session_ids:
-                    recs = Attendance.query.filter(Attendance.session_id.in_(session_ids), Attendance.student_id == student.id).all()
-                    if recs:
-                        present_late = sum(1 for r in recs if r.status in ('present', 'late'))
-                        attendance_rate = (present_late / len(recs)) * 100.0
-                
-                # 3. Fees
-                invoices = Invoice.query.filter_by(student_id=student.id).all()
-                payments = FeePayment.query.filter_by(student_id=student.id).all()
-                total_due = sum(inv.amount_due for inv in invoices)
-                total_paid = sum(p.amount for p in payments)
-                outstanding = max(total_due - total_paid, 0.0)
-                
-                children_data.append({
-                    'student': student,
-                    'gpa': gpa,
-                    'attendance_rate': attendance_rate,
-                    'outstanding': outstanding,
-                    'courses': student.courses[:3] # Show first 3 subjects for overview
-                })
-        
-        recent_notices = get_recent_notices('parent', session.get('user'))
+        # Children, their metrics and courses in a fixed number of queries
+        children_data = parent_overview(session.get('user'))
+        recent_notices = get_recent_notices('parent', session.get('user'),
+                                            department_ids=parent_department_ids(c['student'] for c in children_data))
         
         return render_template('parent_dashboard.html', 
                                title='Parent Dashboard',
                                children_data=children_data,
                                recent_notices=recent_notices)
 
-    # Dashboard metrics for Admin/Staff
-    student_count = Student.query.count()
-    faculty_count = Faculty.query.count()
-    course_count = Course.query.count()
+    # Dashboard metrics for Admin/Staff: a few grouped statements, cached for DASHBOARD_METRICS_TTL
+    metrics = admin_dashboard_metrics()
+    student_count = metrics['student_count']
+    faculty_count = metrics['faculty_count']
+    course_count = metrics['course_count']
     
     # Growth metrics (mocking diffs for UI)
-    student_diff = AdmissionApplication.query.filter(AdmissionApplication.status == 'enrolled').count()
+    student_diff = metrics['enrolled_admissions']
     faculty_diff = 8 # Mocking as requested by image
     
     # Finance metrics
-    total_due = db.session.query(func.sum(Invoice.amount_due)).scalar() or 0.0
-    total_paid = db.session.query(func.sum(Invoice.paid_amount)).scalar() or 0.0
+    total_due = metrics['total_due']
+    total_paid = metrics['total_paid']
     fee_collection_text = f"₹{(total_paid/10000000):.1f} Cr" # Mocking Cr format from image
     fee_pending_text = f"₹{((total_due - total_paid)/10000000):.1f} Cr pending"
     
-    # Attendance metrics
-    total_att = Attendance.query.count()
-    present_late_att = Attendance.query.filter(Attendance.status.in_(('present', 'late'))).count()
-    attendance_rate = (present_late_att / total_att * 100) if total_att else 0
-    
-    # Department-wise attendance
-    dept_attendance = []
-    departments = Department.query.all()
-    for dept in departments:
-        # Get all students in this dept
-        dept_student_ids = [s.id for s in dept.students]
-        if dept_student_ids:
-            dept_att_total = Attendance.query.filter(Attendance.student_id.in_(dept_student_ids)).count()
-            dept_att_present = Attendance.query.filter(Attendance.student_id.in_(dept_student_ids), Attendance.status.in_(('present', 'late'))).count()
-            rate = (dept_att_present / dept_att_total * 100) if dept_att_total else 0
-            dept_attendance.append({'name': dept.name, 'rate': round(rate)})
+    # Attendance metrics, overall and department-wise
+    attendance_rate = metrics['attendance_rate']
+    dept_attendance = metrics['dept_attendance']
     
     # Recent admissions
-    recent_admissions = []
-    latest_students = Student.query.order_by(Student.admission_date.desc()).limit(5).all()
-    for s in latest_students:
-        recent_admissions.append({
-            'name': s.name,
-            'dept': s.department.name if s.department else 'General',
-            'status': s.status.capitalize()
-        })
+    recent_admissions = metrics['recent_admissions']
         
     # Upcoming events (Mocking for UI completeness)
     upcoming_events = [
@@ -543,10 +422,6 @@ def calendar():
     user_email = session.get('user')
     
     if role == 'parent':
-        try:
-            db.create_all()
-        except Exception:
-            pass
         links = ParentStudentLink.query.filter_by(parent_username=user_email).all()
         student_ids = [l.student_id for l in links]
         # Filter sessions for courses where any of the parent's children are enrolled
@@ -613,10 +488,7 @@ def notices():
             ((Notice.department_id == None) | (Notice.department_id == dept_id))
         )
     elif role == 'parent':
-        links = ParentStudentLink.query.filter_by(parent_username=user_email).all()
-        student_ids = [l.student_id for l in links]
-        students = Student.query.filter(Student.id.in_(student_ids)).all()
-        dept_ids = [s.department_id for s in students if s.department_id]
+        dept_ids = parent_department_ids(s for s, _ in linked_students(user_email))
         query = query.filter(
             (Notice.target_role.in_(['all', 'parent'])) & 
             ((Notice.department_id == None) | (Notice.department_id.in_(dept_ids)))
@@ -721,10 +593,6 @@ def timetable():
     role = session.get('role')
     user_email = session.get('user')
     if role == 'parent':
-        try:
-            db.create_all()
-        except Exception:
-            pass
         links = ParentStudentLink.query.filter_by(parent_username=user_email).all()
         student_ids = [l.student_id for l in links]
         students = Student.query.filter(Student.id.in_(student_ids)).all()
@@ -777,8 +645,11 @@ def timetable():
         faculty_index[s.course.faculty.id] = s.course.faculty
     
     departments = Department.query.order_by(Department.name.asc()).all()
+    semesters = Semester.query.filter(Semester.start_date.isnot(None), Semester.end_date.isnot(None)) \
+        .order_by(Semester.start_date.desc()).all()
     return render_template('timetable.html',
                            title='Timetable',
+                           semesters=semesters,
                            week_start=week_start,
                            week_end=week_end,
                            items=items,
@@ -804,79 +675,11 @@ def timetable_generate():
             return redirect(url_for('timetable'))
     else:
         week_start = today - timedelta(days=today.weekday())
-    week_end = week_start + timedelta(days=6)
 
-    allow_weekend = bool(app.config.get('ALLOW_WEEKEND_SESSIONS', False))
-    max_course_week = int(app.config.get('COURSE_MAX_SESSIONS_PER_WEEK', 5))
-    max_faculty_day = int(app.config.get('FACULTY_MAX_SESSIONS_PER_DAY', 3))
-    max_faculty_week = int(app.config.get('FACULTY_MAX_SESSIONS_PER_WEEK', 15))
-    default_hours = int(app.config.get('SESSION_DEFAULT_DURATION_HOURS', 1))
-    require_approved = bool(app.config.get('LEAVE_APPROVAL_REQUIRED', True))
-    # Lab/Project config
-    lab_kw = (app.config.get('LAB_SESSION_KEYWORD') or 'Lab')
-    proj_kw = (app.config.get('PROJECT_SESSION_KEYWORD') or 'Project')
-    lab_every = int(app.config.get('LAB_GENERATE_EVERY_N', 0))
-    proj_every = int(app.config.get('PROJECT_GENERATE_EVERY_M', 0))
-    lab_gap = int(app.config.get('LAB_MIN_SPACING_DAYS', 3))
-    proj_gap = int(app.config.get('PROJECT_MIN_SPACING_DAYS', 7))
-
-    created = 0
-    skipped = 0
-    # Iterate days, then courses to distribute load
+    # Caps, leaves and existing sessions are loaded once; assignment runs in memory
     try:
-        db.create_all()
-        from project.models import FacultyLeave
-        days = [week_start + timedelta(days=i) for i in range(7)]
-        courses = Course.query.order_by(Course.faculty_id.asc()).all()
-        for d in days:
-            if not allow_weekend and d.weekday() >= 5:
-                continue
-            # Precompute faculty day/week counts
-            for course in courses:
-                t = course.faculty
-                # Course weekly cap remaining
-                week_count_course = CourseSession.query.\
-                    filter(CourseSession.course_id == course.id, CourseSession.session_date >= week_start, CourseSession.session_date <= week_end).count()
-                if week_count_course >= max_course_week:
-                    continue
-                # Faculty day/week caps
-                faculty_day_count = CourseSession.query.join(Course).\
-                    filter(Course.faculty_id == t.id, CourseSession.session_date == d).count()
-                if faculty_day_count >= max_faculty_day:
-                    continue
-                faculty_week_count = CourseSession.query.join(Course).\
-                    filter(Course.faculty_id == t.id, CourseSession.session_date >= week_start, CourseSession.session_date <= week_end).count()
-                if faculty_week_count >= max_faculty_week:
-                    continue
-                # Faculty leave window
-                leave_q = FacultyLeave.query.filter_by(faculty_id=t.id).\
-                    filter(FacultyLeave.start_date <= d, FacultyLeave.end_date >= d)
-                if require_approved:
-                    leave_q = leave_q.filter(FacultyLeave.approved == True)
-                if leave_q.first():
-                    skipped += 1
-                    continue
-                # Avoid duplicate course session same day
-                if CourseSession.query.filter_by(course_id=course.id, session_date=d).first():
-                    continue
-                # Title allocation (optional lab/project rotation)
-                total_sessions = CourseSession.query.filter_by(course_id=course.id).count()
-                title = None
-                # Prefer project allocation if both trigger
-                if proj_every > 0 and ((total_sessions + 1) % proj_every == 0):
-                    # Check spacing
-                    last_proj = CourseSession.query.filter(CourseSession.course_id == course.id, CourseSession.title.ilike('%' + proj_kw + '%')).order_by(CourseSession.session_date.desc()).first()
-                    if not last_proj or (d - last_proj.session_date).days >= proj_gap:
-                        title = proj_kw
-                if title is None and lab_every > 0 and ((total_sessions + 1) % lab_every == 0):
-                    last_lab = CourseSession.query.filter(CourseSession.course_id == course.id, CourseSession.title.ilike('%' + lab_kw + '%')).order_by(CourseSession.session_date.desc()).first()
-                    if not last_lab or (d - last_lab.session_date).days >= lab_gap:
-                        title = lab_kw
-                if title is None:
-                    title = 'Lecture'
-                s = CourseSession(course_id=course.id, session_date=d, title=title)
-                db.session.add(s)
-                created += 1
+        plan, skipped = generate_timetable(week_start)
+        created = save_sessions(plan.planned)
         db.session.commit()
         # Audit log
         try:
@@ -897,6 +700,88 @@ def timetable_generate():
         flash(f'Failed to generate timetable: {str(e)}', 'danger')
     return redirect(url_for('timetable', week_start=week_start.isoformat()))
 
+@app.route('/timetable/semester', methods=['POST'])
+@crud_required('timetable', 'update')
+def timetable_semester_generate():
+    semester = Semester.query.get(request.form.get('semester_id', type=int) or 0)
+    if not semester:
+        flash('Select a semester to generate.', 'danger')
+        return redirect(url_for('timetable'))
+    try:
+        semester_bounds(semester)
+    except ValueError as e:
+        flash(str(e), 'danger')
+        return redirect(url_for('timetable'))
+    dry_run = request.form.get('mode', 'preview') != 'apply'
+    job = submit_job('timetable_semester', {'semester_id': semester.id, 'dry_run': dry_run},
+                     created_by=session.get('user'))
+    try:
+        log = AuditLog(
+            action='timetable_semester_job',
+            actor_username=session.get('user') or 'system',
+            actor_role=session.get('role'),
+            target=f'semester:{semester.id}',
+            details=f"job={job.id},dry_run={dry_run}"
+        )
+        db.session.add(log)
+        db.session.commit()
+    except Exception as _e:
+        logger.warning(f"Failed to write audit log for timetable_semester_job: {_e}")
+    return redirect(url_for('timetable_job', job_id=job.id))
+
+def _timetable_job_or_404(job_id):
+    job = BackgroundJob.query.get_or_404(job_id)
+    if job.kind != 'timetable_semester':
+        abort(404)
+    return job
+
+@app.route('/timetable/jobs/<int:job_id>')
+@crud_required('timetable', 'update')
+def timetable_job(job_id):
+    job = _timetable_job_or_404(job_id)
+    params = json.loads(job.params or '{}')
+    return render_template('timetable_job.html',
+                           title='Semester Timetable',
+                           job=job,
+                           params=params,
+                           semester=Semester.query.get(params.get('semester_id')),
+                           result=job_result(job))
+
+@app.route('/timetable/jobs/<int:job_id>/status')
+@crud_required('timetable', 'update')
+def timetable_job_status(job_id):
+    return jsonify(job_status(_timetable_job_or_404(job_id)))
+
+@app.route('/timetable/jobs/<int:job_id>/apply', methods=['POST'])
+@crud_required('timetable', 'update')
+def timetable_job_apply(job_id):
+    job = _timetable_job_or_404(job_id)
+    try:
+        created = apply_semester_plan(job)
+        db.session.commit()
+    except StalePlanError as e:
+        db.session.rollback()
+        flash(str(e), 'warning')
+        return redirect(url_for('timetable_job', job_id=job.id))
+    except (ValueError, IntegrityError) as e:
+        db.session.rollback()
+        flash(f'Failed to apply timetable: {str(e)}', 'danger')
+        return redirect(url_for('timetable_job', job_id=job.id))
+    try:
+        log = AuditLog(
+            action='timetable_semester_apply',
+            actor_username=session.get('user') or 'system',
+            actor_role=session.get('role'),
+            target=f'job:{job.id}',
+            details=f"created={created}"
+        )
+        db.session.add(log)
+        db.session.commit()
+    except Exception as _e:
+        logger.warning(f"Failed to write audit log for timetable_semester_apply: {_e}")
+    flash(f'Semester timetable applied: created {created} sessions.', 'success')
+    return redirect(url_for('timetable_job', job_id=job.id))
+
 # --- Course Planning Summary ---
 @app.route('/subjects/<int:course_id>/plan')
 @crud_required('course_plan', 'read')
@@ -934,7 +819,6 @@ def course_plan(course_id):
 @crud_required('course_plan', 'read')
 def course_plan_suggest(course_id):
     course = Course.query.get_or_404(course_id)
-    faculty = course.faculty
     credits = course.credits or 0
     hours_per_credit = int(app.config.get('HOURS_PER_CREDIT', 15))
     default_hours = int(app.config.get('SESSION_DEFAULT_DURATION_HOURS', 1))
@@ -960,47 +844,14 @@ def course_plan_suggest(course_id):
                                status=status,
                                sessions=sessions,
                                suggestions=[])
-    # Governance caps
-    max_course_week = int(app.config.get('COURSE_MAX_SESSIONS_PER_WEEK', 5))
-    max_faculty_day = int(app.config.get('FACULTY_MAX_SESSIONS_PER_DAY', 3))
-    max_faculty_week = int(app.config.get('FACULTY_MAX_SESSIONS_PER_WEEK', 15))
-    allow_weekend = bool(app.config.get('ALLOW_WEEKEND_SESSIONS', False))
     # Start scheduling from next day after last session or today
     today = datetime.today().date()
     start_date = today
     if sessions:
         start_date = max(today, sessions[-1].session_date + timedelta(days=1))
-    suggestions = []
-    d = start_date
-    safety_counter = 0
-    while remaining > 0 and safety_counter < 365:  # limit search to ~1 year
-        safety_counter += 1
-        weekday = d.weekday()  # 0=Mon..6=Sun
-        if not allow_weekend and weekday >= 5:
-            d += timedelta(days=1)
-            continue
-        # Determine week window
-        week_start = d - timedelta(days=d.weekday())
-        week_end = week_start + timedelta(days=6)
-        # Counts for governance checks
-        course_week_count = CourseSession.query.filter_by(course_id=course.id).\
-            filter(CourseSession.session_date >= week_start, CourseSession.session_date <= week_end).count()
-        faculty_day_count = CourseSession.query.join(Course).\
-            filter(Course.faculty_id == faculty.id, CourseSession.session_date == d).count()
-        faculty_week_count = CourseSession.query.join(Course).\
-            filter(Course.faculty_id == faculty.id, CourseSession.session_date >= week_start, CourseSession.session_date <= week_end).count()
-        # Skip if caps would be exceeded
-        if course_week_count >= max_course_week or faculty_day_count >= max_faculty_day or faculty_week_count >= max_faculty_week:
-            d += timedelta(days=1)
-            continue
-        # Avoid duplicate session on same date for this course
-        exists_same_day = CourseSession.query.filter_by(course_id=course.id, session_date=d).first() is not None
-        if exists_same_day:
-            d += timedelta(days=1)
-            continue
-        suggestions.append({'date': d})
-        remaining -= 1
-        d += timedelta(days=1)
+    # Sessions and leaves for the horizon are loaded once; the same planner backs apply
+    planned = CoursePlanner(course, start_date).plan(remaining)
+    suggestions = [{'date': p['session_date'], 'title': p['title']} for p in planned]
     status = 'behind' if actual_hours < required_hours else ('ahead' if actual_hours > required_hours else 'on_track')
     return render_template('course_plan.html',
                            title='Course Plan',
@@ -1020,7 +871,6 @@ def course_plan_suggest(course_id):
 @crud_required('course_plan', 'update')
 def course_plan_apply(course_id):
     course = Course.query.get_or_404(course_id)
-    faculty = course.faculty
     credits = course.credits or 0
     hours_per_credit = int(app.config.get('HOURS_PER_CREDIT', 15))
     default_hours = int(app.config.get('SESSION_DEFAULT_DURATION_HOURS', 1))
@@ -1032,75 +882,13 @@ def course_plan_apply(course_id):
     if remaining <= 0:
         flash('No remaining sessions required by plan.', 'info')
         return redirect(url_for('course_plan', course_id=course.id))
-    # Governance caps
-    max_course_week = int(app.config.get('COURSE_MAX_SESSIONS_PER_WEEK', 5))
-    max_faculty_day = int(app.config.get('FACULTY_MAX_SESSIONS_PER_DAY', 3))
-    max_faculty_week = int(app.config.get('FACULTY_MAX_SESSIONS_PER_WEEK', 15))
-    allow_weekend = bool(app.config.get('ALLOW_WEEKEND_SESSIONS', False))
-    # Lab/Project spacing
-    lab_kw = (app.config.get('LAB_SESSION_KEYWORD') or 'Lab').lower()
-    proj_kw = (app.config.get('PROJECT_SESSION_KEYWORD') or 'Project').lower()
-    lab_gap = int(app.config.get('LAB_MIN_SPACING_DAYS', 3))
-    proj_gap = int(app.config.get('PROJECT_MIN_SPACING_DAYS', 7))
     try:
-        db.create_all()
-        from project.models import FacultyLeave
         today = datetime.today().date()
         start_date = today
         if sessions:
             start_date = max(today, sessions[-1].session_date + timedelta(days=1))
-        created = 0
-        d = start_date
-        safety_counter = 0
-        while remaining > 0 and safety_counter < 365:
-            safety_counter += 1
-            if not allow_weekend and d.weekday() >= 5:
-                d += timedelta(days=1)
-                continue
-            # Week window
-            week_start = d - timedelta(days=d.weekday())
-            week_end = week_start + timedelta(days=6)
-            # Caps
-            course_week_count = CourseSession.query.filter_by(course_id=course.id).\
-                filter(CourseSession.session_date >= week_start, CourseSession.session_date <= week_end).count()
-            if course_week_count >= max_course_week:
-                d += timedelta(days=1)
-                continue
-            faculty_day_count = CourseSession.query.join(Course).\
-                filter(Course.faculty_id == faculty.id, CourseSession.session_date == d).count()
-            if faculty_day_count >= max_faculty_day:
-                d += timedelta(days=1)
-                continue
-            faculty_week_count = CourseSession.query.join(Course).\
-                filter(Course.faculty_id == faculty.id, CourseSession.session_date >= week_start, CourseSession.session_date <= week_end).count()
-            if faculty_week_count >= max_faculty_week:
-                d += timedelta(days=1)
-                continue
-            # Leave
-            leave_q = FacultyLeave.query.filter_by(faculty_id=faculty.id).\
-                filter(FacultyLeave.start_date <= d, FacultyLeave.end_date >= d)
-            if bool(app.config.get('LEAVE_APPROVAL_REQUIRED', True)):
-                leave_q = leave_q.filter(FacultyLeave.approved == True)
-            if leave_q.first():
-                d += timedelta(days=1)
-                continue
-            # Avoid duplicate
-            if CourseSession.query.filter_by(course_id=course.id, session_date=d).first():
-                d += timedelta(days=1)
-                continue
-            # Title with spacing checks
-            title = 'Lecture'
-            last_lab = CourseSession.query.filter(CourseSession.course_id == course.id, CourseSession.title.ilike('%' + lab_kw + '%')).order_by(CourseSession.session_date.desc()).first()
-            if last_lab and (d - last_lab.session_date).days >= lab_gap:
-                title = app.config.get('LAB_SESSION_KEYWORD') or 'Lab'
-            last_proj = CourseSession.query.filter(CourseSession.course_id == course.id, CourseSession.title.ilike('%' + proj_kw + '%')).order_by(CourseSession.session_date.desc()).first()
-            if last_proj and (d - last_proj.session_date).days >= proj_gap:
-                title = app.config.get('PROJECT_SESSION_KEYWORD') or 'Project'
-            snew = CourseSession(course_id=course.id, session_date=d, title=title)
-            db.session.add(snew)
-            created += 1
-            remaining -= 1
-            d += timedelta(days=1)
+        planned = CoursePlanner(course, start_date).plan(remaining)
+        created = save_sessions(planned)
         db.session.commit()
         # Audit
         try:
@@ -1218,15 +1006,8 @@ def faculty_performance(faculty_id):
         return redirect(url_for('faculty'))
     faculty = Faculty.query.get_or_404(faculty_id)
     courses = Course.query.filter_by(faculty_id=faculty_id).all()
-    sessions = CourseSession.query.join(Course).filter(Course.faculty_id == faculty_id).order_by(CourseSession.session_date.asc()).all()
-    total_sessions = len(sessions)
-    total_attendance = 0
-    present_late_count = 0
-    for s in sessions:
-        records = Attendance.query.filter_by(session_id=s.id).all()
-        total_attendance += len(records)
-        present_late_count += len([r for r in records if r.status in ('present', 'late')])
-    attendance_rate = (present_late_count / total_attendance * 100.0) if total_attendance else None
+    # Session count plus one attendance tally grouped by session and status
+    total_sessions, attendance_rate = faculty_attendance_summary(faculty_id)
     min_sessions = int(app.config.get('PERFORMANCE_MIN_SESSIONS_FOR_REPORT', 5))
     return render_template('faculty_performance.html', title='Faculty Performance', faculty=faculty, courses=courses, total_sessions=total_sessions, attendance_rate=attendance_rate, min_sessions=min_sessions)
 
@@ -1580,17 +1361,6 @@ def admission_status():
     return render_template('admission_status.html', title='Admission Status', app_obj=app_obj, email=email)
 
 # --- Grades and Transcript ---
-def grade_points(letter: str) -> float:
-    mapping = {
-        'A+': 4.0, 'A': 4.0,
-        'A-': 3.7,
-        'B+': 3.3, 'B': 3.0, 'B-': 2.7,
-        'C+': 2.3, 'C': 2.0, 'C-': 1.7,
-        'D+': 1.3, 'D': 1.0,
-        'F': 0.0
-    }
-    return mapping.get(letter.upper(), 0.0)
-
 @app.route('/students/<int:student_id>/transcript')
 @crud_required('grade', 'read')
 def student_transcript(student_id):
@@ -1653,7 +1423,7 @@ def student_transcript(student_id):
                 'letter': None,
                 'points': None,
                 'credits': course.credits or 0,
-                'semester': course.semester,
+                'semester': course.sem.number if course.sem else None,
                 'academic_year': course.academic_year,
                 'comments': '',
                 'remarks': '',
@@ -1803,60 +1573,8 @@ def edit_grade(student_id, grade_id):
 @app.route('/analytics')
 @crud_required('analytics', 'read')
 def analytics():
-    total_students = Student.query.count()
-    total_courses = Course.query.count()
-    # GPA average
-    gpas = []
-    for s in Student.query.all():
-        grades = Grade.query.filter_by(student_id=s.id).all()
-        if not grades:
-            continue
-        total_pts = 0.0
-        total_cr = 0
-        for g in grades:
-            course = Course.query.get(g.course_id)
-            pts = g.points if g.points is not None else grade_points(g.letter)
-            cr = course.credits or 1
-            total_pts += pts * cr
-            total_cr += cr
-        if total_cr:
-            gpas.append(total_pts / total_cr)
-    avg_gpa = (sum(gpas) / len(gpas)) if gpas else None
-    # Attendance average per student
-    attendance_rates = []
-    sessions_all = CourseSession.query.all()
-    session_ids_all = [s.id for s in sessions_all]
-    if session_ids_all:
-        for s in Student.query.all():
-            recs = Attendance.query.filter(Attendance.session_id.in_(session_ids_all), Attendance.student_id == s.id).all()
-            total = len(recs)
-            if total:
-                present_late = sum(1 for r in recs if r.status in ('present', 'late'))
-                attendance_rates.append(present_late / total * 100.0)
-    avg_attendance = (sum(attendance_rates) / len(attendance_rates)) if attendance_rates else None
-    return render_template('analytics.html', title='Analytics', total_students=total_students, total_courses=total_courses, avg_gpa=avg_gpa, avg_attendance=avg_attendance)
-
-# --- Bulk CSV Import Helpers ---
-def _csv_rows(file_storage):
-    if not file_storage:
-        return []
-    data = file_storage.read()
-    if isinstance(data, bytes):
-        try:
-            text = data.decode('utf-8-sig')
-        except Exception:
-            text = data.decode('utf-8', errors='ignore')
-    else:
-        text = data
-    reader = csv.DictReader(StringIO(text))
-    rows = list(reader)
-    return rows
-
-def _valid_email(email):
-    return bool(email and re.match(r"^[^@\s]+@[^@\s]+\.[^@\s]+$", email))
-
-def _valid_phone(phone):
-    return bool(phone and re.match(r"^[0-9\-\+\s]{7,20}$", phone))
+    stats = compute_analytics()
+    return render_template('analytics.html', title='Analytics', **stats)
 
 @app.route("/login", methods=['GET', 'POST'])
 def login():
@@ -2097,10 +1815,6 @@ def profile():
     faculty = None
     user = User.query.filter_by(username=user_id).first()
     photo = None
-    try:
-        db.create_all()
-    except Exception:
-        pass
     photo = UserPhoto.query.filter_by(username=user_id).first()
     photo_url = None
     if photo:
@@ -2111,15 +1825,7 @@ def profile():
         faculty = Faculty.query.filter_by(email=user_id).first()
     parent_students = []
     if role == 'parent':
-        try:
-            db.create_all()
-        except Exception:
-            pass
-        links = ParentStudentLink.query.filter_by(parent_username=user_id).all()
-        for l in links:
-            s = Student.query.get(l.student_id)
-            if s:
-                parent_students.append(s)
+        parent_students = [s for s, _ in linked_students(user_id)]
     return render_template('profile.html', title='Profile', role=role, user=user, student=student, faculty=faculty, parent_students=parent_students, photo_url=photo_url)
 
 def _allowed_image(filename: str) -> bool:
@@ -2307,10 +2013,6 @@ def admin_crud():
 @app.route('/admin/parent-links', methods=['GET', 'POST'])
 @crud_required('parent_link', 'read')
 def admin_parent_links():
-    try:
-        db.create_all()
-    except Exception:
-        pass
     if request.method == 'POST':
         parent_username = request.form.get('parent_username', '').strip()
         student_email = request.form.get('student_email', '').strip()
@@ -2357,10 +2059,6 @@ def admin_parent_links():
 @app.route('/admin/parent-links/<int:link_id>/delete', methods=['POST'])
 @crud_required('parent_link', 'delete')
 def admin_parent_links_delete(link_id):
-    try:
-        db.create_all()
-    except Exception:
-        pass
     link = ParentStudentLink.query.get_or_404(link_id)
     db.session.delete(link)
     db.session.commit()
@@ -2372,11 +2070,6 @@ def admin_parent_links_delete(link_id):
 @crud_required('analytics', 'read')
 def admin_policies():
     from project.models import SystemSetting
-    # Ensure tables exist for newly added settings model
-    try:
-        db.create_all()
-    except Exception:
-        pass
     policy_keys = [
         'FACULTY_MAX_SESSIONS_PER_DAY',
         'FACULTY_MAX_SESSIONS_PER_WEEK',
@@ -2434,7 +2127,6 @@ def admin_policies():
                         _app.config[s.key] = s.value
             # Audit log for policy changes
             try:
-                db.create_all()
                 actor = session.get('user') or 'system'
                 details = f"updated={','.join(updated_keys)}"
                 log = AuditLog(
@@ -2467,10 +2159,6 @@ def students():
     
     query = Student.query
     if role == 'parent':
-        try:
-            db.create_all()
-        except Exception:
-            pass
         links = ParentStudentLink.query.filter_by(parent_username=user_email).all()
         student_ids = [l.student_id for l in links]
         query = query.filter(Student.id.in_(student_ids))
@@ -2483,10 +2171,6 @@ def students():
     pagination = query.order_by(Student.name.asc()).paginate(page=page, per_page=10)
     emails = [s.email for s in pagination.items]
     photos = {}
-    try:
-        db.create_all()
-    except Exception:
-        pass
     if emails:
         recs = UserPhoto.query.filter(UserPhoto.username.in_(emails)).all()
         for r in recs:
@@ -2499,430 +2183,122 @@ def students():
 def bulk_upload():
     return render_template('bulk_upload.html', title='Bulk Upload')
 
+# Import kind -> (label, list page the result links back to)
+IMPORT_KINDS = {
+    'students': ('students', 'students'),
+    'faculties': ('faculties', 'faculty'),
+    'subjects': ('subjects', 'subjects'),
+    'enrollments': ('enrollments', 'subjects'),
+}
+
+def _import_csv(kind, options=None):
+    file = request.files.get('file')
+    if not file or not file.filename:
+        flash('Choose a CSV file to import.', 'danger')
+        return redirect(url_for('bulk_upload'))
+    mode = request.form.get('mode') or 'insert'
+    if mode not in IMPORTERS[kind].modes:
+        flash(f'{IMPORT_KINDS[kind][0].capitalize()} cannot be imported in {mode} mode.', 'danger')
+        return redirect(url_for('bulk_upload'))
+    options = dict(options or {}, mode=mode)
+    try:
+        job = submit_import(kind, file, options, created_by=session.get('user'))
+    except OSError as e:
+        flash(f'Failed to import {IMPORT_KINDS[kind][0]}: {str(e)}', 'danger')
+        return redirect(url_for('bulk_upload'))
+    try:
+        log = AuditLog(
+            action='bulk_import_job',
+            actor_username=session.get('user') or 'system',
+            actor_role=session.get('role'),
+            target=f'import:{kind}',
+            details=f"job={job.id},mode={options['mode']},file={secure_filename(file.filename)}"
+        )
+        db.session.add(log)
+        db.session.commit()
+    except Exception as _e:
+        logger.warning(f"Failed to write audit log for bulk_import_job: {_e}")
+    return redirect(url_for('import_job', job_id=job.id))
+
+def _person_options(keys):
+    strategy = request.form.get('password_strategy', 'none')
+    fixed_password = request.form.get('fixed_password', '')
+    match_on = request.form.get('match_on', 'email')
+    return {
+        'password_strategy': strategy,
+        'fixed_password_hash': generate_password_hash(fixed_password) if strategy == 'fixed' and fixed_password else None,
+        'match_on': match_on if match_on in keys else 'email',
+    }
+
 # --- Bulk Import: Students ---
 @app.route('/import/students', methods=['POST'])
 @crud_required('bulk_upload', 'create')
 def import_students():
-    file = request.files.get('file')
-    password_strategy = request.form.get('password_strategy', 'none')
-    fixed_password = request.form.get('fixed_password', '')
-    
-    rows = _csv_rows(file)
-    max_rows = app.config.get('MAX_BULK_IMPORT_ROWS', 1000)
-    if len(rows) > max_rows:
-        flash(f'File has {len(rows)} rows; only first {max_rows} will be processed.', 'warning')
-        rows = rows[:max_rows]
-    created = 0
-    skipped = 0
-    users_created = 0
-    errors = []
-    for i, row in enumerate(rows, start=1):
-        name = (row.get('name') or '').strip()
-        email = (row.get('email') or '').strip().lower()
-        phone = (row.get('phone') or '').strip()
-        registration_number = (row.get('registration_number') or '').strip() or None
-        roll_number = (row.get('roll_number') or '').strip() or None
-        gender = (row.get('gender') or '').strip() or None
-        admission_date_str = (row.get('admission_date') or '').strip()
-        address = (row.get('address') or '').strip() or None
-        dob_str = (row.get('date_of_birth') or '').strip()
-        department = (row.get('department') or '').strip() or None
-        guardian_name = (row.get('guardian_name') or '').strip() or None
-        guardian_phone = (row.get('guardian_phone') or '').strip() or None
-        guardian_email = (row.get('guardian_email') or '').strip() or None
-        status = (row.get('status') or '').strip() or 'active'
-        nationality = (row.get('nationality') or '').strip() or None
-        blood_group = (row.get('blood_group') or '').strip() or None
-        religion = (row.get('religion') or '').strip() or None
-        community = (row.get('community') or '').strip() or None
-        sslc_marks_str = (row.get('sslc_marks') or '').strip()
-        hsc_marks_str = (row.get('hsc_marks') or '').strip()
-        current_year_str = (row.get('current_year') or '').strip()
-        current_semester_str = (row.get('current_semester') or '').strip()
-        section = (row.get('section') or '').strip() or None
-        father_name = (row.get('father_name') or '').strip() or None
-        mother_name = (row.get('mother_name') or '').strip() or None
-        emergency_contact_name = (row.get('emergency_contact_name') or '').strip() or None
-        emergency_contact_phone = (row.get('emergency_contact_phone') or '').strip() or None
-        previous_school = (row.get('previous_school') or '').strip() or None
-        aadhar_no = (row.get('aadhar_no') or '').strip() or None
-        community_cert_no = (row.get('community_cert_no') or '').strip() or None
-        annual_income_str = (row.get('annual_income') or '').strip()
-        income_cert_no = (row.get('income_cert_no') or '').strip() or None
-
-        if not name or not _valid_email(email) or not _valid_phone(phone):
-            errors.append(f"Row {i}: invalid name/email/phone")
-            skipped += 1
-            continue
-        
-        dob = None
-        if dob_str:
-            try:
-                dob = datetime.strptime(dob_str, '%Y-%m-%d').date()
-            except ValueError:
-                errors.append(f"Row {i}: invalid date_of_birth '{dob_str}' (expected YYYY-MM-DD)")
-        
-        admission_date = None
-        if admission_date_str:
-            try:
-                admission_date = datetime.strptime(admission_date_str, '%Y-%m-%d').date()
-            except ValueError:
-                errors.append(f"Row {i}: invalid admission_date '{admission_date_str}'")
-
-        annual_income = None
-        if annual_income_str:
-            try:
-                annual_income = float(annual_income_str)
-            except ValueError:
-                errors.append(f"Row {i}: invalid annual_income '{annual_income_str}'")
-        
-        sslc_marks = None
-        if sslc_marks_str:
-            try:
-                sslc_marks = int(sslc_marks_str)
-            except ValueError:
-                errors.append(f"Row {i}: invalid sslc_marks '{sslc_marks_str}'")
-        
-        hsc_marks = None
-        if hsc_marks_str:
-            try:
-                hsc_marks = int(hsc_marks_str)
-            except ValueError:
-                errors.append(f"Row {i}: invalid hsc_marks '{hsc_marks_str}'")
-
-        current_year = None
-        if current_year_str:
-            try:
-                current_year = int(current_year_str)
-            except ValueError:
-                errors.append(f"Row {i}: invalid current_year '{current_year_str}'")
-
-        current_semester = None
-        if current_semester_str:
-            try:
-                current_semester = int(current_semester_str)
-            except ValueError:
-                errors.append(f"Row {i}: invalid current_semester '{current_semester_str}'")
-
-        if Student.query.filter_by(email=email).first():
-            skipped += 1
-            continue
-        # Map department name to ID
-        department_obj = None
-        if department:
-            department_obj = Department.query.filter(Department.name.ilike(department)).first()
-        
-        try:
-            s = Student(
-                registration_number=registration_number,
-                name=name, email=email, phone=phone, roll_number=roll_number, 
-                address=address, date_of_birth=dob, 
-                gender=gender, admission_date=admission_date,
-                department_id=department_obj.id if department_obj else None,
-                guardian_name=guardian_name, guardian_phone=guardian_phone,
-                guardian_email=guardian_email,
-                status=status,
-                nationality=nationality, blood_group=blood_group,
-                religion=religion, community=community,
-                sslc_marks=sslc_marks, hsc_marks=hsc_marks,
-                current_year=current_year, current_semester=current_semester,
-                section=section, father_name=father_name, mother_name=mother_name,
-                emergency_contact_name=emergency_contact_name,
-                emergency_contact_phone=emergency_contact_phone,
-                previous_school=previous_school,
-                aadhar_no=aadhar_no, community_cert_no=community_cert_no,
-                annual_income=annual_income, income_cert_no=income_cert_no
-            )
-            db.session.add(s)
-            
-            # Handle user account creation
-            if password_strategy != 'none':
-                password = None
-                if password_strategy == 'fixed':
-                    password = fixed_password
-                elif password_strategy == 'email':
-                    password = email
-                elif password_strategy == 'csv':
-                    password = (row.get('password') or '').strip()
-                
-                if password:
-                    if not User.query.filter_by(username=email).first():
-                        u = User(
-                            username=email,
-                            password_hash=generate_password_hash(password),
-                            role='student'
-                        )
-                        db.session.add(u)
-                        users_created += 1
-                    else:
-                        errors.append(f"Row {i}: User account for {email} already exists")
-                else:
-                    errors.append(f"Row {i}: No password provided for strategy '{password_strategy}'")
-            
-            created += 1
-        except Exception as e:
-            errors.append(f"Row {i}: {str(e)}")
-            skipped += 1
-    try:
-        db.session.commit()
-    except Exception as e:
-        db.session.rollback()
-        flash(f'Failed to import students: {str(e)}', 'danger')
-        return redirect(url_for('bulk_upload'))
-    flash(f'Imported students: {created} created, {users_created} user accounts created, {skipped} skipped.', 'success')
-    if errors:
-        flash('Some rows had issues: ' + '; '.join(errors[:5]) + ('' if len(errors) <= 5 else ' ...'), 'warning')
-    return redirect(url_for('students'))
+    return _import_csv('students', _person_options(StudentImporter.keys))
 
 # --- Bulk Import: Faculty ---
 @app.route('/import/faculties', methods=['POST'])
 @crud_required('bulk_upload', 'create')
 def import_faculties():
-    file = request.files.get('file')
-    password_strategy = request.form.get('password_strategy', 'none')
-    fixed_password = request.form.get('fixed_password', '')
-    
-    rows = _csv_rows(file)
-    max_rows = app.config.get('MAX_BULK_IMPORT_ROWS', 1000)
-    if len(rows) > max_rows:
-        flash(f'File has {len(rows)} rows; only first {max_rows} will be processed.', 'warning')
-        rows = rows[:max_rows]
-    created = 0
-    skipped = 0
-    users_created = 0
-    errors = []
-    for i, row in enumerate(rows, start=1):
-        name = (row.get('name') or '').strip()
-        email = (row.get('email') or '').strip().lower()
-        phone = (row.get('phone') or '').strip()
-        department = (row.get('department') or '').strip() or None
-        designation = (row.get('designation') or '').strip() or None
-        specialization = (row.get('specialization') or '').strip() or None
-        qualification = (row.get('qualification') or '').strip() or None
-        subject_expertise = (row.get('subject_expertise') or '').strip() or None
-        dob_str = (row.get('date_of_birth') or '').strip()
-        joining_date_str = (row.get('joining_date') or '').strip()
-        pan_number = (row.get('pan_number') or '').strip() or None
-        aadhaar_number = (row.get('aadhaar_number') or '').strip() or None
-        experience_years_str = (row.get('experience_years') or '').strip()
-        
-        if not name or not _valid_email(email) or not _valid_phone(phone):
-            errors.append(f"Row {i}: invalid name/email/phone")
-            skipped += 1
-            continue
-        
-        experience_years = None
-        if experience_years_str:
-            try:
-                experience_years = int(experience_years_str)
-            except ValueError:
-                errors.append(f"Row {i}: invalid experience_years '{experience_years_str}'")
-
-        dob = None
-        if dob_str:
-            try:
-                dob = datetime.strptime(dob_str, '%Y-%m-%d').date()
-            except ValueError:
-                errors.append(f"Row {i}: invalid date_of_birth '{dob_str}'")
-
-        joining_date = None
-        if joining_date_str:
-            try:
-                joining_date = datetime.strptime(joining_date_str, '%Y-%m-%d').date()
-            except ValueError:
-                errors.append(f"Row {i}: invalid joining_date '{joining_date_str}'")
-
-        if Faculty.query.filter_by(email=email).first():
-            skipped += 1
-            continue
-
-        # Map department name to ID
-        department_obj = None
-        if department:
-            department_obj = Department.query.filter(Department.name.ilike(department)).first()
-
-        try:
-            t = Faculty(
-                name=name, email=email, phone=phone, 
-                department_id=department_obj.id if department_obj else None,
-                designation=designation, specialization=specialization,
-                qualification=qualification, subject_expertise=subject_expertise,
-                date_of_birth=dob, joining_date=joining_date,
-                pan_number=pan_number, aadhaar_number=aadhaar_number,
-                experience_years=experience_years
-            )
-            db.session.add(t)
-            
-            # Handle user account creation
-            if password_strategy != 'none':
-                password = None
-                if password_strategy == 'fixed':
-                    password = fixed_password
-                elif password_strategy == 'email':
-                    password = email
-                elif password_strategy == 'csv':
-                    password = (row.get('password') or '').strip()
-                
-                if password:
-                    if not User.query.filter_by(username=email).first():
-                        u = User(
-                            username=email,
-                            password_hash=generate_password_hash(password),
-                            role='faculty'
-                        )
-                        db.session.add(u)
-                        users_created += 1
-                    else:
-                        errors.append(f"Row {i}: User account for {email} already exists")
-                else:
-                    errors.append(f"Row {i}: No password provided for strategy '{password_strategy}'")
-            
-            created += 1
-        except Exception as e:
-            errors.append(f"Row {i}: {str(e)}")
-            skipped += 1
-    try:
-        db.session.commit()
-    except Exception as e:
-        db.session.rollback()
-        flash(f'Failed to import faculties: {str(e)}', 'danger')
-        return redirect(url_for('bulk_upload'))
-    flash(f'Imported faculties: {created} created, {users_created} user accounts created, {skipped} skipped.', 'success')
-    if errors:
-        flash('Some rows had issues: ' + '; '.join(errors[:5]) + ('' if len(errors) <= 5 else ' ...'), 'warning')
-    return redirect(url_for('faculty'))
+    return _import_csv('faculties', _person_options(FacultyImporter.keys))
 
 # --- Bulk Import: Subjects ---
 @app.route('/import/subjects', methods=['POST'])
 @crud_required('bulk_upload', 'create')
 def import_subjects():
-    file = request.files.get('file')
-    rows = _csv_rows(file)
-    max_rows = app.config.get('MAX_BULK_IMPORT_ROWS', 1000)
-    if len(rows) > max_rows:
-        flash(f'File has {len(rows)} rows; only first {max_rows} will be processed.', 'warning')
-        rows = rows[:max_rows]
-    created = 0
-    skipped = 0
-    errors = []
-    for i, row in enumerate(rows, start=1):
-        name = (row.get('name') or '').strip()
-        description = (row.get('description') or '').strip() or None
-        code = (row.get('code') or '').strip() or None
-        credits_str = (row.get('credits') or '').strip()
-        faculty_email = (row.get('faculty_email') or '').strip().lower()
-        
-        department = (row.get('department') or '').strip() or None
-        semester = (row.get('semester') or '').strip() or None
-        room = (row.get('room') or '').strip() or None
-        capacity_str = (row.get('capacity') or '').strip()
-        level = (row.get('level') or '').strip() or None
-        syllabus_url = (row.get('syllabus_url') or '').strip() or None
-        course_type = (row.get('course_type') or '').strip() or None
-        academic_year = (row.get('academic_year') or '').strip() or None
-
-        if not name or not _valid_email(faculty_email):
-            errors.append(f"Row {i}: missing name or invalid faculty_email")
-            skipped += 1
-            continue
-        faculty = Faculty.query.filter_by(email=faculty_email).first()
-        if not faculty:
-            errors.append(f"Row {i}: faculty not found: {faculty_email}")
-            skipped += 1
-            continue
-        credits = None
-        if credits_str:
-            try:
-                credits = int(credits_str)
-            except ValueError:
-                errors.append(f"Row {i}: invalid credits '{credits_str}'")
-        
-        capacity = None
-        if capacity_str:
-            try:
-                capacity = int(capacity_str)
-            except ValueError:
-                errors.append(f"Row {i}: invalid capacity '{capacity_str}'")
-
-        if code and Course.query.filter_by(code=code).first():
-            skipped += 1
-            continue
-
-        # Map department name to ID
-        department_obj = None
-        if department:
-            department_obj = Department.query.filter(Department.name.ilike(department)).first()
-
-        try:
-            c = Course(
-                name=name, description=description, code=code, credits=credits, 
-                faculty_id=faculty.id, 
-                department_id=department_obj.id if department_obj else None,
-                semester=semester,
-                room=room, capacity=capacity, level=level, syllabus_url=syllabus_url,
-                course_type=course_type, academic_year=academic_year
-            )
-            db.session.add(c)
-            created += 1
-        except Exception as e:
-            errors.append(f"Row {i}: {str(e)}")
-            skipped += 1
-    try:
-        db.session.commit()
-    except Exception as e:
-        db.session.rollback()
-        flash(f'Failed to import subjects: {str(e)}', 'danger')
-        return redirect(url_for('bulk_upload'))
-    flash(f'Imported subjects: {created} created, {skipped} skipped.', 'success')
-    if errors:
-        flash('Some rows had issues: ' + '; '.join(errors[:5]) + ('' if len(errors) <= 5 else ' ...'), 'warning')
-    return redirect(url_for('subjects'))
+    return _import_csv('subjects')
 
 # --- Bulk Import: Enrollments ---
 @app.route('/import/enrollments', methods=['POST'])
 @crud_required('bulk_upload', 'create')
 def import_enrollments():
-    file = request.files.get('file')
-    rows = _csv_rows(file)
-    max_rows = app.config.get('MAX_BULK_IMPORT_ROWS', 1000)
-    if len(rows) > max_rows:
-        flash(f'File has {len(rows)} rows; only first {max_rows} will be processed.', 'warning')
-        rows = rows[:max_rows]
-    created = 0
-    skipped = 0
-    errors = []
-    for i, row in enumerate(rows, start=1):
-        student_email = (row.get('student_email') or '').strip().lower()
-        course_code = (row.get('course_code') or '').strip()
-        if not _valid_email(student_email) or not course_code:
-            errors.append(f"Row {i}: invalid student_email or missing course_code")
-            skipped += 1
-            continue
-        student = Student.query.filter_by(email=student_email).first()
-        course = Course.query.filter_by(code=course_code).first()
-        if not student or not course:
-            errors.append(f"Row {i}: student or course not found")
-            skipped += 1
-            continue
-        try:
-            if student not in course.students:
-                course.students.append(student)
-                created += 1
-            else:
-                skipped += 1
-        except Exception as e:
-            errors.append(f"Row {i}: {str(e)}")
-            skipped += 1
+    return _import_csv('enrollments')
+
+# --- Bulk Import: Jobs ---
+def _import_job_or_404(job_id):
+    job = BackgroundJob.query.get_or_404(job_id)
+    if job.kind != 'import_csv':
+        abort(404)
+    return job
+
+@app.route('/import/jobs/<int:job_id>')
+@crud_required('bulk_upload', 'read')
+def import_job(job_id):
+    job = _import_job_or_404(job_id)
+    kind = json.loads(job.params or '{}').get('kind')
+    label, list_endpoint = IMPORT_KINDS.get(kind, (kind, 'bulk_upload'))
+    return render_template('import_job.html',
+                           title='Import Job',
+                           job=job,
+                           kind=kind,
+                           label=label,
+                           list_endpoint=list_endpoint,
+                           result=job_result(job),
+                           errors=import_errors(job.id).limit(20).all(),
+                           resumable=job_resumable(job))
+
+@app.route('/import/jobs/<int:job_id>/status')
+@crud_required('bulk_upload', 'read')
+def import_job_status(job_id):
+    job = _import_job_or_404(job_id)
+    return jsonify(dict(job_status(job), result=job_result(job), resumable=job_resumable(job)))
+
+@app.route('/import/jobs/<int:job_id>/errors.csv')
+@crud_required('bulk_upload', 'read')
+def import_job_errors_csv(job_id):
+    job = _import_job_or_404(job_id)
+    return csv_response(f'import_{job.id}_errors.csv', ['Row', 'Message'], streamed(import_errors(job.id)))
+
+@app.route('/import/jobs/<int:job_id>/resume', methods=['POST'])
+@crud_required('bulk_upload', 'create')
+def import_job_resume(job_id):
+    job = _import_job_or_404(job_id)
     try:
-        db.session.commit()
-    except Exception as e:
-        db.session.rollback()
-        flash(f'Failed to import enrollments: {str(e)}', 'danger')
-        return redirect(url_for('bulk_upload'))
-    flash(f'Imported enrollments: {created} created, {skipped} skipped.', 'success')
-    if errors:
-        flash('Some rows had issues: ' + '; '.join(errors[:5]) + ('' if len(errors) <= 5 else ' ...'), 'warning')
-    return redirect(url_for('subjects'))
+        resume_job(job)
+        flash('Import resumed from its last saved chunk.', 'success')
+    except ValueError as e:
+        flash(str(e), 'warning')
+    return redirect(url_for('import_job', job_id=job.id))
 
 # --- Sample CSV Endpoints ---
 @app.route('/import/sample/students.csv')
@@ -3268,32 +2644,11 @@ def student_detail(student_id):
     photo = UserPhoto.query.filter_by(username=student.email).first()
     photo_url = url_for('static', filename=photo.file_path.lstrip('/')) if photo else None
     
-    # GPA and Attendance logic similar to dashboard
-    grades = Grade.query.filter_by(student_id=student.id).all()
-    total_pts = 0.0
-    total_cr = 0
-    for g in grades:
-        pts = g.points if g.points is not None else 0.0 # simplified
-        course = Course.query.get(g.course_id)
-        cr = course.credits or 1
-        total_pts += pts * cr
-        total_cr += cr
-    gpa = (total_pts / total_cr) if total_cr > 0 else None
-    
-    sessions_all = []
-    for c in student.courses:
-        sessions_all.extend(c.sessions)
-    session_ids = [s.id for s in sessions_all]
-    attendance_rate = 0.0
-    attendance_counts = {'present': 0, 'absent': 0, 'late': 0, 'excused': 0}
-    if session_ids:
-        recs = Attendance.query.filter(Attendance.session_id.in_(session_ids), Attendance.student_id == student.id).all()
-        if recs:
-            for r in recs:
-                if r.status in attendance_counts:
-                    attendance_counts[r.status] += 1
-            present_late = attendance_counts['present'] + attendance_counts['late']
-            attendance_rate = (present_late / len(recs)) * 100.0
+    # GPA and Attendance from the metrics rollup, same as the dashboard
+    metrics = metrics_for_student(student.id)
+    gpa = metrics.gpa
+    attendance_rate = metrics.attendance_rate
+    attendance_counts = metrics.attendance_counts
 
     return render_template('student_detail.html', title=f'Student: {student.name}', 
                            student=student, photo_url=photo_url, gpa=gpa, 
@@ -3312,10 +2667,6 @@ def faculty():
     pagination = query.order_by(Faculty.name.asc()).paginate(page=page, per_page=10)
     emails = [t.email for t in pagination.items]
     photos = {}
-    try:
-        db.create_all()
-    except Exception:
-        pass
     if emails:
         recs = UserPhoto.query.filter(UserPhoto.username.in_(emails)).all()
         for r in recs:
@@ -3532,10 +2883,6 @@ def subjects():
     
     query = Course.query
     if role == 'parent':
-        try:
-            db.create_all()
-        except Exception:
-            pass
         links = ParentStudentLink.query.filter_by(parent_username=user_email).all()
         student_ids = [l.student_id for l in links]
         # Filter courses where any of the parent's children are enrolled
@@ -3716,10 +3063,6 @@ def enroll_student(course_id):
 def student_subjects(student_id):
     student = Student.query.get_or_404(student_id)
     if session.get('role') == 'parent':
-        try:
-            db.create_all()
-        except Exception:
-            pass
         link = ParentStudentLink.query.filter_by(parent_username=session.get('user'), student_id=student.id).first()
         if not link:
             flash('You are not authorized to view this student.', 'danger')
@@ -3733,10 +3076,6 @@ def course_details(course_id):
     user_email = session.get('user')
     
     if role == 'parent':
-        try:
-            db.create_all()
-        except Exception:
-            pass
         links = ParentStudentLink.query.filter_by(parent_username=user_email).all()
         student_ids = [l.student_id for l in links]
         # Check if any of the parent's children are in this course
@@ -3935,61 +3274,23 @@ def add_session(course_id):
             except ValueError:
                 flash('Invalid end time format.', 'danger')
 
-        existing = CourseSession.query.filter_by(course_id=course_id, session_date=d).first()
-        if existing:
-            flash('Session for this date already exists.', 'danger')
-            return render_template('add_session.html', course=course, title='Add Session')
-        # Weekend rule
-        allow_weekend = bool(app.config.get('ALLOW_WEEKEND_SESSIONS', False))
-        if not allow_weekend and d.weekday() >= 5:
-            flash('Weekend sessions are not allowed by policy.', 'danger')
-            return render_template('add_session.html', course=course, title='Add Session')
-        # Governance: faculty and course load constraints
-        faculty_id = course.faculty_id
-        # Leave checks
-        from project.models import FacultyLeave
-        require_approved = bool(app.config.get('LEAVE_APPROVAL_REQUIRED', True))
-        leave_q = FacultyLeave.query.filter_by(faculty_id=faculty_id).filter(FacultyLeave.start_date <= d, FacultyLeave.end_date >= d)
-        if require_approved:
-            leave_q = leave_q.filter(FacultyLeave.approved == True)
-        if leave_q.first():
-            flash('Faculty is on leave for the selected date.', 'danger')
-            return render_template('add_session.html', course=course, title='Add Session')
-        # Day constraints: sessions taught by faculty on this date
-        day_count = CourseSession.query.join(Course).filter(Course.faculty_id == faculty_id, CourseSession.session_date == d).count()
-        max_per_day = int(app.config.get('FACULTY_MAX_SESSIONS_PER_DAY', 4))
-        if day_count >= max_per_day:
-            flash(f'Faculty daily session limit reached ({max_per_day}).', 'danger')
-            return render_template('add_session.html', course=course, title='Add Session')
-        # Week constraints: compute week start/end
-        week_start = d - timedelta(days=d.weekday())
-        week_end = week_start + timedelta(days=6)
-        week_count_faculty = CourseSession.query.join(Course).filter(Course.faculty_id == faculty_id, CourseSession.session_date >= week_start, CourseSession.session_date <= week_end).count()
-        max_per_week_faculty = int(app.config.get('FACULTY_MAX_SESSIONS_PER_WEEK', 20))
-        if week_count_faculty >= max_per_week_faculty:
-            flash(f'Faculty weekly session limit reached ({max_per_week_faculty}).', 'danger')
-            return render_template('add_session.html', course=course, title='Add Session')
-        week_count_course = CourseSession.query.filter(CourseSession.course_id == course_id, CourseSession.session_date >= week_start, CourseSession.session_date <= week_end).count()
-        max_per_week_course = int(app.config.get('COURSE_MAX_SESSIONS_PER_WEEK', 10))
-        if week_count_course >= max_per_week_course:
-            flash(f'Course weekly session limit reached ({max_per_week_course}).', 'danger')
+        # Governance: duplicate, weekend, leave, load caps and lab/project spacing
+        planner = CoursePlanner(course, d, days=1)
+        rules = planner.state.rules
+        messages = {
+            'duplicate': 'Session for this date already exists.',
+            'weekend': 'Weekend sessions are not allowed by policy.',
+            'leave': 'Faculty is on leave for the selected date.',
+            'faculty_day': f'Faculty daily session limit reached ({rules.max_faculty_day}).',
+            'faculty_week': f'Faculty weekly session limit reached ({rules.max_faculty_week}).',
+            'course_week': f'Course weekly session limit reached ({rules.max_course_week}).',
+            'lab_spacing': f'Lab sessions must be spaced at least {rules.lab_gap} days apart.',
+            'project_spacing': f'Project sessions must be spaced at least {rules.project_gap} days apart.',
+        }
+        violation = planner.violation(d, title)
+        if violation:
+            flash(messages[violation], 'danger')
             return render_template('add_session.html', course=course, title='Add Session')
-        # Lab/Project spacing rules (simple keyword-based)
-        title_lower = title.lower()
-        lab_kw = (app.config.get('LAB_SESSION_KEYWORD') or 'Lab').lower()
-        proj_kw = (app.config.get('PROJECT_SESSION_KEYWORD') or 'Project').lower()
-        if lab_kw and lab_kw in title_lower:
-            min_gap = int(app.config.get('LAB_MIN_SPACING_DAYS', 3))
-            last_lab = CourseSession.query.filter(CourseSession.course_id == course_id, CourseSession.title.ilike('%' + lab_kw + '%')).order_by(CourseSession.session_date.desc()).first()
-            if last_lab and (d - last_lab.session_date).days < min_gap:
-                flash(f'Lab sessions must be spaced at least {min_gap} days apart.', 'danger')
-                return render_template('add_session.html', course=course, title='Add Session')
-        if proj_kw and proj_kw in title_lower:
-            min_gap_p = int(app.config.get('PROJECT_MIN_SPACING_DAYS', 7))
-            last_proj = CourseSession.query.filter(CourseSession.course_id == course_id, CourseSession.title.ilike('%' + proj_kw + '%')).order_by(CourseSession.session_date.desc()).first()
-            if last_proj and (d - last_proj.session_date).days < min_gap_p:
-                flash(f'Project sessions must be spaced at least {min_gap_p} days apart.', 'danger')
-                return render_template('add_session.html', course=course, title='Add Session')
         s = CourseSession(
             course_id=course_id, 
             session_date=d, 
@@ -4108,8 +3409,11 @@ def edit_session(session_id):
 def delete_session(session_id):
     s = CourseSession.query.get_or_404(session_id)
     course_id = s.course_id
+    affected = [sid for (sid,) in db.session.query(Attendance.student_id).filter_by(session_id=session_id)]
     Attendance.query.filter_by(session_id=session_id).delete()
     db.session.delete(s)
+    db.session.flush()
+    refresh_student_metrics(affected)
     db.session.commit()
     flash('Session deleted.', 'success')
     return redirect(url_for('course_sessions', course_id=course_id))
@@ -4189,34 +3493,17 @@ def mark_attendance(session_id):
     students = course.students
     if request.method == 'POST':
         # Governance: cutoff for marking attendance (non-admins)
-        cutoff_days = int(app.config.get('ATTENDANCE_MARKING_CUTOFF_DAYS', 30))
-        if session.get('role') != 'admin':
-            if (datetime.today().date() - session_obj.session_date).days > cutoff_days:
-                flash('Attendance window has closed for this session.', 'danger')
-                return redirect(url_for('course_sessions', course_id=course.id))
-        current_user_email = session.get('user')
+        if marking_closed(session_obj, session.get('role')):
+            flash('Attendance window has closed for this session.', 'danger')
+            return redirect(url_for('course_sessions', course_id=course.id))
+        entries = {}
         for student in students:
             status_val = request.form.get(f'status_{student.id}', 'absent')
-            if status_val not in ('present', 'absent', 'late', 'excused'):
+            if status_val not in ATTENDANCE_STATUSES:
                 status_val = 'absent'
-            remarks_val = request.form.get(f'remarks_{student.id}', '').strip()
-            att = Attendance.query.filter_by(session_id=session_id, student_id=student.id).first()
-            if not att:
-                att = Attendance(
-                    session_id=session_id, 
-                    student_id=student.id, 
-                    status=status_val, 
-                    remarks=remarks_val or None,
-                    marked_by=current_user_email,
-                    marked_at=datetime.utcnow()
-                )
-                db.session.add(att)
-            else:
-                if app.config.get('ATTENDANCE_ALLOW_EDIT', True):
-                    att.status = status_val
-                    att.remarks = remarks_val or None
-                    att.marked_by = current_user_email
-                    att.marked_at = datetime.utcnow()
+            entries[student.id] = (status_val, request.form.get(f'remarks_{student.id}', '').strip())
+        # One upsert for the whole roster instead of a lookup per student
+        save_attendance(session_id, entries, session.get('user'))
         db.session.commit()
         flash('Attendance saved.', 'success')
         return redirect(url_for('course_sessions', course_id=course.id))
@@ -4232,6 +3519,37 @@ def mark_attendance(session_id):
 
     return render_template('mark_attendance.html', course=course, course_session=session_obj, students=students, existing=existing_status, existing_remarks=existing_remarks, title='Mark Attendance', photos=photos)
 
+@app.route("/api/sessions/<int:session_id>/attendance", methods=['POST'])
+def api_mark_attendance(session_id):
+    # JSON counterpart of mark_attendance for attendance kiosks: one call per roster
+    if not session.get('logged_in'):
+        return jsonify({'ok': False, 'errors': ['Login required.']}), 401
+    role = session.get('role')
+    if role not in CRUD_PERMISSIONS['attendance']['create']:
+        return jsonify({'ok': False, 'errors': ['Not authorized.']}), 403
+    session_obj = CourseSession.query.get(session_id)
+    if not session_obj:
+        return jsonify({'ok': False, 'errors': ['Session not found.']}), 404
+    course = session_obj.course
+    if role == 'faculty':
+        current_faculty = Faculty.query.filter_by(email=session.get('user')).first()
+        if not current_faculty or current_faculty.id != course.faculty_id:
+            return jsonify({'ok': False, 'errors': ['You are not authorized to mark attendance for this course.']}), 403
+    if marking_closed(session_obj, role):
+        return jsonify({'ok': False, 'errors': ['Attendance window has closed for this session.']}), 403
+    entries, errors = parse_roster(request.get_json(silent=True), enrolled_student_ids(course.id))
+    if errors:
+        return jsonify({'ok': False, 'errors': errors}), 400
+    try:
+        inserted, updated = save_attendance(session_id, entries, session.get('user'))
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Kiosk attendance failed for session {session_id}: {e}")
+        return jsonify({'ok': False, 'errors': ['Failed to save attendance.']}), 500
+    return jsonify({'ok': True, 'inserted': inserted, 'updated': updated,
+                    'unchanged': len(entries) - inserted - updated}), 200
+
 @app.route("/sessions/<int:session_id>/report")
 @login_required
 def attendance_report(session_id):
@@ -4291,125 +3609,109 @@ def attendance_report(session_id):
 @crud_required('attendance', 'read')
 def low_attendance_alerts():
     course_id = request.args.get('course_id', type=int)
+    department_id = request.args.get('department_id', type=int)
+    institution = request.args.get('scope') == 'all' and session.get('role') == 'admin'
     threshold = request.args.get('threshold', 75.0, type=float)
-    
-    courses = Course.query.all()
-    
+
+    courses = Course.query.order_by(Course.name.asc()).all()
+    departments = Department.query.order_by(Department.name.asc()).all()
+    course = department = None
     alerts = []
-    course = None
+    # One grouped query computes every enrolled student's rate for the selected scope
     if course_id:
         course = Course.query.get_or_404(course_id)
-        for student in course.students:
-            total_sessions = CourseSession.query.filter_by(course_id=course_id).count()
-            if total_sessions == 0:
-                continue
-                
-            attendance_count = Attendance.query.filter(
-                Attendance.student_id == student.id,
-                Attendance.session_id.in_([s.id for s in course.sessions]),
-                Attendance.status.in_(['present', 'late'])
-            ).count()
-            
-            rate = (attendance_count / total_sessions) * 100
-            if rate < threshold:
-                alerts.append({
-                    'student': student,
-                    'rate': rate,
-                    'total': total_sessions,
-                    'attended': attendance_count
-                })
-            
-    return render_template('low_attendance_alerts.html', courses=courses, course=course, alerts=alerts, threshold=threshold, title='Low Attendance Alerts')
+        alerts = low_attendance(threshold, course_ids=[course.id])
+    elif department_id:
+        department = Department.query.get_or_404(department_id)
+        alerts = low_attendance(threshold, department_id=department.id)
+    elif institution:
+        alerts = low_attendance(threshold)
+
+    return render_template('low_attendance_alerts.html', courses=courses, departments=departments, course=course,
+                           department=department, institution=institution, alerts=alerts, threshold=threshold,
+                           title='Low Attendance Alerts')
 
 @app.route("/subjects/notify_low_attendance", methods=['POST'])
 @login_required
 @crud_required('attendance', 'update')
 def notify_low_attendance():
     course_id = request.form.get('course_id', type=int)
-    if not course_id:
-        flash('Course ID is required.', 'danger')
-        return redirect(url_for('low_attendance_alerts'))
-        
-    course = Course.query.get_or_404(course_id)
+    department_id = request.form.get('department_id', type=int)
+    institution = request.form.get('scope') == 'all'
     threshold = request.form.get('threshold', 75.0, type=float)
-    
-    notified_count = 0
-    for student in course.students:
-        total_sessions = CourseSession.query.filter_by(course_id=course_id).count()
-        if total_sessions == 0:
-            continue
-            
-        attendance_count = Attendance.query.filter(
-            Attendance.student_id == student.id,
-            Attendance.session_id.in_([s.id for s in course.sessions]),
-            Attendance.status.in_(['present', 'late'])
-        ).count()
-        
-        rate = (attendance_count / total_sessions) * 100
-        if rate < threshold:
-            # We assume a Notification model exists or use flash for demo
-            try:
-                from project.models import Notification
-                if student.guardian_email:
-                    notif = Notification(
-                        recipient_type='parent',
-                        recipient_id=student.guardian_email,
-                        title=f"Low Attendance Alert: {student.name}",
-                        message=f"Dear Parent, your ward {student.name}'s attendance in {course.name} is {rate:.1f}%, which is below the required threshold of {threshold}%."
-                    )
-                    db.session.add(notif)
-                    notified_count += 1
-                
-                notif_stu = Notification(
-                    recipient_type='student',
-                    recipient_id=student.email,
-                    title=f"Low Attendance Alert: {course.name}",
-                    message=f"Your attendance in {course.name} is {rate:.1f}%, which is below the required threshold of {threshold}%."
-                )
-                db.session.add(notif_stu)
-            except ImportError:
-                # If Notification model doesn't exist yet, we just flash a message for now
-                pass
+    if institution and session.get('role') != 'admin':
+        flash('Only administrators can notify institution-wide.', 'danger')
+        return redirect(url_for('low_attendance_alerts'))
+    if course_id:
+        course = Course.query.get_or_404(course_id)
+        alerts = low_attendance(threshold, course_ids=[course.id])
+        target = course.name
+    elif department_id:
+        department = Department.query.get_or_404(department_id)
+        alerts = low_attendance(threshold, department_id=department.id)
+        target = f'department:{department.name}'
+    elif institution:
+        alerts = low_attendance(threshold)
+        target = 'institution'
+    else:
+        flash('Select a course, department or the whole institution.', 'danger')
+        return redirect(url_for('low_attendance_alerts'))
 
-    db.session.commit()
+    try:
+        notified_count = queue_low_attendance_notifications(alerts, threshold)
+        db.session.add(AuditLog(
+            action='notify_low_attendance',
+            actor_username=session.get('user') or 'system',
+            actor_role=session.get('role'),
+            target=target,
+            details=f"threshold={threshold},students={len(alerts)},notifications={notified_count}"
+        ))
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Failed to send alerts: {str(e)}', 'danger')
+        return redirect(url_for('low_attendance_alerts'))
     flash(f'Sent {notified_count} alerts to parents/students.', 'success')
-    return redirect(url_for('low_attendance_alerts', course_id=course_id, threshold=threshold))
+    return redirect(url_for('low_attendance_alerts', course_id=course_id, department_id=department_id,
+                            scope='all' if institution else None, threshold=threshold))
 
 @app.route("/attendance/monthly_report")
 @login_required
 @crud_required('attendance', 'read')
 def monthly_attendance_report():
     course_id = request.args.get('course_id', type=int)
+    department_id = request.args.get('department_id', type=int)
+    semester_id = request.args.get('semester_id', type=int)
     month = request.args.get('month', datetime.utcnow().month, type=int)
     year = request.args.get('year', datetime.utcnow().year, type=int)
-    
-    courses = Course.query.all()
-    course = None
-    report_data = []
-    sessions = []
-    
+    if not 1 <= month <= 12:
+        month = datetime.utcnow().month
+
+    courses = Course.query.order_by(Course.name.asc()).all()
+    departments = Department.query.order_by(Department.name.asc()).all()
+    semesters = Semester.query.order_by(Semester.academic_year.desc(), Semester.number.asc()).all()
+    course = department = semester = None
+    scope = []
     if course_id:
         course = Course.query.get_or_404(course_id)
-        from sqlalchemy import extract
-        sessions = CourseSession.query.filter(
-            CourseSession.course_id == course_id,
-            extract('month', CourseSession.session_date) == month,
-            extract('year', CourseSession.session_date) == year
-        ).all()
-        
-        for student in course.students:
-            row = {'student': student, 'attendance': []}
-            present_count = 0
-            for session_obj in sessions:
-                att = Attendance.query.filter_by(session_id=session_obj.id, student_id=student.id).first()
-                status = att.status if att else '-'
-                row['attendance'].append(status)
-                if status in ('present', 'late'):
-                    present_count += 1
-            row['rate'] = (present_count / len(sessions) * 100) if sessions else 0
-            report_data.append(row)
-            
-    return render_template('monthly_attendance_report.html', courses=courses, course=course, report_data=report_data, sessions=sessions, month=month, year=year, title='Monthly Attendance Report')
+        scope = [course]
+    elif department_id:
+        department = Department.query.get_or_404(department_id)
+        scope = [c for c in courses if c.department_id == department.id]
+    elif semester_id:
+        semester = Semester.query.get_or_404(semester_id)
+        scope = [c for c in courses if c.semester_id == semester.id]
+
+    # Sessions, rosters and marks for the whole scope are fetched once and pivoted in memory
+    reports = monthly_attendance_matrix(scope, year, month)
+    if request.args.get('format') == 'csv':
+        label = f"course_{course.id}" if course else (f"department_{department.id}" if department else
+                                                      (f"semester_{semester.id}" if semester else "all"))
+        header, rows = monthly_attendance_csv(reports, year, month)
+        return csv_response(f"{label}_attendance_{year}_{month:02d}.csv", header, rows)
+    return render_template('monthly_attendance_report.html', courses=courses, departments=departments,
+                           semesters=semesters, course=course, department=department, semester=semester,
+                           reports=reports, month=month, year=year, title='Monthly Attendance Report')
 
 @app.route('/exams')
 @login_required
@@ -4581,18 +3883,7 @@ def hall_ticket(student_id):
 @crud_required('grade', 'read')
 def calculate_gpa(student_id):
     student = Student.query.get_or_404(student_id)
-    grades = Grade.query.filter_by(student_id=student_id).all()
-    
-    total_points = 0
-    total_credits = 0
-    
-    for g in grades:
-        course = Course.query.get(g.course_id)
-        if course and course.credits:
-            total_points += (g.points or 0) * course.credits
-            total_credits += course.credits
-            
-    gpa = total_points / total_credits if total_credits > 0 else 0
+    gpa = metrics_for_student(student.id).gpa or 0
     return jsonify({'student_id': student_id, 'gpa': round(gpa, 2)})
 
 @app.route("/students/<int:student_id>/marksheet")
@@ -4629,17 +3920,8 @@ def degree_certificate(student_id):
         flash('Unauthorized.', 'danger')
         return redirect(url_for('dashboard'))
         
-    # Calculate CGPA
-    grades = Grade.query.filter_by(student_id=student_id).all()
-    total_points = 0
-    total_credits = 0
-    for g in grades:
-        # Only count final grades (no exam_id) for CGPA
-        if g.exam_id is None and g.course and g.course.credits:
-            total_points += (g.points or 0) * g.course.credits
-            total_credits += g.course.credits
-    
-    cgpa = total_points / total_credits if total_credits > 0 else 0
+    # CGPA counts only final grades (no exam_id)
+    cgpa = metrics_for_student(student.id).cgpa or 0
     
     # Requirements check (example: 120 credits and CGPA > 2.0)
     # Since it's an ERP, we'll just show it if requested for now
@@ -4679,60 +3961,52 @@ def session_attendance_csv(session_id):
         flash('You are not authorized to download this report.', 'danger')
         return redirect(url_for('course_sessions', course_id=course.id))
 
-    records = Attendance.query.filter_by(session_id=session_id).all()
-    si = StringIO()
-    writer = csv.writer(si)
-    writer.writerow(["Student", "Email", "Status", "Remarks", "Marked By", "Marked At", "Session Date", "Course"]) 
-    for r in records:
-        s = r.student
-        writer.writerow([
-            s.name, 
-            s.email, 
-            r.status.title(), 
-            r.remarks or '',
-            r.marked_by or '',
-            r.marked_at.strftime('%Y-%m-%d %H:%M:%S') if r.marked_at else '',
-            session_obj.session_date.isoformat(), 
-            session_obj.course.name
-        ])
-    output = si.getvalue()
-    return Response(output, mimetype='text/csv', headers={"Content-Disposition": f"attachment; filename=session_{session_id}_attendance.csv"})
+    records = streamed(
+        db.session.query(Student.name, Student.email, Attendance.status, Attendance.remarks,
+                         Attendance.marked_by, Attendance.marked_at)
+        .join(Student, Student.id == Attendance.student_id)
+        .filter(Attendance.session_id == session_id)
+        .order_by(Attendance.id.asc())
+    )
+    session_date, course_name = session_obj.session_date.isoformat(), course.name
+    rows = (
+        [name, email, status.title(), remarks or '', marked_by or '', format_timestamp(marked_at), session_date, course_name]
+        for name, email, status, remarks, marked_by, marked_at in records
+    )
+    return csv_response(f"session_{session_id}_attendance.csv",
+                        ["Student", "Email", "Status", "Remarks", "Marked By", "Marked At", "Session Date", "Course"], rows)
 
 @app.route("/subjects/<int:course_id>/attendance.csv")
 @crud_required('attendance', 'read')
 def course_attendance_csv(course_id):
     course = Course.query.get_or_404(course_id)
-    sessions = CourseSession.query.filter_by(course_id=course_id).order_by(CourseSession.session_date.asc()).all()
-    si = StringIO()
-    writer = csv.writer(si)
-    writer.writerow(["Date", "Session Title", "Student", "Email", "Status", "Remarks", "Marked By", "Marked At"]) 
-    for s in sessions:
-        records = Attendance.query.filter_by(session_id=s.id).all()
-        for r in records:
-            st = r.student
-            writer.writerow([
-                s.session_date.isoformat(), 
-                s.title or 'Session',
-                st.name, 
-                st.email, 
-                r.status.title(), 
-                r.remarks or '',
-                r.marked_by or '',
-                r.marked_at.strftime('%Y-%m-%d %H:%M:%S') if r.marked_at else ''
-            ])
-    output = si.getvalue()
-    return Response(output, mimetype='text/csv', headers={"Content-Disposition": f"attachment; filename=course_{course_id}_attendance.csv"})
+    # One joined, batched query instead of a query per session and a lazy student load per row
+    records = streamed(
+        db.session.query(CourseSession.session_date, CourseSession.title, Student.name, Student.email,
+                         Attendance.status, Attendance.remarks, Attendance.marked_by, Attendance.marked_at)
+        .join(Attendance, Attendance.session_id == CourseSession.id)
+        .join(Student, Student.id == Attendance.student_id)
+        .filter(CourseSession.course_id == course.id)
+        .order_by(CourseSession.session_date.asc(), CourseSession.id.asc(), Attendance.id.asc())
+    )
+    rows = (
+        [d.isoformat(), title or 'Session', name, email, status.title(), remarks or '', marked_by or '',
+         format_timestamp(marked_at)]
+        for d, title, name, email, status, remarks, marked_by, marked_at in records
+    )
+    return csv_response(f"course_{course_id}_attendance.csv",
+                        ["Date", "Session Title", "Student", "Email", "Status", "Remarks", "Marked By", "Marked At"], rows)
 
 @app.route("/subjects/<int:course_id>/roster.csv")
 def course_roster_csv(course_id):
     course = Course.query.get_or_404(course_id)
-    si = StringIO()
-    writer = csv.writer(si)
-    writer.writerow(["Student", "Email", "Phone"]) 
-    for s in course.students:
-        writer.writerow([s.name, s.email, s.phone])
-    output = si.getvalue()
-    return Response(output, mimetype='text/csv', headers={"Content-Disposition": f"attachment; filename=course_{course_id}_roster.csv"})
+    records = streamed(
+        db.session.query(Student.name, Student.email, Student.phone)
+        .join(enrollments, enrollments.c.student_id == Student.id)
+        .filter(enrollments.c.course_id == course.id)
+        .order_by(Student.name.asc(), Student.id.asc())
+    )
+    return csv_response(f"course_{course_id}_roster.csv", ["Student", "Email", "Phone"], (list(r) for r in records))
 
 @app.route("/subjects/<int:course_id>/attendance/summary")
 def course_attendance_summary(course_id):
@@ -4775,10 +4049,6 @@ def course_attendance_summary(course_id):
 def student_attendance_summary(student_id):
     student = Student.query.get_or_404(student_id)
     if session.get('role') == 'parent':
-        try:
-            db.create_all()
-        except Exception:
-            pass
         link = ParentStudentLink.query.filter_by(parent_username=session.get('user'), student_id=student.id).first()
         if not link:
             flash('You are not authorized to view this student.', 'danger')
@@ -4851,6 +4121,14 @@ def healthz():
         logger.exception("Health check failed")
         return jsonify({"status":"error","message":str(e)}), 500
 
+@app.route("/metrics")
+def metrics():
+    token = app.config.get('METRICS_TOKEN')
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        abort(401)
+    body, content_type = render_metrics()
+    return Response(body, content_type=content_type)
+
 @app.errorhandler(404)
 def handle_404(error):
     return "<h1>404 Not Found</h1>", 404
@@ -4930,28 +4208,14 @@ def admin_audit_export():
     except Exception:
         pass
 
-    logs = q.order_by(AuditLog.created_at.desc()).all()
-    # Prepare CSV
-    import io, csv
-    buf = io.StringIO()
-    writer = csv.writer(buf)
-    writer.writerow(['created_at','action','actor_username','actor_role','target','details'])
-    for l in logs:
-        writer.writerow([
-            l.created_at,
-            l.action or '',
-            l.actor_username or '',
-            l.actor_role or '',
-            l.target or '',
-            (l.details or '').replace('\n',' '),
-        ])
-    csv_data = buf.getvalue()
-    buf.close()
-    return Response(
-        csv_data,
-        mimetype='text/csv',
-        headers={'Content-Disposition': 'attachment; filename="audit_logs.csv"'}
+    logs = streamed(q.with_entities(AuditLog.created_at, AuditLog.action, AuditLog.actor_username,
+                                    AuditLog.actor_role, AuditLog.target, AuditLog.details)
+                    .order_by(AuditLog.created_at.desc()))
+    rows = (
+        [created_at, action or '', actor_username or '', actor_role or '', target or '', (details or '').replace('\n', ' ')]
+        for created_at, action, actor_username, actor_role, target, details in logs
     )
+    return csv_response('audit_logs.csv', ['created_at', 'action', 'actor_username', 'actor_role', 'target', 'details'], rows)
 # --- Finance: Fees ---
 @app.route('/finance/fees', methods=['GET', 'POST'])
 @crud_required('fee', 'read')
@@ -5016,10 +4280,6 @@ def finance_fees():
     # GET: list students with accounts and recent payments
     query = Student.query
     if role == 'parent':
-        try:
-            db.create_all()
-        except Exception:
-            pass
         links = ParentStudentLink.query.filter_by(parent_username=user_email).all()
         student_ids = [l.student_id for l in links]
         query = query.filter(Student.id.in_(student_ids))
@@ -5141,10 +4401,6 @@ def list_invoices():
         else:
             query = query.filter(Invoice.id == -1) # No results
     elif role == 'parent':
-        try:
-            db.create_all()
-        except Exception:
-            pass
         links = ParentStudentLink.query.filter_by(parent_username=user_email).all()
         student_ids = [l.student_id for l in links]
         query = query.filter(Invoice.student_id.in_(student_ids))
@@ -5463,15 +4719,10 @@ def fee_statement_csv(student_id):
         pass
     if method:
         q = q.filter(FeePayment.method == method)
-    payments = q.order_by(FeePayment.paid_at.desc()).all()
-    import io, csv
-    buf = io.StringIO()
-    writer = csv.writer(buf)
-    writer.writerow(['paid_at','amount','method','reference'])
-    for p in payments:
-        writer.writerow([p.paid_at, p.amount, p.method or '', p.reference or ''])
-    data = buf.getvalue(); buf.close()
-    return Response(data, mimetype='text/csv', headers={'Content-Disposition': f'attachment; filename="fee_statement_{student.id}.csv"'})
+    payments = streamed(q.with_entities(FeePayment.paid_at, FeePayment.amount, FeePayment.method, FeePayment.reference)
+                        .order_by(FeePayment.paid_at.desc()))
+    rows = ([paid_at, amount, method or '', reference or ''] for paid_at, amount, method, reference in payments)
+    return csv_response(f"fee_statement_{student.id}.csv", ['paid_at', 'amount', 'method', 'reference'], rows)
 @app.route('/departments')
 @crud_required('department', 'read')
 def list_departments():
@@ -5701,10 +4952,12 @@ def admin_notifications():
                 notif = Notification(recipient_type=recipient_type, recipient_id=uid, title=title, message=message)
                 db.session.add(notif)
         else:
+            ids = [recipient_id]
             notif = Notification(recipient_type=recipient_type, recipient_id=recipient_id, title=title, message=message)
             db.session.add(notif)
             
         db.session.commit()
+        observe_notifications([recipient_type] * len(ids), 'admin')
         flash('Notification(s) sent successfully!', 'success')
         return redirect(url_for('admin_notifications'))
         
@@ -0,0 +1,357 @@
+from project import app, db
+from project.models import BackgroundJob, Course, CourseSession, FacultyLeave, Semester
+from project.jobs import job_handler, job_result
+from sqlalchemy import case, func, or_
+from datetime import date, timedelta
+import hashlib
+import json
+
+class ScheduleRules:
+    """Timetabling governance settings, read from app.config once per run."""
+
+    def __init__(self, config=None):
+        config = config if config is not None else app.config
+        self.allow_weekend = bool(config.get('ALLOW_WEEKEND_SESSIONS', False))
+        self.max_course_week = int(config.get('COURSE_MAX_SESSIONS_PER_WEEK', 10))
+        self.max_faculty_day = int(config.get('FACULTY_MAX_SESSIONS_PER_DAY', 4))
+        self.max_faculty_week = int(config.get('FACULTY_MAX_SESSIONS_PER_WEEK', 20))
+        self.require_approved_leave = bool(config.get('LEAVE_APPROVAL_REQUIRED', True))
+        self.lab_keyword = config.get('LAB_SESSION_KEYWORD') or 'Lab'
+        self.project_keyword = config.get('PROJECT_SESSION_KEYWORD') or 'Project'
+        self.lab_every = int(config.get('LAB_GENERATE_EVERY_N', 0))
+        self.project_every = int(config.get('PROJECT_GENERATE_EVERY_M', 0))
+        self.lab_gap = int(config.get('LAB_MIN_SPACING_DAYS', 3))
+        self.project_gap = int(config.get('PROJECT_MIN_SPACING_DAYS', 7))
+
+class ScheduleState:
+    """Sessions, leaves and load counters for a date range, held in memory.
+
+    Everything is loaded up front in three queries; checks and additions are
+    then dictionary lookups. Weeks are seven-day windows aligned to `anchor`
+    (the generation start date by default), matching the week window the
+    timetable generator has always used. `course_ids`/`faculty_ids` narrow
+    the load to the sessions of those courses or taught by those faculty.
+    """
+
+    def __init__(self, start, end, rules=None, anchor=None, course_ids=None, faculty_ids=None):
+        self.rules = rules or ScheduleRules()
+        self.anchor = anchor or start
+        self.course_ids = course_ids
+        self.faculty_ids = [f for f in faculty_ids if f is not None] if faculty_ids is not None else None
+        self.range_start = self.week_of(start)
+        self.range_end = self.week_of(end) + timedelta(days=6)
+        self.course_week = {}
+        self.faculty_day = {}
+        self.faculty_week = {}
+        self.taken = set()
+        self.course_total = {}
+        self.last_lab = {}
+        self.last_project = {}
+        self.leaves = {}
+        self.planned = []
+        self._load()
+
+    def week_of(self, d):
+        return self.anchor + timedelta(days=7 * ((d - self.anchor).days // 7))
+
+    def _load(self):
+        q = (
+            db.session.query(CourseSession.course_id, Course.faculty_id, CourseSession.session_date)
+            .join(Course, Course.id == CourseSession.course_id)
+            .filter(CourseSession.session_date >= self.range_start, CourseSession.session_date <= self.range_end)
+        )
+        if self.course_ids is not None or self.faculty_ids is not None:
+            q = q.filter(or_(CourseSession.course_id.in_(self.course_ids or []),
+                             Course.faculty_id.in_(self.faculty_ids or [])))
+        rows = q.all()
+        for course_id, faculty_id, d in rows:
+            self._count(course_id, faculty_id, d)
+
+        lab = CourseSession.title.ilike('%' + self.rules.lab_keyword + '%')
+        proj = CourseSession.title.ilike('%' + self.rules.project_keyword + '%')
+        totals = db.session.query(
+            CourseSession.course_id,
+            func.count(CourseSession.id),
+            func.max(case((lab, CourseSession.session_date))),
+            func.max(case((proj, CourseSession.session_date))),
+        )
+        if self.course_ids is not None:
+            totals = totals.filter(CourseSession.course_id.in_(self.course_ids))
+        totals = totals.group_by(CourseSession.course_id).all()
+        for course_id, total, last_lab, last_proj in totals:
+            self.course_total[course_id] = total
+            if last_lab is not None:
+                self.last_lab[course_id] = last_lab
+            if last_proj is not None:
+                self.last_project[course_id] = last_proj
+
+        leave_q = FacultyLeave.query.filter(FacultyLeave.start_date <= self.range_end,
+                                            FacultyLeave.end_date >= self.range_start)
+        if self.faculty_ids is not None:
+            leave_q = leave_q.filter(FacultyLeave.faculty_id.in_(self.faculty_ids))
+        if self.rules.require_approved_leave:
+            leave_q = leave_q.filter(FacultyLeave.approved == True)
+        for leave in leave_q.all():
+            self.leaves.setdefault(leave.faculty_id, []).append((leave.start_date, leave.end_date))
+
+    def _count(self, course_id, faculty_id, d):
+        wk = self.week_of(d)
+        self.course_week[(course_id, wk)] = self.course_week.get((course_id, wk), 0) + 1
+        self.taken.add((course_id, d))
+        if faculty_id is not None:
+            self.faculty_day[(faculty_id, d)] = self.faculty_day.get((faculty_id, d), 0) + 1
+            self.faculty_week[(faculty_id, wk)] = self.faculty_week.get((faculty_id, wk), 0) + 1
+
+    def on_leave(self, faculty_id, d):
+        return any(start <= d <= end for start, end in self.leaves.get(faculty_id, ()))
+
+    def blocked_reason(self, course_id, faculty_id, d):
+        """First governance rule that forbids a session, or None.
+
+        Checked in the generator's historical order so skip counts match:
+        course week cap, faculty day cap, faculty week cap, leave, duplicate.
+        """
+        rules = self.rules
+        if not rules.allow_weekend and d.weekday() >= 5:
+            return 'weekend'
+        wk = self.week_of(d)
+        if self.course_week.get((course_id, wk), 0) >= rules.max_course_week:
+            return 'course_week'
+        if self.faculty_day.get((faculty_id, d), 0) >= rules.max_faculty_day:
+            return 'faculty_day'
+        if self.faculty_week.get((faculty_id, wk), 0) >= rules.max_faculty_week:
+            return 'faculty_week'
+        if self.on_leave(faculty_id, d):
+            return 'leave'
+        if (course_id, d) in self.taken:
+            return 'duplicate'
+        return None
+
+    def spacing_ok(self, course_id, d, kind):
+        last = (self.last_lab if kind == 'lab' else self.last_project).get(course_id)
+        gap = self.rules.lab_gap if kind == 'lab' else self.rules.project_gap
+        return last is None or (d - last).days >= gap
+
+    def rotation_title(self, course_id, d):
+        """Title from the every-N lab / every-M project rotation; project wins ties."""
+        rules = self.rules
+        nth = self.course_total.get(course_id, 0) + 1
+        if rules.project_every > 0 and nth % rules.project_every == 0 and self.spacing_ok(course_id, d, 'project'):
+            return rules.project_keyword
+        if rules.lab_every > 0 and nth % rules.lab_every == 0 and self.spacing_ok(course_id, d, 'lab'):
+            return rules.lab_keyword
+        return 'Lecture'
+
+    def add(self, course_id, faculty_id, d, title):
+        self._count(course_id, faculty_id, d)
+        self.course_total[course_id] = self.course_total.get(course_id, 0) + 1
+        lowered = (title or '').lower()
+        if self.rules.lab_keyword.lower() in lowered:
+            self.last_lab[course_id] = max(d, self.last_lab.get(course_id, d))
+        if self.rules.project_keyword.lower() in lowered:
+            self.last_project[course_id] = max(d, self.last_project.get(course_id, d))
+        self.planned.append({'course_id': course_id, 'session_date': d, 'title': title})
+
+def generate_timetable(start, end=None, rules=None, anchor=None, progress=None):
+    """Fill [start, end] with sessions for every course, entirely in memory.
+
+    Days are walked in order and, within a day, courses by faculty so load
+    spreads across the week. Returns (state, skipped); the new sessions are
+    in state.planned and nothing is written until save_sessions().
+    `progress(done_days, total_days)` is called after each day if given.
+    """
+    end = end or start + timedelta(days=6)
+    state = ScheduleState(start, end, rules, anchor)
+    courses = (
+        db.session.query(Course.id, Course.faculty_id)
+        .filter(Course.faculty_id.isnot(None))
+        .order_by(Course.faculty_id.asc(), Course.id.asc())
+        .all()
+    )
+    skipped = 0
+    total_days = (end - start).days + 1
+    d = start
+    while d <= end:
+        if state.rules.allow_weekend or d.weekday() < 5:
+            for course_id, faculty_id in courses:
+                reason = state.blocked_reason(course_id, faculty_id, d)
+                if reason == 'leave':
+                    skipped += 1
+                if reason:
+                    continue
+                state.add(course_id, faculty_id, d, state.rotation_title(course_id, d))
+        d += timedelta(days=1)
+        if progress:
+            progress((d - start).days, total_days)
+    return state, skipped
+
+def save_sessions(planned):
+    """Persist planned sessions with a single multi-row INSERT (caller commits)."""
+    if planned:
+        db.session.execute(CourseSession.__table__.insert(), planned)
+    return len(planned)
+
+# --- Per-course planning ---
+
+PLAN_HORIZON_DAYS = 365
+
+class CoursePlanner:
+    """Suggest, apply and validate sessions for one course.
+
+    The course's and its faculty's sessions and leaves over the horizon are
+    loaded once; every day is then checked in memory with the same caps,
+    leave and spacing rules as the timetable generator. Weeks run Monday to
+    Sunday.
+    """
+
+    def __init__(self, course, start, days=PLAN_HORIZON_DAYS, rules=None):
+        self.course_id = course.id
+        self.faculty_id = course.faculty_id
+        self.start = start
+        self.end = start + timedelta(days=days - 1)
+        self.state = ScheduleState(start, self.end, rules,
+                                   anchor=start - timedelta(days=start.weekday()),
+                                   course_ids=[course.id], faculty_ids=[course.faculty_id])
+
+    def followup_title(self, d):
+        """Lab once the course has had a lab and the gap allows; project likewise, and wins."""
+        state, rules = self.state, self.state.rules
+        title = 'Lecture'
+        if self.course_id in state.last_lab and state.spacing_ok(self.course_id, d, 'lab'):
+            title = rules.lab_keyword
+        if self.course_id in state.last_project and state.spacing_ok(self.course_id, d, 'project'):
+            title = rules.project_keyword
+        return title
+
+    def plan(self, count):
+        """Up to `count` sessions on the first open days from start; returns state.planned."""
+        d = self.start
+        while len(self.state.planned) < count and d <= self.end:
+            if not self.state.blocked_reason(self.course_id, self.faculty_id, d):
+                self.state.add(self.course_id, self.faculty_id, d, self.followup_title(d))
+            d += timedelta(days=1)
+        return self.state.planned
+
+    def violation(self, d, title=''):
+        """First rule a manually added session on `d` would break, or None.
+
+        Checked in add_session's order: duplicate, weekend, leave, faculty
+        day cap, faculty week cap, course week cap, lab and project spacing.
+        """
+        state, rules = self.state, self.state.rules
+        wk = state.week_of(d)
+        if (self.course_id, d) in state.taken:
+            return 'duplicate'
+        if not rules.allow_weekend and d.weekday() >= 5:
+            return 'weekend'
+        if state.on_leave(self.faculty_id, d):
+            return 'leave'
+        if state.faculty_day.get((self.faculty_id, d), 0) >= rules.max_faculty_day:
+            return 'faculty_day'
+        if state.faculty_week.get((self.faculty_id, wk), 0) >= rules.max_faculty_week:
+            return 'faculty_week'
+        if state.course_week.get((self.course_id, wk), 0) >= rules.max_course_week:
+            return 'course_week'
+        lowered = (title or '').lower()
+        if rules.lab_keyword.lower() in lowered and not state.spacing_ok(self.course_id, d, 'lab'):
+            return 'lab_spacing'
+        if rules.project_keyword.lower() in lowered and not state.spacing_ok(self.course_id, d, 'project'):
+            return 'project_spacing'
+        return None
+
+# --- Semester-scale generation ---
+
+class StalePlanError(RuntimeError):
+    """The sessions or leaves a previewed plan was built from have changed."""
+
+def _rows_digest(*columns):
+    """(row count, sha1 of every row's values in id order) for `columns`, the first being the id."""
+    digest = hashlib.sha1()
+    count = 0
+    rows = db.session.query(*columns).order_by(columns[0]).execution_options(yield_per=5000)
+    for row in rows:
+        digest.update(repr(tuple(row)).encode())
+        count += 1
+    return [count, digest.hexdigest()]
+
+def plan_fingerprint():
+    """Signature of the session and leave rows a plan depends on, compared again at apply time.
+
+    Covers each row's content, not just how many there are, so a session
+    moved to another date or a leave whose dates or approval changed
+    between preview and apply makes the preview stale.
+    """
+    sessions = _rows_digest(CourseSession.id, CourseSession.session_date, CourseSession.course_id)
+    leaves = _rows_digest(FacultyLeave.id, FacultyLeave.faculty_id, FacultyLeave.start_date,
+                          FacultyLeave.end_date, FacultyLeave.approved)
+    return [*sessions, *leaves]
+
+def semester_bounds(semester):
+    if not semester.start_date or not semester.end_date:
+        raise ValueError(f"Semester {semester.number} ({semester.academic_year}) has no start/end dates.")
+    if semester.end_date < semester.start_date:
+        raise ValueError("Semester ends before it starts.")
+    return semester.start_date, semester.end_date
+
+def plan_summary(planned, skipped, anchor):
+    """Per-week and per-title counts for the preview page."""
+    weeks, titles = {}, {}
+    for p in planned:
+        d = p['session_date']
+        wk = anchor + timedelta(days=7 * ((d - anchor).days // 7))
+        weeks[wk] = weeks.get(wk, 0) + 1
+        titles[p['title']] = titles.get(p['title'], 0) + 1
+    return {
+        'created': len(planned),
+        'skipped': skipped,
+        'weeks': [[wk.isoformat(), n] for wk, n in sorted(weeks.items())],
+        'titles': titles,
+    }
+
+def plan_semester(semester, progress=None, rules=None):
+    """Generate the whole semester in one pass with Monday-aligned weeks."""
+    start, end = semester_bounds(semester)
+    anchor = start - timedelta(days=start.weekday())
+    plan, skipped = generate_timetable(start, end, rules=rules, anchor=anchor, progress=progress)
+    summary = plan_summary(plan.planned, skipped, anchor)
+    summary.update(semester_id=semester.id, start=start.isoformat(), end=end.isoformat())
+    return plan, summary
+
+@job_handler('timetable_semester')
+def _semester_timetable_job(progress, params):
+    semester = db.session.get(Semester, params['semester_id'])
+    if semester is None:
+        raise ValueError("Semester not found.")
+    fingerprint = plan_fingerprint()
+    plan, summary = plan_semester(semester, progress=progress)
+    if params.get('dry_run'):
+        summary['fingerprint'] = fingerprint
+        summary['planned'] = [[p['course_id'], p['session_date'].isoformat(), p['title']] for p in plan.planned]
+        return 'preview', summary
+    save_sessions(plan.planned)
+    db.session.commit()
+    return 'done', summary
+
+def apply_semester_plan(job):
+    """Insert a previewed plan in one transaction (caller commits).
+
+    Refuses with StalePlanError if sessions or leaves changed since the
+    preview; the caller should then run a fresh preview.
+    """
+    if job.kind != 'timetable_semester' or job.status != 'preview':
+        raise ValueError("Only a finished timetable preview can be applied.")
+    result = job_result(job)
+    if plan_fingerprint() != result.pop('fingerprint'):
+        raise StalePlanError("Sessions or leaves changed since this preview was generated; preview again.")
+    rows = [{'course_id': course_id, 'session_date': date.fromisoformat(d), 'title': title}
+            for course_id, d, title in result.pop('planned')]
+    # Claim the preview first so a double-submitted apply cannot insert twice
+    table = BackgroundJob.__table__
+    claimed = db.session.execute(
+        table.update()
+        .where(table.c.id == job.id, table.c.status == 'preview')
+        .values(status='done', result=json.dumps(result))
+    ).rowcount
+    if not claimed:
+        raise ValueError("This preview has already been applied.")
+    return save_sessions(rows)
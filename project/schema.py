@@ -0,0 +1,232 @@
+"""Versioned schema migrations.
+
+The applied version lives in the schema_version table. At startup
+bootstrap_schema() checks it once: a fresh database is created and stamped
+at SCHEMA_VERSION, an older one is upgraded when SCHEMA_AUTO_UPGRADE is on,
+and otherwise every request is refused until `flask upgrade-schema` runs.
+A check that fails (a database newer than the code, a migration that
+rolled back, an unreachable database) also refuses requests; the check is
+repeated every SCHEMA_RECHECK_SECONDS until it passes. Request handlers
+never touch DDL.
+
+To change the schema, edit models.py and append a @migration with the next
+version number. Migrations must be idempotent: an unversioned legacy
+database runs all of them in order.
+"""
+from project import app, db
+from project.models import BackgroundJob, ImportRowError, SchemaVersion, StudentMetrics
+from sqlalchemy import inspect, select
+from datetime import datetime
+import logging
+import threading
+import time
+import click
+
+logger = logging.getLogger(__name__)
+
+_recheck_lock = threading.Lock()
+
+class SchemaVersionError(RuntimeError):
+    pass
+
+MIGRATIONS = []
+
+def migration(version, description):
+    def decorator(fn):
+        MIGRATIONS.append((version, description, fn))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return fn
+    return decorator
+
+def _column_default_sql(column, dialect):
+    default = column.default
+    if default is None or not default.is_scalar:
+        return ''
+    value = default.arg
+    if isinstance(value, bool):
+        if dialect.name == 'postgresql':
+            return ' DEFAULT TRUE' if value else ' DEFAULT FALSE'
+        return ' DEFAULT 1' if value else ' DEFAULT 0'
+    if isinstance(value, (int, float)):
+        return f' DEFAULT {value}'
+    if isinstance(value, str):
+        return " DEFAULT '{}'".format(value.replace("'", "''"))
+    return ''
+
+@migration(1, 'Adopt pre-versioning schema: create missing tables and columns')
+def _adopt_legacy_schema(conn):
+    # Replaces migrate_schema.py and update_db_v2..v4.py: compare the live
+    # database with the models and add whatever is missing. Columns are
+    # added as nullable since SQLite cannot add NOT NULL without a default.
+    insp = inspect(conn)
+    existing_tables = set(insp.get_table_names())
+    missing = [t for t in db.metadata.tables.values() if t.name not in existing_tables]
+    if missing:
+        db.metadata.create_all(conn, tables=missing)
+    for table in db.metadata.tables.values():
+        if table.name not in existing_tables:
+            continue
+        have = {c['name'] for c in insp.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in have:
+                continue
+            col_type = column.type.compile(dialect=conn.dialect)
+            default = _column_default_sql(column, conn.dialect)
+            conn.exec_driver_sql(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}{default}')
+            logger.info("schema: added %s.%s", table.name, column.name)
+
+@migration(2, 'Student metrics rollup table, backfilled from history')
+def _student_metrics(conn):
+    from project.student_metrics import rebuild_student_metrics
+    StudentMetrics.__table__.create(conn, checkfirst=True)
+    rebuild_student_metrics(conn)
+
+@migration(3, 'Background job table')
+def _background_jobs(conn):
+    BackgroundJob.__table__.create(conn, checkfirst=True)
+
+@migration(4, 'Per-row error table for background imports')
+def _import_row_errors(conn):
+    ImportRowError.__table__.create(conn, checkfirst=True)
+
+# Indexes for the hot lookup paths (foreign keys that are filtered on, and
+# the date columns that list pages sort by). Declared on the models; the
+# migration only creates the ones an existing database is missing.
+QUERY_PATH_INDEXES = (
+    'ix_enrollments_course_student',
+    'ix_course_faculty_id',
+    'ix_course_department_id',
+    'ix_course_session_date',
+    'ix_attendance_student_session',
+    'ix_faculty_leave_faculty_start',
+    'ix_grade_student_course',
+    'ix_grade_course_exam',
+    'ix_grade_exam_student',
+    'ix_exam_course_date',
+    'ix_audit_log_created_at',
+    'ix_audit_log_action_created',
+    'ix_audit_log_actor_created',
+    'ix_resource_booking_start_time',
+    'ix_resource_booking_end_time',
+    'ix_invoice_student_issued',
+    'ix_fee_payment_student_paid',
+    'ix_fee_payment_paid_at',
+    'ix_notification_recipient_created',
+    'ix_notification_created_at',
+    'ix_notice_expires_at',
+)
+
+def query_path_indexes():
+    by_name = {ix.name: ix for table in db.metadata.tables.values() for ix in table.indexes}
+    return [by_name[name] for name in QUERY_PATH_INDEXES]
+
+@migration(5, 'Query-path index pack')
+def _query_path_indexes(conn):
+    for index in query_path_indexes():
+        index.create(conn, checkfirst=True)
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def current_version(conn):
+    """Applied schema version, 0 for an unversioned database, None for an empty one."""
+    tables = set(inspect(conn).get_table_names())
+    if not tables:
+        return None
+    if SchemaVersion.__tablename__ not in tables:
+        return 0
+    table = SchemaVersion.__table__
+    return conn.execute(select(db.func.max(table.c.version))).scalar() or 0
+
+def _stamp(conn, version, description):
+    conn.execute(SchemaVersion.__table__.insert().values(
+        version=version, description=description, applied_at=datetime.utcnow()))
+
+def upgrade_schema(engine=None):
+    """Bring the database to SCHEMA_VERSION in one transaction; returns the version."""
+    engine = engine if engine is not None else db.engine
+    with engine.begin() as conn:
+        version = current_version(conn)
+        if version is None:
+            db.metadata.create_all(conn)
+            _stamp(conn, SCHEMA_VERSION, 'Initial schema')
+            logger.info("schema: created fresh database at version %s", SCHEMA_VERSION)
+            return SCHEMA_VERSION
+        if version > SCHEMA_VERSION:
+            raise SchemaVersionError(f"Database schema version {version} is newer than this code ({SCHEMA_VERSION}).")
+        if SchemaVersion.__tablename__ not in inspect(conn).get_table_names():
+            SchemaVersion.__table__.create(conn)
+        for v, description, fn in MIGRATIONS:
+            if v > version:
+                logger.info("schema: applying migration %s (%s)", v, description)
+                fn(conn)
+                _stamp(conn, v, description)
+    return SCHEMA_VERSION
+
+def bootstrap_schema(app, engine=None):
+    """Verify the schema once at startup, upgrading it when allowed.
+
+    Records the result in app.extensions['schema']; on a mismatch or a
+    failed check the request guard below answers 503 instead of serving
+    stale-schema pages.
+    """
+    state = {'expected': SCHEMA_VERSION, 'found': None, 'error': None, 'checked_at': time.monotonic()}
+    app.extensions['schema'] = state
+    try:
+        with app.app_context():
+            with (engine if engine is not None else db.engine).connect() as conn:
+                found = current_version(conn)
+            if found != SCHEMA_VERSION and (found is None or app.config.get('SCHEMA_AUTO_UPGRADE')):
+                found = upgrade_schema(engine)
+            state['found'] = found
+    except Exception as e:
+        state['error'] = str(e)
+        logger.error("schema: could not verify database schema: %s", e)
+        return state
+    if state['found'] != SCHEMA_VERSION:
+        logger.error("schema: database is at version %s, code expects %s; run `flask upgrade-schema`",
+                     state['found'], SCHEMA_VERSION)
+    return state
+
+def _unhealthy(state):
+    return state['error'] is not None or state['found'] != state['expected']
+
+def schema_mismatch():
+    """The schema state while it is unusable, re-checking it once SCHEMA_RECHECK_SECONDS have passed."""
+    state = app.extensions.get('schema')
+    if not state or not _unhealthy(state):
+        return None
+    checked_at = state.get('checked_at')
+    due = checked_at is not None and time.monotonic() - checked_at >= app.config.get('SCHEMA_RECHECK_SECONDS', 30)
+    if due and _recheck_lock.acquire(blocking=False):
+        try:
+            state = bootstrap_schema(app)
+        finally:
+            _recheck_lock.release()
+    return state if _unhealthy(state) else None
+
+@app.before_request
+def _refuse_on_schema_mismatch():
+    state = schema_mismatch()
+    if not state:
+        return None
+    if state['error'] is not None:
+        message = f"Database schema could not be verified: {state['error']}"
+    else:
+        message = (f"Database schema version {state['found']} does not match the expected version "
+                   f"{state['expected']}. Run `flask upgrade-schema`.")
+    return message, 503, {'Content-Type': 'text/plain'}
+
+@app.cli.command('upgrade-schema')
+def upgrade_schema_command():
+    """Apply pending schema migrations."""
+    version = upgrade_schema()
+    app.extensions['schema'] = {'expected': SCHEMA_VERSION, 'found': version, 'error': None,
+                                'checked_at': time.monotonic()}
+    click.echo(f'Database schema is at version {version}.')
+
+@app.cli.command('schema-version')
+def schema_version_command():
+    """Show the applied and expected schema versions."""
+    with db.engine.connect() as conn:
+        found = current_version(conn)
+    click.echo(f'Database: {found}  Expected: {SCHEMA_VERSION}')
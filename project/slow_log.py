@@ -0,0 +1,167 @@
+"""Slow-request and slow-query log.
+
+Both are appended to SLOW_LOG_PATH as JSON lines:
+
+- a request slower than SLOW_REQUEST_MS is written with its status,
+  timing and full statement list (from query_stats);
+- a statement slower than SLOW_QUERY_MS is written with its query plan:
+  EXPLAIN QUERY PLAN on SQLite, EXPLAIN on PostgreSQL (EXPLAIN ANALYZE
+  for plain SELECTs when SLOW_LOG_EXPLAIN_ANALYZE is on). Plans are captured on a
+  background thread over a separate pooled connection; databases that
+  share one connection across threads (in-memory SQLite) explain inline.
+
+Only SELECTs are explained, and bound parameters are never logged.
+A threshold of 0 turns that half of the log off.
+"""
+from project import app
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import SingletonThreadPool, StaticPool
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from datetime import datetime
+import click
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_write_lock = threading.Lock()
+_explaining = ContextVar('slow_log_explaining', default=False)
+_executor = None
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='explain')
+    return _executor
+
+def write_record(record):
+    """Append one JSON line to SLOW_LOG_PATH."""
+    path = app.config.get('SLOW_LOG_PATH')
+    if not path:
+        return
+    line = json.dumps(dict(record, ts=datetime.utcnow().isoformat(timespec='milliseconds')), default=str)
+    try:
+        with _write_lock:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+    except OSError as e:
+        logger.warning("Could not write slow log %s: %s", path, e)
+
+def explainable(statement):
+    return statement.lstrip().split(None, 1)[0].upper() in ('SELECT', 'WITH')
+
+def analyzable(statement):
+    """EXPLAIN ANALYZE runs the statement, so only plain SELECTs (a WITH may hold a data-modifying CTE)."""
+    return statement.lstrip().split(None, 1)[0].upper() == 'SELECT'
+
+def explain(conn, statement, parameters):
+    """Query plan lines for `statement` on `conn` (an SQLAlchemy Connection)."""
+    token = _explaining.set(True)
+    try:
+        if conn.dialect.name == 'sqlite':
+            rows = conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters)
+            return [str(r[-1]) for r in rows]
+        analyze = app.config.get('SLOW_LOG_EXPLAIN_ANALYZE') and analyzable(statement)
+        prefix = 'EXPLAIN ANALYZE ' if analyze else 'EXPLAIN '
+        return [str(r[0]) for r in conn.exec_driver_sql(prefix + statement, parameters)]
+    finally:
+        _explaining.reset(token)
+
+def _explain_in_background(engine, record, statement, parameters):
+    with app.app_context():
+        try:
+            with engine.connect() as conn:
+                record['plan'] = explain(conn, statement, parameters)
+        except Exception as e:
+            record['plan_error'] = str(e)
+        write_record(record)
+
+def _shares_connection(engine):
+    return isinstance(engine.pool, (StaticPool, SingletonThreadPool))
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the ExecutionContext: a statement that raises leaves no start behind
+    if app.config.get('SLOW_QUERY_MS') and not _explaining.get() and context is not None:
+        context.slow_log_start = time.perf_counter()
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, 'slow_log_start', None)
+    if started is None or _explaining.get():
+        return
+    ms = (time.perf_counter() - started) * 1000
+    threshold = app.config.get('SLOW_QUERY_MS')
+    if not threshold or ms < threshold:
+        return
+    record = {'type': 'query', 'ms': round(ms, 2), 'statement': statement, 'executemany': executemany,
+              'endpoint': request.endpoint if has_request_context() else None}
+    if executemany or not explainable(statement) or not app.config.get('SLOW_LOG_EXPLAIN', True):
+        write_record(record)
+    elif _shares_connection(conn.engine):
+        try:
+            record['plan'] = explain(conn, statement, parameters)
+        except Exception as e:
+            record['plan_error'] = str(e)
+        write_record(record)
+    else:
+        _get_executor().submit(_explain_in_background, conn.engine, record, statement, parameters)
+
+@app.before_request
+def _start_slow_request_timer():
+    if app.config.get('SLOW_REQUEST_MS'):
+        g.slow_log_started = time.perf_counter()
+
+@app.after_request
+def _remember_status(response):
+    if 'slow_log_started' in g:
+        g.slow_log_status = response.status_code
+    return response
+
+@app.teardown_request
+def _log_slow_request(exc):
+    started = g.get('slow_log_started')
+    if started is None:
+        return
+    ms = (time.perf_counter() - started) * 1000
+    if ms < app.config.get('SLOW_REQUEST_MS'):
+        return
+    stats = g.get('query_stats')
+    write_record({
+        'type': 'request',
+        'ms': round(ms, 2),
+        'method': request.method,
+        'path': request.full_path.rstrip('?'),
+        'endpoint': request.endpoint,
+        'status': g.get('slow_log_status', 500) if exc is None else 500,
+        'query_count': stats.count if stats else None,
+        'query_ms': round(stats.seconds * 1000, 2) if stats else None,
+        'statements': [{'sql': sql, 'ms': round(s * 1000, 2)} for sql, s in stats.statements] if stats else [],
+    })
+
+@app.cli.command('slow-log-report')
+@click.option('--path', default=None, help='Log file (defaults to SLOW_LOG_PATH).')
+@click.option('--top', default=10, show_default=True, help='Rows per section.')
+def slow_log_report_command(path, top):
+    """Summarise the slow log: slowest endpoints and statements."""
+    path = path or app.config.get('SLOW_LOG_PATH')
+    requests, queries = {}, {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            rec = json.loads(line)
+            if rec['type'] == 'request':
+                requests.setdefault(rec['endpoint'] or rec['path'], []).append(rec['ms'])
+            else:
+                queries.setdefault(' '.join(rec['statement'].split()), []).append(rec['ms'])
+    for title, groups in (('Slow requests', requests), ('Slow statements', queries)):
+        click.echo(f'{title}:')
+        ranked = sorted(groups.items(), key=lambda kv: -sum(kv[1]))[:top]
+        for key, times in ranked:
+            click.echo(f'  {len(times):5d} x  max {max(times):8.1f}ms  total {sum(times):9.1f}ms  {key[:100]}')
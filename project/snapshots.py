@@ -0,0 +1,156 @@
+"""Snapshot cache for dashboard payloads.
+
+A snapshot is a computed payload stored under a key (e.g. the dashboard's
+role and department scope) with the tables it was computed from. It is
+fresh for `ttl` seconds and goes stale early when a committed write
+touches one of those tables.
+
+Reads are stale-while-revalidate: a stale snapshot keeps being served
+while a single background refresh recomputes it, so a burst of readers
+never runs the aggregates concurrently. Only a cold key, or one stale for
+longer than `max_stale`, makes readers wait, and then just one of them
+computes while the rest wait for its result. Refreshes run inline when
+JOBS_RUN_INLINE is set (tests).
+
+Snapshots live in process memory; each gunicorn worker keeps its own.
+Invalidation only sees commits made in the same process, so writes from
+another worker are picked up when the TTL runs out, and the "no
+concurrent aggregates" guarantee holds per worker: a cold start can run
+one computation per worker.
+"""
+from project import app, db
+from project.telemetry import observe_snapshot_read, observe_snapshot_refresh
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.sql.dml import UpdateBase
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Readers of a cold snapshot give up waiting on another thread's computation after this long
+WAIT_SECONDS = 60
+
+class Snapshot:
+    __slots__ = ('value', 'computed_at', 'stale')
+
+    def __init__(self, value, computed_at, stale=False):
+        self.value = value
+        self.computed_at = computed_at
+        self.stale = stale
+
+_lock = threading.Lock()
+_snapshots = {}
+_depends_on = {}
+_generations = {}
+_refreshing = {}
+_executor = None
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='snapshot')
+    return _executor
+
+def _name(key):
+    return key[0] if isinstance(key, tuple) else str(key)
+
+def get_snapshot(key, compute, depends_on=(), ttl=60, max_stale=300):
+    """compute() through the snapshot stored under `key`.
+
+    `depends_on` names the tables whose committed writes invalidate it;
+    a `ttl` of 0 bypasses the cache.
+    """
+    if not ttl:
+        return compute()
+    now = time.monotonic()
+    with _lock:
+        if depends_on or key not in _depends_on:
+            _depends_on[key] = frozenset(depends_on)
+        snap = _snapshots.get(key)
+        if snap is not None and not snap.stale and now - snap.computed_at < ttl:
+            observe_snapshot_read(_name(key), 'fresh')
+            return snap.value
+        servable = snap is not None and now - snap.computed_at < ttl + max_stale
+        done = _refreshing.get(key)
+        owner = done is None
+        if owner:
+            done = _refreshing[key] = threading.Event()
+    observe_snapshot_read(_name(key), 'stale' if servable else 'miss')
+    if servable and not app.config.get('JOBS_RUN_INLINE'):
+        if owner:
+            _get_executor().submit(_refresh_in_app_context, key, compute, done)
+        return snap.value
+    if owner:
+        _refresh(key, compute, done)
+    else:
+        done.wait(WAIT_SECONDS)
+    with _lock:
+        snap = _snapshots.get(key)
+    return snap.value if snap is not None else compute()
+
+def _refresh(key, compute, done):
+    with _lock:
+        generation = _generations.get(key, 0)
+    started = time.monotonic()
+    try:
+        value = compute()
+    except Exception:
+        logger.exception("Refreshing snapshot %s failed", key)
+    else:
+        observe_snapshot_refresh(_name(key), time.monotonic() - started)
+        with _lock:
+            # Invalidated while computing: keep it, but refresh again on the next read
+            _snapshots[key] = Snapshot(value, started, stale=_generations.get(key, 0) != generation)
+    finally:
+        with _lock:
+            _refreshing.pop(key, None)
+        done.set()
+
+def _refresh_in_app_context(key, compute, done):
+    with app.app_context():
+        try:
+            _refresh(key, compute, done)
+        finally:
+            db.session.remove()
+
+def invalidate(*tables):
+    """Mark stale the snapshots computed from any of `tables` (all snapshots when none are given)."""
+    tables = set(tables)
+    with _lock:
+        for key, depends_on in _depends_on.items():
+            if tables and not tables & depends_on:
+                continue
+            _generations[key] = _generations.get(key, 0) + 1
+            snap = _snapshots.get(key)
+            if snap is not None:
+                snap.stale = True
+
+def clear():
+    """Drop every snapshot."""
+    with _lock:
+        _snapshots.clear()
+        for key in _depends_on:
+            _generations[key] = _generations.get(key, 0) + 1
+
+# --- Invalidation on commit ---
+# Writes are noted per connection as they execute (ORM flushes and Core
+# statements alike) and applied when that connection commits.
+@event.listens_for(Engine, 'after_execute')
+def _note_write(conn, clauseelement, multiparams, params, execution_options, result):
+    if _depends_on and isinstance(clauseelement, UpdateBase):
+        table = getattr(clauseelement, 'table', None)
+        if table is not None and getattr(table, 'name', None):
+            conn.info.setdefault('snapshot_writes', set()).add(table.name)
+
+@event.listens_for(Engine, 'commit')
+def _invalidate_on_commit(conn):
+    tables = conn.info.pop('snapshot_writes', None)
+    if tables:
+        invalidate(*tables)
+
+@event.listens_for(Engine, 'rollback')
+def _forget_writes(conn):
+    conn.info.pop('snapshot_writes', None)
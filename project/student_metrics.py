@@ -0,0 +1,240 @@
+from project import app, db
+from project.models import (Student, Course, Attendance, Grade, Exam, Invoice, FeePayment,
+                            StudentMetrics, GRADE_POINTS)
+from sqlalchemy import and_, bindparam, case, event, func, inspect, or_, select
+from datetime import datetime
+import click
+
+# Keep IN-lists under SQLite's bound-parameter limit
+CHUNK_SIZE = 500
+
+METRIC_COLUMNS = (
+    'gpa_points', 'gpa_credits', 'final_points', 'final_credits',
+    'attendance_total', 'attendance_present', 'attendance_late', 'attendance_absent', 'attendance_excused',
+    'invoiced_total', 'paid_total',
+)
+
+# Models whose rows feed a student's metrics, keyed on their student_id column
+TRACKED_MODELS = (Grade, Attendance, Invoice, FeePayment)
+
+def grade_points_expr():
+    """SQL equivalent of grade_points(): stored points win, else the letter mapping."""
+    letter = func.upper(Grade.letter)
+    mapped = case(*[(letter == k, v) for k, v in GRADE_POINTS.items()], else_=0.0)
+    return func.coalesce(Grade.points, mapped)
+
+def course_credits_expr():
+    # Mirrors `course.credits or 1`
+    return func.coalesce(func.nullif(Course.credits, 0), 1)
+
+def _chunks(ids):
+    ids = sorted(ids)
+    for i in range(0, len(ids), CHUNK_SIZE):
+        yield ids[i:i + CHUNK_SIZE]
+
+def _empty():
+    return {col: 0 for col in METRIC_COLUMNS}
+
+def _aggregate(conn, student_ids=None):
+    """Recompute metric values from raw rows.
+
+    Returns {student_id: {column: value}} for every existing student in
+    `student_ids` (or every student when None), using one grouped query per
+    source table. Attendance covers every session a student was marked for,
+    including courses they have since dropped, as /analytics always counted
+    it (the student pages used to count enrolled courses only).
+    """
+    pts = grade_points_expr()
+    cr = course_credits_expr()
+    is_final = and_(Grade.exam_id.is_(None), or_(Grade.points.isnot(None), Grade.letter.isnot(None)))
+    status_count = lambda status: func.sum(case((Attendance.status == status, 1), else_=0))
+
+    queries = {
+        'students': select(Student.id),
+        'grades': select(
+            Grade.student_id,
+            func.sum(pts * cr), func.sum(cr),
+            func.sum(case((is_final, pts * cr), else_=0.0)), func.sum(case((is_final, cr), else_=0)),
+        ).join(Course, Course.id == Grade.course_id).group_by(Grade.student_id),
+        'attendance': select(
+            Attendance.student_id, func.count(Attendance.id),
+            status_count('present'), status_count('late'), status_count('absent'), status_count('excused'),
+        ).group_by(Attendance.student_id),
+        'invoices': select(Invoice.student_id, func.sum(Invoice.amount_due)).group_by(Invoice.student_id),
+        'payments': select(FeePayment.student_id, func.sum(FeePayment.amount)).group_by(FeePayment.student_id),
+    }
+    key_cols = {
+        'students': Student.id, 'grades': Grade.student_id, 'attendance': Attendance.student_id,
+        'invoices': Invoice.student_id, 'payments': FeePayment.student_id,
+    }
+    targets = {
+        'grades': ('gpa_points', 'gpa_credits', 'final_points', 'final_credits'),
+        'attendance': ('attendance_total', 'attendance_present', 'attendance_late',
+                       'attendance_absent', 'attendance_excused'),
+        'invoices': ('invoiced_total',),
+        'payments': ('paid_total',),
+    }
+
+    batches = [None] if student_ids is None else list(_chunks(student_ids))
+    result = {}
+    for batch in batches:
+        def run(name):
+            q = queries[name]
+            if batch is not None:
+                q = q.where(key_cols[name].in_(batch))
+            return conn.execute(q).all()
+
+        for (sid,) in run('students'):
+            result[sid] = _empty()
+        for name, cols in targets.items():
+            for row in run(name):
+                vals = result.get(row[0])
+                if vals is None:
+                    continue
+                for col, v in zip(cols, row[1:]):
+                    vals[col] = v or 0
+    return result
+
+def refresh_student_metrics(student_ids, conn=None):
+    """Recompute and upsert the metrics rows for the given students.
+
+    Call this after writes that bypass the ORM unit of work (bulk
+    Query.delete()/update() or Core inserts); ORM changes are picked up by
+    the flush listeners below.
+    """
+    student_ids = {sid for sid in student_ids if sid is not None}
+    if not student_ids:
+        return 0
+    conn = conn if conn is not None else db.session.connection()
+    table = StudentMetrics.__table__
+    fresh = _aggregate(conn, student_ids)
+    now = datetime.utcnow()
+    for batch in _chunks(student_ids):
+        existing = {sid for (sid,) in conn.execute(
+            select(table.c.student_id).where(table.c.student_id.in_(batch)))}
+        gone = [sid for sid in existing if sid not in fresh]
+        if gone:
+            conn.execute(table.delete().where(table.c.student_id.in_(gone)))
+        updates = [dict(fresh[sid], b_student_id=sid, updated_at=now) for sid in batch if sid in existing and sid in fresh]
+        inserts = [dict(fresh[sid], student_id=sid, updated_at=now) for sid in batch if sid not in existing and sid in fresh]
+        if updates:
+            stmt = table.update().where(table.c.student_id == bindparam('b_student_id'))
+            conn.execute(stmt, updates)
+        if inserts:
+            conn.execute(table.insert(), inserts)
+    return len(fresh)
+
+def rebuild_student_metrics(conn=None):
+    """Drop and rebuild every metrics row from raw history (backfills).
+
+    Commits the session unless an explicit connection is passed, in which
+    case the caller owns the transaction.
+    """
+    own = conn is None
+    conn = conn if conn is not None else db.session.connection()
+    table = StudentMetrics.__table__
+    fresh = _aggregate(conn)
+    now = datetime.utcnow()
+    conn.execute(table.delete())
+    rows = [dict(vals, student_id=sid, updated_at=now) for sid, vals in fresh.items()]
+    for i in range(0, len(rows), CHUNK_SIZE):
+        conn.execute(table.insert(), rows[i:i + CHUNK_SIZE])
+    if own:
+        db.session.commit()
+    return len(rows)
+
+def check_student_metrics(tolerance=1e-6):
+    """Compare stored rows with a fresh recomputation; returns mismatched student ids."""
+    conn = db.session.connection()
+    fresh = _aggregate(conn)
+    stored = {m.student_id: m for m in StudentMetrics.query.all()}
+    bad = []
+    for sid, vals in fresh.items():
+        m = stored.get(sid)
+        if m is None:
+            # Students with no activity yet legitimately have no row
+            if any(vals.values()):
+                bad.append(sid)
+        elif any(abs((getattr(m, col) or 0) - vals[col]) > tolerance for col in METRIC_COLUMNS):
+            bad.append(sid)
+    bad.extend(sid for sid in stored if sid not in fresh)
+    return sorted(bad)
+
+def metrics_for(student_ids):
+    """{student_id: StudentMetrics} for the given students, one query.
+
+    Students without a stored row (e.g. before a backfill) get a transient,
+    unsaved row computed on the fly so callers never see stale zeros.
+    """
+    student_ids = {sid for sid in student_ids if sid is not None}
+    found = {}
+    for batch in _chunks(student_ids):
+        for m in StudentMetrics.query.filter(StudentMetrics.student_id.in_(batch)).all():
+            found[m.student_id] = m
+    missing = student_ids - set(found)
+    if missing:
+        for sid, vals in _aggregate(db.session.connection(), missing).items():
+            found[sid] = StudentMetrics(student_id=sid, **vals)
+    return found
+
+def metrics_for_student(student_id):
+    m = metrics_for([student_id]).get(student_id)
+    return m if m is not None else StudentMetrics(student_id=student_id, **_empty())
+
+# --- Incremental maintenance ---
+def _changed_student_ids(obj):
+    ids = {obj.student_id}
+    hist = inspect(obj).attrs.student_id.history
+    ids.update(hist.deleted or ())
+    return ids
+
+@event.listens_for(db.session, 'before_flush')
+def _collect_indirect_changes(session, flush_context, instances):
+    # Changes that alter grade weighting without touching Grade rows; these
+    # must be resolved before the flush rewrites the referencing rows.
+    courses, exams = [], []
+    for obj in session.dirty:
+        if isinstance(obj, Course) and inspect(obj).attrs.credits.history.has_changes():
+            courses.append(obj.id)
+    for obj in session.deleted:
+        if isinstance(obj, Exam):
+            # Deleting an exam nulls Grade.exam_id, which turns those grades final
+            exams.append(obj.id)
+    if not courses and not exams:
+        return
+    pending = session.info.setdefault('student_metrics_dirty', set())
+    conn = session.connection()
+    for col, ids in ((Grade.course_id, courses), (Grade.exam_id, exams)):
+        if ids:
+            pending.update(sid for (sid,) in conn.execute(select(Grade.student_id).where(col.in_(ids))))
+
+@event.listens_for(db.session, 'after_flush')
+def _refresh_dirty_students(session, flush_context):
+    # new/dirty/deleted and attribute history still reflect the flush here,
+    # and foreign keys set through relationships are now populated.
+    pending = session.info.pop('student_metrics_dirty', set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, TRACKED_MODELS):
+            pending.update(_changed_student_ids(obj))
+        elif isinstance(obj, Student) and obj in session.deleted:
+            pending.add(obj.id)
+    if pending:
+        refresh_student_metrics(pending, session.connection())
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_dirty_students(session):
+    session.info.pop('student_metrics_dirty', None)
+
+@app.cli.command('rebuild-metrics')
+@click.option('--check', is_flag=True, help='Only report students whose stored metrics are stale.')
+def rebuild_metrics_command(check):
+    """Rebuild the student_metrics rollup table from raw rows."""
+    if check:
+        bad = check_student_metrics()
+        if bad:
+            click.echo(f"{len(bad)} stale metrics rows: {', '.join(str(i) for i in bad[:50])}")
+            raise SystemExit(1)
+        click.echo('Student metrics are consistent.')
+        return
+    n = rebuild_student_metrics()
+    click.echo(f'Rebuilt metrics for {n} students.')
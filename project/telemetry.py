@@ -0,0 +1,124 @@
+"""Prometheus metrics.
+
+Request counts and latency per endpoint, SQL statements per request (from
+query_stats), database pool checkout waits, background job outcomes,
+import row throughput, notification fan-out and dashboard snapshot reads
+and refreshes. Metrics live in the prometheus_client default registry;
+under gunicorn set PROMETHEUS_MULTIPROC_DIR to an empty directory shared
+by the workers and /metrics aggregates every worker's samples (see
+gunicorn.conf.py for the hook that retires dead workers' files).
+
+Labels are endpoint names, never raw paths, so cardinality stays bounded
+by the route table.
+"""
+from project import app, db
+from flask import g, request
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram,
+                               generate_latest, multiprocess)
+from sqlalchemy import event
+import os
+import time
+
+REQUESTS = Counter('http_requests_total', 'HTTP requests by endpoint, method and status.',
+                   ['endpoint', 'method', 'status'])
+REQUEST_SECONDS = Histogram('http_request_duration_seconds', 'Request latency, including streamed bodies.',
+                            ['endpoint', 'method'],
+                            buckets=(.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30))
+SQL_STATEMENTS = Counter('db_statements_total', 'SQL statements executed, by endpoint.', ['endpoint'])
+SQL_SECONDS = Counter('db_statement_seconds_total', 'Time spent executing SQL, by endpoint.', ['endpoint'])
+SQL_PER_REQUEST = Histogram('db_statements_per_request', 'SQL statements issued by one request.', ['endpoint'],
+                            buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500, 1000))
+POOL_CHECKOUT_SECONDS = Histogram('db_pool_checkout_seconds', 'Time waiting for a pooled database connection.',
+                                  buckets=(.0005, .001, .005, .01, .05, .1, .5, 1, 5, 30))
+JOBS = Counter('background_jobs_total', 'Finished background jobs by kind and outcome.', ['kind', 'status'])
+JOB_SECONDS = Histogram('background_job_duration_seconds', 'Background job run time.', ['kind'],
+                        buckets=(.1, .5, 1, 5, 15, 60, 300, 900, 3600))
+IMPORT_ROWS = Counter('import_rows_total', 'CSV rows processed by bulk imports.', ['kind'])
+NOTIFICATIONS = Counter('notifications_queued_total', 'Notifications queued, by recipient type and source.',
+                        ['recipient_type', 'source'])
+SNAPSHOT_READS = Counter('snapshot_reads_total', 'Dashboard snapshot reads by snapshot and outcome '
+                         '(fresh, stale, miss).', ['snapshot', 'result'])
+SNAPSHOT_REFRESH_SECONDS = Histogram('snapshot_refresh_seconds', 'Time to recompute a dashboard snapshot.',
+                                     ['snapshot'], buckets=(.01, .05, .1, .25, .5, 1, 2.5, 5, 10, 30, 60))
+
+def _endpoint():
+    return request.endpoint or 'unmatched'
+
+def observe_job(kind, status, seconds):
+    JOBS.labels(kind, status).inc()
+    JOB_SECONDS.labels(kind).observe(seconds)
+
+def observe_import_rows(kind, rows):
+    if rows > 0:
+        IMPORT_ROWS.labels(kind).inc(rows)
+
+def observe_notifications(recipient_types, source):
+    """Count queued notifications; `recipient_types` has one entry per notification."""
+    counts = {}
+    for recipient_type in recipient_types:
+        counts[recipient_type] = counts.get(recipient_type, 0) + 1
+    for recipient_type, n in counts.items():
+        NOTIFICATIONS.labels(recipient_type or 'unknown', source).inc(n)
+
+def observe_snapshot_read(name, result):
+    SNAPSHOT_READS.labels(name, result).inc()
+
+def observe_snapshot_refresh(name, seconds):
+    SNAPSHOT_REFRESH_SECONDS.labels(name).observe(seconds)
+
+def render_metrics():
+    """(body, content type) for a scrape, aggregated across workers in multiprocess mode."""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+def _time_checkouts(pool):
+    # Pool events fire only once a connection is handed out, so time connect() itself
+    connect = pool.connect
+
+    def timed_connect():
+        start = time.perf_counter()
+        try:
+            return connect()
+        finally:
+            POOL_CHECKOUT_SECONDS.observe(time.perf_counter() - start)
+
+    pool.connect = timed_connect
+
+def _instrument_engine(engine):
+    _time_checkouts(engine.pool)
+
+    @event.listens_for(engine, 'engine_disposed')
+    def _retime(engine):
+        # dispose() swaps in a fresh pool
+        _time_checkouts(engine.pool)
+
+with app.app_context():
+    _instrument_engine(db.engine)
+
+@app.before_request
+def _start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def _record_status(response):
+    g.response_status = response.status_code
+    return response
+
+@app.teardown_request
+def _observe_request(exc):
+    started = g.get('request_started')
+    if started is None:
+        return
+    endpoint = _endpoint()
+    status = g.get('response_status', 500) if exc is None else 500
+    REQUESTS.labels(endpoint, request.method, str(status)).inc()
+    REQUEST_SECONDS.labels(endpoint, request.method).observe(time.perf_counter() - started)
+    stats = g.get('query_stats')
+    if stats is not None:
+        SQL_STATEMENTS.labels(endpoint).inc(stats.count)
+        SQL_SECONDS.labels(endpoint).inc(stats.seconds)
+        SQL_PER_REQUEST.labels(endpoint).observe(stats.count)
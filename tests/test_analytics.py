@@ -0,0 +1,109 @@
+import unittest
+import sys
+import os
+import werkzeug
+from datetime import date
+
+if not hasattr(werkzeug, "__version__"):
+    werkzeug.__version__ = "3.0.0"
+
+os.environ['FLASK_ENV'] = 'testing'
+# Use TEST_DATABASE_URL from environment if available, otherwise default to sqlite memory for speed
+if 'TEST_DATABASE_URL' not in os.environ:
+    os.environ['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from project import app, db
+from project.models import Student, Course, CourseSession, Attendance, Grade, Department, grade_points
+from project.analytics import compute_analytics
+
+class AnalyticsTests(unittest.TestCase):
+    def setUp(self):
+        self.app = app
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        cs = Department(name='Computer Science', code='CS')
+        me = Department(name='Mechanical', code='ME')
+        db.session.add_all([cs, me])
+        db.session.flush()
+        c1 = Course(name='Algorithms', credits=4, department_id=cs.id)
+        c2 = Course(name='Thermo', credits=None, department_id=me.id)
+        db.session.add_all([c1, c2])
+        db.session.flush()
+        s1 = Student(name='Ann', email='ann@x.edu', phone='1234567', department_id=cs.id)
+        s2 = Student(name='Ben', email='ben@x.edu', phone='1234567', department_id=me.id)
+        s3 = Student(name='Cid', email='cid@x.edu', phone='1234567')
+        db.session.add_all([s1, s2, s3])
+        db.session.flush()
+        db.session.add_all([
+            Grade(student_id=s1.id, course_id=c1.id, letter='A'),
+            Grade(student_id=s1.id, course_id=c2.id, letter='b-'),
+            Grade(student_id=s2.id, course_id=c2.id, letter='C', points=2.5),
+        ])
+        sessions = [CourseSession(course_id=c1.id, session_date=date(2026, 1, d)) for d in (5, 6, 7)]
+        db.session.add_all(sessions)
+        db.session.flush()
+        db.session.add_all([
+            Attendance(session_id=sessions[0].id, student_id=s1.id, status='present'),
+            Attendance(session_id=sessions[1].id, student_id=s1.id, status='late'),
+            Attendance(session_id=sessions[2].id, student_id=s1.id, status='absent'),
+            Attendance(session_id=sessions[0].id, student_id=s2.id, status='excused'),
+            Attendance(session_id=sessions[1].id, student_id=s2.id, status='present'),
+        ])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def _legacy(self):
+        # The per-student loop the /analytics page used to run
+        gpas = []
+        for s in Student.query.all():
+            total_pts, total_cr = 0.0, 0
+            for g in Grade.query.filter_by(student_id=s.id).all():
+                pts = g.points if g.points is not None else grade_points(g.letter)
+                cr = db.session.get(Course, g.course_id).credits or 1
+                total_pts += pts * cr
+                total_cr += cr
+            if total_cr:
+                gpas.append(total_pts / total_cr)
+        rates = []
+        for s in Student.query.all():
+            recs = Attendance.query.filter_by(student_id=s.id).all()
+            if recs:
+                rates.append(sum(1 for r in recs if r.status in ('present', 'late')) / len(recs) * 100.0)
+        return sum(gpas) / len(gpas), sum(rates) / len(rates)
+
+    def test_matches_legacy_computation(self):
+        stats = compute_analytics()
+        avg_gpa, avg_attendance = self._legacy()
+        self.assertAlmostEqual(stats['avg_gpa'], avg_gpa)
+        self.assertAlmostEqual(stats['avg_attendance'], avg_attendance)
+        self.assertEqual(stats['total_students'], 3)
+        self.assertEqual(stats['attendance_counts'], {'present': 2, 'absent': 1, 'late': 1, 'excused': 1})
+
+    def test_department_breakdown(self):
+        rows = {r['name']: r for r in compute_analytics()['department_breakdown']}
+        self.assertEqual(rows['Computer Science']['students'], 1)
+        self.assertAlmostEqual(rows['Mechanical']['avg_gpa'], 2.5)
+        self.assertAlmostEqual(rows['Mechanical']['avg_attendance'], 50.0)
+        self.assertIsNone(rows[None]['avg_gpa'])
+
+    def test_analytics_page(self):
+        with self.client.session_transaction() as sess:
+            sess['logged_in'] = True
+            sess['user'] = 'admin'
+            sess['role'] = 'admin'
+        resp = self.client.get('/analytics')
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn(b'Computer Science', resp.data)
+
+if __name__ == '__main__':
+    unittest.main()
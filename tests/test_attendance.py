@@ -0,0 +1,287 @@
+import unittest
+import sys
+import os
+import werkzeug
+from datetime import date, timedelta
+
+if not hasattr(werkzeug, "__version__"):
+    werkzeug.__version__ = "3.0.0"
+
+os.environ['FLASK_ENV'] = 'testing'
+# Use TEST_DATABASE_URL from environment if available, otherwise default to sqlite memory for speed
+if 'TEST_DATABASE_URL' not in os.environ:
+    os.environ['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import event
+from project import app, db
+from project.models import Student, Faculty, Course, CourseSession, Attendance, StudentMetrics, Department, Notification
+from project.attendance import monthly_attendance_matrix, low_attendance
+
+class BulkAttendanceTests(unittest.TestCase):
+    def setUp(self):
+        self.app = app
+        self.app.config['TESTING'] = True
+        self.saved_edit = self.app.config.get('ATTENDANCE_ALLOW_EDIT')
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        self.faculty = Faculty(name='Prof', email='prof@school.edu', phone='1234567')
+        db.session.add(self.faculty)
+        db.session.flush()
+        self.course = Course(name='Physics', faculty_id=self.faculty.id)
+        self.students = [Student(name=f'S{i}', email=f's{i}@school.edu', phone='1234567') for i in range(30)]
+        self.course.students.extend(self.students)
+        db.session.add(self.course)
+        db.session.flush()
+        self.session = CourseSession(course_id=self.course.id, session_date=date.today())
+        db.session.add(self.session)
+        db.session.commit()
+        db.session.add(Attendance(session_id=self.session.id, student_id=self.students[0].id, status='present'))
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app.config['ATTENDANCE_ALLOW_EDIT'] = self.saved_edit
+        self.ctx.pop()
+
+    def _login(self, role='admin', user='admin'):
+        with self.client.session_transaction() as sess:
+            sess['logged_in'] = True
+            sess['user'] = user
+            sess['role'] = role
+
+    def _statuses(self):
+        db.session.expire_all()
+        return {a.student_id: a.status for a in Attendance.query.filter_by(session_id=self.session.id)}
+
+    def test_form_upserts_whole_roster(self):
+        self._login()
+        form = {f'status_{s.id}': 'late' for s in self.students[:10]}
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            resp = self.client.post(f'/sessions/{self.session.id}/attendance', data=form)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        self.assertEqual(resp.status_code, 302)
+        statuses = self._statuses()
+        self.assertEqual(len(statuses), 30)
+        self.assertEqual(statuses[self.students[0].id], 'late')
+        self.assertEqual(statuses[self.students[20].id], 'absent')
+        writes = [s for s in statements if 'INTO attendance' in s]
+        self.assertEqual(len(writes), 1)
+        self.assertLess(len(statements), 30)
+        row = StudentMetrics.query.filter_by(student_id=self.students[0].id).one()
+        self.assertEqual((row.attendance_total, row.attendance_late), (1, 1))
+
+    def test_edit_disabled_keeps_existing(self):
+        self.app.config['ATTENDANCE_ALLOW_EDIT'] = False
+        self._login()
+        self.client.post(f'/sessions/{self.session.id}/attendance',
+                         data={f'status_{s.id}': 'excused' for s in self.students})
+        statuses = self._statuses()
+        self.assertEqual(statuses[self.students[0].id], 'present')
+        self.assertEqual(statuses[self.students[1].id], 'excused')
+
+    def test_cutoff_applies_to_faculty(self):
+        self.session.session_date = date.today() - timedelta(days=self.app.config['ATTENDANCE_MARKING_CUTOFF_DAYS'] + 1)
+        db.session.commit()
+        self._login('faculty', self.faculty.email)
+        resp = self.client.post(f'/api/sessions/{self.session.id}/attendance',
+                                json={'records': [{'student_id': self.students[1].id, 'status': 'present'}]})
+        self.assertEqual(resp.status_code, 403)
+        self.assertEqual(len(self._statuses()), 1)
+
+    def test_kiosk_endpoint(self):
+        self._login('faculty', self.faculty.email)
+        records = [{'student_id': s.id, 'status': 'present'} for s in self.students[:5]]
+        resp = self.client.post(f'/api/sessions/{self.session.id}/attendance', json={'records': records})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.get_json(), {'ok': True, 'inserted': 4, 'updated': 1, 'unchanged': 0})
+        self.assertEqual(len(self._statuses()), 5)
+
+        outsider = Student(name='X', email='x@school.edu', phone='1234567')
+        db.session.add(outsider)
+        db.session.commit()
+        resp = self.client.post(f'/api/sessions/{self.session.id}/attendance', json={'records': [
+            {'student_id': self.students[6].id, 'status': 'present'},
+            {'student_id': outsider.id, 'status': 'present'},
+            {'student_id': self.students[7].id, 'status': 'asleep'},
+        ]})
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(len(resp.get_json()['errors']), 2)
+        self.assertEqual(len(self._statuses()), 5)
+
+class MonthlyReportTests(unittest.TestCase):
+    def setUp(self):
+        self.app = app
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        self.dept = Department(name='Science')
+        db.session.add(self.dept)
+        db.session.flush()
+        self.courses = [Course(name=f'C{i}', code=f'C{i}', department_id=self.dept.id) for i in range(3)]
+        students = [Student(name=f'S{i:02d}', email=f's{i}@school.edu', phone='1234567') for i in range(12)]
+        for i, c in enumerate(self.courses):
+            c.students.extend(students[i * 3:i * 3 + 8])
+        db.session.add_all(self.courses + students)
+        db.session.flush()
+        statuses = ('present', 'absent', 'late', 'excused')
+        for ci, c in enumerate(self.courses):
+            for day in (3, 10, 17, 24):
+                s = CourseSession(course_id=c.id, session_date=date(2026, 3, day + ci))
+                db.session.add(s)
+                db.session.flush()
+                for k, st in enumerate(c.students):
+                    if (k + day) % 5:
+                        db.session.add(Attendance(session_id=s.id, student_id=st.id, status=statuses[(k * day) % 4]))
+        # Outside the month
+        db.session.add(CourseSession(course_id=self.courses[0].id, session_date=date(2026, 4, 1)))
+        db.session.commit()
+        with self.client.session_transaction() as sess:
+            sess['logged_in'] = True
+            sess['user'] = 'admin'
+            sess['role'] = 'admin'
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_matches_per_cell_lookup(self):
+        for report in monthly_attendance_matrix(self.courses, 2026, 3):
+            self.assertEqual(len(report['sessions']), 4)
+            for row in report['rows']:
+                legacy = []
+                for s in report['sessions']:
+                    att = Attendance.query.filter_by(session_id=s.id, student_id=row['student'].id).first()
+                    legacy.append(att.status if att else '-')
+                self.assertEqual(row['attendance'], legacy)
+                self.assertAlmostEqual(row['rate'], sum(c in ('present', 'late') for c in legacy) / 4 * 100)
+
+    def test_department_scope_query_count(self):
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            resp = self.client.get(f'/attendance/monthly_report?department_id={self.dept.id}&month=3&year=2026')
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        self.assertEqual(resp.status_code, 200)
+        for c in self.courses:
+            self.assertIn(f'>{c.name} ({c.code})</h5>'.encode(), resp.data)
+        self.assertLessEqual(len(statements), 8)
+
+    def test_csv_export(self):
+        resp = self.client.get(f'/attendance/monthly_report?course_id={self.courses[1].id}&month=3&year=2026&format=csv')
+        self.assertEqual(resp.mimetype, 'text/csv')
+        lines = resp.get_data(as_text=True).strip().splitlines()
+        self.assertEqual(len(lines), 1 + 8)
+        header = lines[0].split(',')
+        self.assertEqual(len(header), 4 + 31 + 3)
+        first = lines[1].split(',')
+        self.assertEqual(first[:3], ['C1', 'C1', 'S03'])
+        self.assertEqual(first[4 + 2], '')  # no session on the 3rd
+        self.assertIn(first[4 + 3], ('present', 'absent', 'late', 'excused', '-'))
+
+class LowAttendanceTests(unittest.TestCase):
+    def setUp(self):
+        self.app = app
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        self.depts = [Department(name='Arts'), Department(name='Science')]
+        db.session.add_all(self.depts)
+        db.session.flush()
+        self.courses = [Course(name=f'C{i}', code=f'C{i}', department_id=self.depts[i % 2].id) for i in range(4)]
+        students = [Student(name=f'S{i:02d}', email=f's{i}@school.edu', phone='1234567',
+                            guardian_email=f'g{i}@home.org' if i % 2 else None) for i in range(10)]
+        for i, c in enumerate(self.courses):
+            c.students.extend(students[i:i + 6])
+        db.session.add_all(self.courses + students)
+        db.session.flush()
+        for ci, c in enumerate(self.courses[:3]):  # C3 has no sessions
+            for n in range(5):
+                s = CourseSession(course_id=c.id, session_date=date(2026, 2, 2 + n))
+                db.session.add(s)
+                db.session.flush()
+                for k, st in enumerate(c.students):
+                    if (k + n + ci) % 4:
+                        db.session.add(Attendance(session_id=s.id, student_id=st.id,
+                                                  status=('present', 'absent', 'late', 'excused')[(k * n + ci) % 4]))
+        db.session.commit()
+        with self.client.session_transaction() as sess:
+            sess['logged_in'] = True
+            sess['user'] = 'admin'
+            sess['role'] = 'admin'
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def legacy(self, course, threshold):
+        # The per-student COUNT loop the alerts page used to run
+        out = []
+        for student in course.students:
+            total = CourseSession.query.filter_by(course_id=course.id).count()
+            if total == 0:
+                continue
+            attended = Attendance.query.filter(
+                Attendance.student_id == student.id,
+                Attendance.session_id.in_([s.id for s in course.sessions]),
+                Attendance.status.in_(['present', 'late'])).count()
+            if attended / total * 100 < threshold:
+                out.append((course.id, student.id, total, attended))
+        return sorted(out)
+
+    def test_matches_per_student_counts(self):
+        for threshold in (40.0, 75.0):
+            expected = []
+            for c in self.courses:
+                expected += self.legacy(c, threshold)
+            got = sorted((a['course_id'], a['student_id'], a['total'], a['attended']) for a in low_attendance(threshold))
+            self.assertEqual(got, sorted(expected))
+            self.assertTrue(got)
+        dept = low_attendance(75.0, department_id=self.depts[0].id)
+        self.assertEqual({a['course_id'] for a in dept}, {self.courses[0].id, self.courses[2].id})
+
+    def test_notify_department_in_one_insert(self):
+        expected = low_attendance(75.0, department_id=self.depts[1].id)
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            resp = self.client.post('/subjects/notify_low_attendance',
+                                    data={'department_id': self.depts[1].id, 'threshold': 75})
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        self.assertEqual(resp.status_code, 302)
+        self.assertEqual(len([s for s in statements if 'INTO notification' in s]), 1)
+        parents = sum(1 for a in expected if a['guardian_email'])
+        self.assertEqual(Notification.query.filter_by(recipient_type='student').count(), len(expected))
+        self.assertEqual(Notification.query.filter_by(recipient_type='parent').count(), parents)
+
+    def test_institution_page_and_cli(self):
+        resp = self.client.get('/attendance/low_alerts?scope=all&threshold=75')
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn(b'all courses', resp.data)
+        result = self.app.test_cli_runner().invoke(args=['notify-low-attendance', '--threshold', '75'])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertEqual(Notification.query.filter_by(recipient_type='student').count(), len(low_attendance(75.0)))
+
+if __name__ == '__main__':
+    unittest.main()
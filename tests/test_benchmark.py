@@ -0,0 +1,64 @@
+import unittest
+import sys
+import os
+import werkzeug
+
+if not hasattr(werkzeug, "__version__"):
+    werkzeug.__version__ = "3.0.0"
+
+os.environ['FLASK_ENV'] = 'testing'
+# Use TEST_DATABASE_URL from environment if available, otherwise default to sqlite memory for speed
+if 'TEST_DATABASE_URL' not in os.environ:
+    os.environ['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from project import app, db, benchmark
+from project.datagen import generate_dataset
+from project.models import BackgroundJob, Course, Faculty, Student, enrollments
+
+VOLUMES = dict(students=40, faculty=6, courses=8, attendance=500, grades=100, invoices=30, payments=20,
+               audit=50, notifications=50)
+
+class RouteBenchmarkTests(unittest.TestCase):
+    def setUp(self):
+        self.ctx = app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_every_case_runs(self):
+        generate_dataset('demo', **VOLUMES)
+        cases = benchmark.default_cases(import_rows=5)
+        document = benchmark.run_benchmarks(cases, repeat=2, warmup=0, scale='test')
+        self.assertEqual(benchmark.failed_requests(document), [])
+        self.assertEqual(set(document['routes']), {c.name for c in cases})
+        self.assertTrue(all(r['queries'] > 0 and r['ms_median'] > 0 for r in document['routes'].values()))
+        # The mutating cases did their work: fresh rows on every call
+        self.assertEqual(Student.query.count(), 40 + 10)
+        self.assertEqual(Faculty.query.count(), 6 + 10)
+        self.assertEqual(Course.query.count(), 8 + 10)
+        self.assertEqual(db.session.query(enrollments).filter(
+            enrollments.c.student_id > 40).count(), 10)
+        self.assertEqual({j.status for j in BackgroundJob.query}, {'done'})
+
+    def test_budgets(self):
+        document = {'scale': 'small', 'commit': 'abc', 'routes': {
+            'analytics': {'queries': 8, 'ms_median': 12.0, 'status': 200},
+            'calendar': {'queries': 30, 'ms_median': 50.0, 'status': 200},
+        }}
+        budgets = benchmark.budgets_from(document)
+        self.assertEqual(benchmark.check_budgets(document, budgets), [])
+        document['routes']['analytics']['queries'] = 9
+        document['routes']['calendar']['ms_median'] = 62.0
+        self.assertEqual(benchmark.check_budgets(document, budgets), ['analytics: 9 statements (budget 8)'])
+        document['routes']['calendar']['ms_median'] = 63.0
+        self.assertEqual(len(benchmark.check_budgets(document, budgets)), 2)
+        self.assertEqual(len(benchmark.compare(document, document)), 3)
+
+if __name__ == '__main__':
+    unittest.main()
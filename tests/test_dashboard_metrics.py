@@ -0,0 +1,102 @@
+import unittest
+import sys
+import os
+import werkzeug
+from datetime import date
+
+if not hasattr(werkzeug, "__version__"):
+    werkzeug.__version__ = "3.0.0"
+
+os.environ['FLASK_ENV'] = 'testing'
+# Use TEST_DATABASE_URL from environment if available, otherwise default to sqlite memory for speed
+if 'TEST_DATABASE_URL' not in os.environ:
+    os.environ['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from project import app, db, snapshots
+from project.dashboard_metrics import admin_dashboard_metrics, compute_admin_metrics
+from project.models import Attendance, Course, CourseSession, Department, Invoice, Student
+from project.query_stats import capture_queries
+
+class DashboardMetricsTests(unittest.TestCase):
+    def setUp(self):
+        self.app = app
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        snapshots.clear()
+
+        self.science = Department(name='Science', code='SCI')
+        self.arts = Department(name='Arts', code='ART')
+        db.session.add_all([self.science, self.arts, Department(name='Empty', code='EMP')])
+        db.session.flush()
+        course = Course(name='Physics')
+        db.session.add(course)
+        db.session.flush()
+        sessions = [CourseSession(course_id=course.id, session_date=date(2026, 3, d)) for d in (2, 3, 4, 5)]
+        db.session.add_all(sessions)
+        students = [Student(name=f'S{i}', email=f's{i}@school.edu', phone='1234567', status='active',
+                            department_id=(self.science.id if i < 3 else self.arts.id if i < 5 else None),
+                            admission_date=date(2025, 1, 1 + i))
+                    for i in range(6)]
+        db.session.add_all(students)
+        db.session.flush()
+        # Science: 3 students x 4 sessions, 2 of 4 attended; Arts: all attended; no department: none
+        for s in students:
+            for k, sess in enumerate(sessions):
+                if s.department_id == self.science.id:
+                    status = ('present', 'late', 'absent', 'excused')[k]
+                elif s.department_id == self.arts.id:
+                    status = 'present'
+                else:
+                    status = 'absent'
+                db.session.add(Attendance(session_id=sess.id, student_id=s.id, status=status))
+        db.session.add_all([Invoice(student_id=students[0].id, amount_due=1000.0, paid_amount=400.0),
+                            Invoice(student_id=students[3].id, amount_due=500.0, paid_amount=500.0)])
+        db.session.commit()
+
+    def tearDown(self):
+        self.app.config['DASHBOARD_METRICS_TTL'] = 0
+        snapshots.clear()
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_grouped_metrics(self):
+        with capture_queries() as stats:
+            metrics = compute_admin_metrics()
+        self.assertEqual(stats.count, 4)
+        self.assertEqual((metrics['student_count'], metrics['faculty_count'], metrics['course_count']), (6, 0, 1))
+        self.assertEqual((metrics['total_due'], metrics['total_paid']), (1500.0, 900.0))
+        # (3*2 + 2*4) attended of 24 marks
+        self.assertAlmostEqual(metrics['attendance_rate'], 14 / 24 * 100)
+        self.assertEqual(metrics['dept_attendance'], [{'name': 'Science', 'rate': 50}, {'name': 'Arts', 'rate': 100}])
+        self.assertEqual([a['name'] for a in metrics['recent_admissions']], ['S5', 'S4', 'S3', 'S2', 'S1'])
+        self.assertEqual(metrics['recent_admissions'][0], {'name': 'S5', 'dept': 'General', 'status': 'Active'})
+
+    def test_snapshot_reused_until_a_write(self):
+        self.app.config['DASHBOARD_METRICS_TTL'] = 60
+        first = admin_dashboard_metrics()
+        with capture_queries() as stats:
+            self.assertIs(admin_dashboard_metrics(), first)
+        self.assertEqual(stats.count, 0)
+        db.session.add(Student(name='New', email='new@school.edu', phone='1234567'))
+        db.session.commit()
+        self.assertEqual(admin_dashboard_metrics()['student_count'], 7)
+
+    def test_dashboard_page(self):
+        with self.client.session_transaction() as sess:
+            sess['logged_in'] = True
+            sess['user'] = 'admin'
+            sess['role'] = 'admin'
+        resp = self.client.get('/dashboard')
+        self.assertEqual(resp.status_code, 200)
+        html = resp.get_data(as_text=True)
+        self.assertIn('Science', html)
+        self.assertIn('58%', html)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import unittest
+import sys
+import os
+import werkzeug
+
+if not hasattr(werkzeug, "__version__"):
+    werkzeug.__version__ = "3.0.0"
+
+os.environ['FLASK_ENV'] = 'testing'
+# Use TEST_DATABASE_URL from environment if available, otherwise default to sqlite memory for speed
+if 'TEST_DATABASE_URL' not in os.environ:
+    os.environ['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import func, select
+from project import app, db
+from project.datagen import DatasetExistsError, generate_dataset
+from project.models import (Attendance, AuditLog, CourseSession, FeePayment, Grade, Invoice, Notification,
+                            ParentStudentLink, Student, StudentMetrics, User, enrollments)
+
+VOLUMES = dict(students=60, faculty=8, courses=10, attendance=900, grades=150, invoices=40, payments=30,
+               audit=200, notifications=100)
+
+class DatasetGeneratorTests(unittest.TestCase):
+    def setUp(self):
+        self.ctx = app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_volumes_and_integrity(self):
+        counts = generate_dataset('demo', **VOLUMES)
+        for table in ('student', 'faculty', 'course', 'attendance', 'grade', 'invoice', 'fee_payment',
+                      'audit_log', 'notification'):
+            key = {'student': 'students', 'course': 'courses', 'grade': 'grades', 'invoice': 'invoices',
+                   'fee_payment': 'payments', 'audit_log': 'audit', 'notification': 'notifications'}.get(table, table)
+            self.assertEqual(counts[table], VOLUMES[key], table)
+        self.assertEqual(Attendance.query.count(), 900)
+        # Every attendance mark belongs to a student enrolled in the session's course
+        stray = db.session.execute(
+            select(func.count()).select_from(Attendance)
+            .join(CourseSession, CourseSession.id == Attendance.session_id)
+            .outerjoin(enrollments, (enrollments.c.course_id == CourseSession.course_id)
+                       & (enrollments.c.student_id == Attendance.student_id))
+            .where(enrollments.c.student_id.is_(None))).scalar()
+        self.assertEqual(stray, 0)
+        self.assertEqual(User.query.filter_by(role='student').count(), 60)
+        parent = ParentStudentLink.query.first()
+        self.assertEqual(User.query.filter_by(username=parent.parent_username).first().role, 'parent')
+        self.assertGreater(Grade.query.filter(Grade.exam_id.is_(None)).count(), 0)
+        self.assertEqual(StudentMetrics.query.count(), 60)
+        self.assertTrue(Notification.query.filter_by(read=False).count())
+        self.assertGreater(len({a for (a,) in db.session.query(AuditLog.action).distinct()}), 3)
+        # Payments settle exactly what the invoices record as paid, leaving some fees outstanding
+        paid = dict(db.session.query(Invoice.student_id, func.sum(Invoice.paid_amount)).group_by(Invoice.student_id))
+        payments = dict(db.session.query(FeePayment.student_id, func.sum(FeePayment.amount))
+                        .group_by(FeePayment.student_id))
+        self.assertEqual({sid for sid, total in paid.items() if total}, set(payments))
+        for sid, total in payments.items():
+            self.assertAlmostEqual(total, paid[sid], places=2)
+        owing = StudentMetrics.query.filter(StudentMetrics.invoiced_total > StudentMetrics.paid_total + 0.005).count()
+        settled = StudentMetrics.query.filter(StudentMetrics.invoiced_total > 0,
+                                              StudentMetrics.invoiced_total <= StudentMetrics.paid_total + 0.005).count()
+        self.assertGreater(owing, 0)
+        self.assertGreater(settled, owing)
+
+    def test_seeded_runs_are_reproducible(self):
+        generate_dataset('demo', seed=7, **VOLUMES)
+        first = [(s.name, s.department_id) for s in Student.query.order_by(Student.id)]
+        db.drop_all()
+        db.create_all()
+        generate_dataset('demo', seed=7, **VOLUMES)
+        self.assertEqual(first, [(s.name, s.department_id) for s in Student.query.order_by(Student.id)])
+
+    def test_refuses_populated_database(self):
+        generate_dataset('demo', **VOLUMES)
+        with self.assertRaises(DatasetExistsError):
+            generate_dataset('demo', **VOLUMES)
+        result = app.test_cli_runner().invoke(args=['generate-data', '--scale', 'demo'])
+        self.assertNotEqual(result.exit_code, 0)
+        self.assertIn('empty database', result.output)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import unittest
+import sys
+import os
+import csv
+import werkzeug
+from io import StringIO
+from datetime import date, datetime
+
+if not hasattr(werkzeug, "__version__"):
+    werkzeug.__version__ = "3.0.0"
+
+os.environ['FLASK_ENV'] = 'testing'
+# Use TEST_DATABASE_URL from environment if available, otherwise default to sqlite memory for speed
+if 'TEST_DATABASE_URL' not in os.environ:
+    os.environ['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import event
+from project import app, db
+from project.models import Student, Course, CourseSession, Attendance, AuditLog, FeePayment
+from project.exports import iter_csv
+
+class StreamingExportTests(unittest.TestCase):
+    def setUp(self):
+        self.app = app
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        self.course = Course(name='History')
+        self.students = [Student(name=f'S{i}', email=f's{i}@school.edu', phone='1234567') for i in range(4)]
+        self.course.students.extend(self.students)
+        db.session.add(self.course)
+        db.session.flush()
+        self.sessions = [CourseSession(course_id=self.course.id, session_date=date(2026, 1, d), title=t)
+                         for d, t in ((12, None), (5, 'Intro'))]
+        db.session.add_all(self.sessions)
+        db.session.flush()
+        for s in self.sessions:
+            for st in self.students:
+                db.session.add(Attendance(session_id=s.id, student_id=st.id, status='late', remarks='bus\nlate',
+                                          marked_by='prof', marked_at=datetime(2026, 1, 5, 9, 30)))
+        db.session.add_all([
+            AuditLog(action='login', actor_username='admin', details='line1\nline2', created_at=datetime(2026, 1, 1)),
+            AuditLog(action='logout', actor_username='admin', created_at=datetime(2026, 1, 2)),
+            FeePayment(student_id=self.students[0].id, amount=50.0, method='cash', paid_at=datetime(2026, 1, 3)),
+        ])
+        db.session.commit()
+        with self.client.session_transaction() as sess:
+            sess['logged_in'] = True
+            sess['user'] = 'admin'
+            sess['role'] = 'admin'
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def _csv(self, url):
+        resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.is_streamed)
+        self.assertEqual(resp.mimetype, 'text/csv')
+        return list(csv.reader(StringIO(resp.get_data(as_text=True))))
+
+    def test_course_attendance(self):
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            rows = self._csv(f'/subjects/{self.course.id}/attendance.csv')
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        self.assertEqual(rows[0][:3], ['Date', 'Session Title', 'Student'])
+        self.assertEqual(len(rows), 1 + 8)
+        self.assertEqual(rows[1], ['2026-01-05', 'Intro', 'S0', 's0@school.edu', 'Late', 'bus\nlate', 'prof', '2026-01-05 09:30:00'])
+        self.assertEqual(rows[-1][1], 'Session')
+        self.assertLessEqual(len(statements), 3)
+
+    def test_session_attendance_and_roster(self):
+        rows = self._csv(f'/sessions/{self.sessions[0].id}/attendance.csv')
+        self.assertEqual(len(rows), 1 + 4)
+        self.assertEqual(rows[1][-2:], ['2026-01-12', 'History'])
+        rows = self._csv(f'/subjects/{self.course.id}/roster.csv')
+        self.assertEqual(rows, [['Student', 'Email', 'Phone']] + [[s.name, s.email, s.phone] for s in self.students])
+
+    def test_audit_and_fee_statement(self):
+        rows = self._csv('/admin/audit/export?actor=admin')
+        self.assertEqual([r[1] for r in rows[1:]], ['logout', 'login'])
+        self.assertEqual(rows[2][5], 'line1 line2')
+        rows = self._csv(f'/finance/fees/{self.students[0].id}/statement.csv')
+        self.assertEqual(rows[1], ['2026-01-03 00:00:00', '50.0', 'cash', ''])
+
+    def test_iter_csv_chunks(self):
+        chunks = list(iter_csv(['n'], ([i] for i in range(25)), batch_size=10))
+        self.assertEqual(len(chunks), 3)
+        self.assertEqual(''.join(chunks).split(), ['n'] + [str(i) for i in range(25)])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import unittest
+import sys
+import os
+import werkzeug
+from datetime import date, timedelta
+
+if not hasattr(werkzeug, "__version__"):
+    werkzeug.__version__ = "3.0.0"
+
+os.environ['FLASK_ENV'] = 'testing'
+# Use TEST_DATABASE_URL from environment if available, otherwise default to sqlite memory for speed
+if 'TEST_DATABASE_URL' not in os.environ:
+    os.environ['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from project import app, db
+from project.faculty_overview import faculty_attendance_summary, faculty_overview
+from project.models import Attendance, Course, CourseSession, Faculty, Student
+from project.query_stats import capture_queries
+
+# A Wednesday: the week runs Mon 9th to Sun 15th, the past week from Wed 4th
+TODAY = date(2026, 3, 11)
+
+class FacultyOverviewTests(unittest.TestCase):
+    def setUp(self):
+        self.app = app
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        self.faculty = Faculty(name='Dr Rao', email='rao@school.edu', phone='1234567')
+        other = Faculty(name='Dr Lee', email='lee@school.edu', phone='1234567')
+        db.session.add_all([self.faculty, other])
+        db.session.flush()
+        mine = [Course(name=f'Mine {i}', faculty_id=self.faculty.id) for i in range(2)]
+        theirs = Course(name='Theirs', faculty_id=other.id)
+        db.session.add_all(mine + [theirs])
+        db.session.flush()
+        students = [Student(name=f'S{i}', email=f's{i}@school.edu', phone='1234567') for i in range(4)]
+        db.session.add_all(students)
+        db.session.flush()
+
+        def add_session(course, day, title=None):
+            s = CourseSession(course_id=course.id, session_date=TODAY + timedelta(days=day), title=title)
+            db.session.add(s)
+            db.session.flush()
+            return s
+
+        # Two weeks ago (performance only), the past week, this week and later
+        old = add_session(mine[0], -14)
+        self.recent = [add_session(mine[0], -6, 'Thu'), add_session(mine[1], -2, 'Mon'), add_session(mine[0], -1, 'Tue')]
+        for day in (0, 1, 3, 8, 9, 20, 30):
+            add_session(mine[day % 2], day)
+        add_session(theirs, -1)
+        add_session(theirs, 1)
+        for sess, statuses in ((old, ('absent',) * 4), (self.recent[0], ('present', 'late', 'absent', 'present')),
+                               (self.recent[2], ('present', 'present', 'present', 'excused'))):
+            db.session.add_all(Attendance(session_id=sess.id, student_id=st.id, status=status)
+                               for st, status in zip(students, statuses))
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_overview(self):
+        faculty_id = self.faculty.id
+        with capture_queries() as stats:
+            overview = faculty_overview(faculty_id, today=TODAY)
+            [s['course'].name for s in overview['recent_sessions']] + [s.course.name for s in overview['upcoming_sessions']]
+        self.assertEqual(stats.count, 3)
+        self.assertEqual(overview['active_courses_count'], 2)
+        # Mon 9th to Sun 15th: the -2 and -1 sessions plus today, +1 and +3
+        self.assertEqual(overview['weekly_hours'], 5)
+        self.assertEqual([s.session_date for s in overview['upcoming_sessions']],
+                         [TODAY + timedelta(days=d) for d in (0, 1, 3, 8, 9)])
+        self.assertEqual([(s['title'], s['attendance_marked'], s['stats']) for s in overview['recent_sessions']],
+                         [('Tue', True, '3P, 0L / 4'), ('Mon', False, ''), ('Thu', True, '2P, 1L / 4')])
+
+    def test_no_sessions(self):
+        other = Faculty.query.filter_by(email='lee@school.edu').one()
+        overview = faculty_overview(other.id, today=TODAY + timedelta(days=60))
+        self.assertEqual((overview['upcoming_sessions'], overview['recent_sessions']), ([], []))
+
+    def test_performance(self):
+        total_sessions, rate = faculty_attendance_summary(self.faculty.id)
+        self.assertEqual(total_sessions, 11)
+        # 3 + 3 attended of 12 marks
+        self.assertAlmostEqual(rate, 50.0)
+        with self.client.session_transaction() as sess:
+            sess['logged_in'] = True
+            sess['user'] = 'admin'
+            sess['role'] = 'admin'
+        with capture_queries() as stats:
+            resp = self.client.get(f'/faculty/{self.faculty.id}/performance')
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn(b'50.0%', resp.data)
+        self.assertLessEqual(stats.count, 4)
+
+if __name__ == '__main__':
+    unittest.main()
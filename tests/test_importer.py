@@ -0,0 +1,299 @@
+import unittest
+import sys
+import os
+import json
+import werkzeug
+from io import BytesIO
+from unittest import mock
+
+if not hasattr(werkzeug, "__version__"):
+    werkzeug.__version__ = "3.0.0"
+
+os.environ['FLASK_ENV'] = 'testing'
+# Use TEST_DATABASE_URL from environment if available, otherwise default to sqlite memory for speed
+if 'TEST_DATABASE_URL' not in os.environ:
+    os.environ['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import event, select
+from werkzeug.security import check_password_hash
+from project import app, db
+from project.models import Student, Faculty, Course, Department, User, BackgroundJob, ImportRowError, enrollments
+from project import importer
+from project.importer import EnrollmentImporter, PasswordHasher, StudentImporter
+
+class BulkImportTests(unittest.TestCase):
+    def setUp(self):
+        self.app = app
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        self.dept = Department(name='Computer Science')
+        self.faculty = Faculty(name='Prof', email='prof@school.edu', phone='1234567')
+        db.session.add_all([self.dept, self.faculty])
+        db.session.flush()
+        self.existing = Student(name='Old', email='old@school.edu', phone='1234567', registration_number='REG0')
+        self.course = Course(name='Algorithms', code='CS201', faculty_id=self.faculty.id)
+        db.session.add_all([self.existing, self.course, User(username='taken@school.edu', password_hash='x', role='student')])
+        db.session.commit()
+        with self.client.session_transaction() as sess:
+            sess['logged_in'] = True
+            sess['user'] = 'admin'
+            sess['role'] = 'admin'
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def _upload(self, url, text, **form):
+        form['file'] = (BytesIO(text.encode('utf-8')), 'upload.csv')
+        return self.client.post(url, data=form, content_type='multipart/form-data', follow_redirects=True)
+
+    def test_import_students(self):
+        csv_text = (
+            'name,email,phone,registration_number,department,date_of_birth,sslc_marks,current_semester,password\n'
+            'Ann,Ann@School.edu,1234567,REG1,computer science,2004-02-30,450,1,pw1\n'
+            'Old again,old@school.edu,1234567,REG9,,,,,pw\n'
+            'Dup reg,dup@school.edu,1234567,REG0,,,,,pw\n'
+            'Taken,taken@school.edu,1234567,,,,,,pw\n'
+            'Bad,not-an-email,1234567,,,,,,pw\n'
+            'Ann twice,ann@school.edu,1234567,,,,,,pw\n'
+        )
+        resp = self._upload('/import/students', csv_text, password_strategy='csv')
+        self.assertRegex(resp.get_data(as_text=True),
+                         r'Imported students: 2 created, 1 user accounts created \([0-9.]+ password hashes/sec\), 4 skipped\.')
+        self.assertIn(b'invalid date_of_birth', resp.data)
+        ann = Student.query.filter_by(email='ann@school.edu').one()
+        self.assertEqual((ann.department_id, ann.sslc_marks, ann.date_of_birth, ann.status),
+                         (self.dept.id, 450, None, 'active'))
+        self.assertTrue(check_password_hash(User.query.filter_by(username='ann@school.edu').one().password_hash, 'pw1'))
+        self.assertEqual(Student.query.count(), 3)
+
+    def test_import_faculties_and_subjects(self):
+        resp = self._upload('/import/faculties', 'name,email,phone,department,experience_years\n'
+                            'Dr New,new@school.edu,1234567,Computer Science,x\n'
+                            'Prof,prof@school.edu,1234567,,\n')
+        self.assertIn(b'Imported faculties: 1 created, 0 user accounts created, 1 skipped.', resp.data)
+        new = Faculty.query.filter_by(email='new@school.edu').one()
+        self.assertEqual((new.department_id, new.employment_status), (self.dept.id, 'Full-time'))
+        resp = self._upload('/import/subjects', 'name,code,credits,faculty_email,department,semester\n'
+                            'Compilers,CS301,4,new@school.edu,Computer Science,5\n'
+                            'Algorithms,CS201,3,prof@school.edu,,\n'
+                            'Ghost,CS999,3,nobody@school.edu,,\n'
+                            'Typo,CS401,3,prof@school.edu,Computer Sceince,\n')
+        self.assertIn(b'Imported subjects: 1 created, 3 skipped.', resp.data)
+        self.assertIn(b"unknown department &#39;Computer Sceince&#39;", resp.data)
+        self.assertIsNone(Course.query.filter_by(code='CS401').first())
+        course = Course.query.filter_by(code='CS301').one()
+        self.assertEqual((course.faculty_id, course.credits), (new.id, 4))
+
+    def test_enrollments_use_fixed_queries(self):
+        db.session.execute(Student.__table__.insert(), [
+            {'name': f'S{i}', 'email': f's{i}@school.edu', 'phone': '1234567'} for i in range(300)])
+        db.session.execute(enrollments.insert(), [{'student_id': self.existing.id, 'course_id': self.course.id}])
+        db.session.commit()
+        rows = [{'student_email': f'S{i}@school.edu', 'course_code': 'CS201'} for i in range(300)]
+        rows += [{'student_email': 'old@school.edu', 'course_code': 'CS201'},
+                 {'student_email': 's1@school.edu', 'course_code': 'CS201'},
+                 {'student_email': 's1@school.edu', 'course_code': 'NOPE'}]
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            result = EnrollmentImporter(chunk_size=100).run(rows)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        db.session.commit()
+        self.assertEqual((result.created, result.skipped), (300, 3))
+        self.assertEqual(result.errors, [(302, 'duplicate enrollment (first seen on row 2)'),
+                                         (303, 'student or course not found')])
+        # three prefetches plus one INSERT per chunk
+        self.assertEqual(len(statements), 3 + 3)
+        self.assertEqual(len(db.session.execute(select(enrollments)).all()), 301)
+
+    def test_password_errors_keep_the_record(self):
+        result = StudentImporter(password_strategy='fixed').run(
+            [{'name': 'A', 'email': 'a@school.edu', 'phone': '1234567'}])
+        db.session.commit()
+        self.assertEqual((result.created, result.users_created), (1, 0))
+        self.assertEqual(result.errors, [(1, "No password provided for strategy 'fixed'")])
+
+    def test_parallel_hashing_keeps_row_order(self):
+        hasher = PasswordHasher(workers=2, parallel_min=1)
+        rows = [{'name': f'P{i}', 'email': f'p{i}@school.edu', 'phone': '1234567', 'password': f'secret{i}'}
+                for i in range(6)]
+        result = StudentImporter(password_strategy='csv', hasher=hasher, chunk_size=4).run(rows)
+        db.session.commit()
+        self.assertEqual(result.users_created, 6)
+        self.assertEqual(hasher.count, 6)
+        self.assertGreater(result.hashes_per_second, 0)
+        self.assertIsNone(hasher._pool)
+        self.assertNotEqual(importer._pool_context().get_start_method(), 'fork')
+        for i in range(6):
+            user = User.query.filter_by(username=f'p{i}@school.edu').one()
+            self.assertTrue(check_password_hash(user.password_hash, f'secret{i}'))
+
+class ImportJobTests(unittest.TestCase):
+    setUp = BulkImportTests.setUp
+    tearDown = BulkImportTests.tearDown
+    _upload = BulkImportTests._upload
+
+    def _enrollment_csv(self, n):
+        db.session.execute(Student.__table__.insert(), [
+            {'name': f'S{i}', 'email': f's{i}@school.edu', 'phone': '1234567'} for i in range(n)])
+        db.session.commit()
+        lines = ['student_email,course_code'] + [f's{i}@school.edu,CS201' for i in range(n)]
+        lines.insert(4, 'ghost@school.edu,CS201')
+        return '\n'.join(lines) + '\n'
+
+    def test_job_records_chunks_errors_and_cleans_up(self):
+        with mock.patch.object(importer, 'IMPORT_CHUNK_SIZE', 4):
+            resp = self._upload('/import/enrollments', self._enrollment_csv(10))
+        job = BackgroundJob.query.filter_by(kind='import_csv').one()
+        self.assertIn(b'Imported enrollments: 10 created, 1 skipped.', resp.data)
+        self.assertIn(b'Download error report', resp.data)
+        self.assertEqual((job.status, job.progress, job.total), ('done', 11, 11))
+        self.assertFalse(os.path.exists(json.loads(job.params)['path']))
+        self.assertEqual(self.client.get(f'/import/jobs/{job.id}/status').get_json()['result']['error_count'], 1)
+        report = self.client.get(f'/import/jobs/{job.id}/errors.csv').get_data(as_text=True)
+        self.assertEqual(report.split(), ['Row,Message', '4,student', 'or', 'course', 'not', 'found'])
+
+    def test_resume_after_crash_continues_from_checkpoint(self):
+        original = EnrollmentImporter.parse
+        def crash_on_row_9(self, line, row, result):
+            if line == 9:
+                raise RuntimeError('worker died')
+            return original(self, line, row, result)
+        with mock.patch.object(importer, 'IMPORT_CHUNK_SIZE', 4), \
+                mock.patch.object(EnrollmentImporter, 'parse', crash_on_row_9):
+            self._upload('/import/enrollments', self._enrollment_csv(10))
+        job = BackgroundJob.query.filter_by(kind='import_csv').one()
+        self.assertEqual((job.status, job.error, job.progress), ('failed', 'worker died', 8))
+        self.assertEqual(len(db.session.execute(select(enrollments)).all()), 7)
+        page = self.client.get(f'/import/jobs/{job.id}').get_data(as_text=True)
+        self.assertIn('Resume from row 9', page)
+
+        with mock.patch.object(importer, 'IMPORT_CHUNK_SIZE', 4):
+            self.client.post(f'/import/jobs/{job.id}/resume')
+        db.session.expire_all()
+        job = db.session.get(BackgroundJob, job.id)
+        self.assertEqual(job.status, 'done')
+        self.assertEqual(json.loads(job.result)['created'], 10)
+        self.assertEqual(len(db.session.execute(select(enrollments)).all()), 10)
+        self.assertEqual(ImportRowError.query.filter_by(job_id=job.id).count(), 1)
+
+    def test_validate_reports_diff_without_writing(self):
+        self.existing.phone = '7654321'
+        self.existing.roll_number = 'R0'
+        db.session.commit()
+        csv_text = (
+            'name,email,phone,registration_number,roll_number,department,sslc_marks\n'
+            'Old,OLD@school.edu,7654321,REG0,R0,,\n'
+            'Old Renamed,old@school.edu,1234567,REG0,,Computer Science,abc\n'
+            'New,new@school.edu,1234567,REG1,,,400\n'
+            'Clash,clash@school.edu,1234567,REG0,,,\n'
+            'Bad,bad,1234567,,,,\n'
+            'Other,other@school.edu,1234567,,R0,,\n'
+        )
+        resp = self._upload('/import/students', csv_text, mode='validate')
+        job = BackgroundJob.query.filter_by(kind='import_csv').one()
+        result = json.loads(job.result)
+        self.assertEqual(result['mode'], 'validate')
+        self.assertEqual(result['diff'], {'new': 1, 'unchanged': 1, 'changed': 0, 'invalid': 4})
+        self.assertEqual((result['created'], result['skipped']), (0, 0))
+        self.assertEqual(Student.query.count(), 1)
+        self.assertIn(b'Validated students (nothing was saved)', resp.data)
+
+        resp = self._upload('/import/students', 'name,email,phone,department,sslc_marks\n'
+                            'Old Renamed,old@school.edu,1234567,Computer Science,abc\n', mode='validate')
+        job = BackgroundJob.query.filter_by(kind='import_csv').order_by(BackgroundJob.id.desc()).first()
+        result = json.loads(job.result)
+        self.assertEqual(result['diff']['changed'], 1)
+        self.assertEqual(result['column_changes'], {'name': 1, 'phone': 1, 'department_id': 1})
+        self.assertEqual(result['samples']['changed'][0]['changes']['phone'], ['7654321', '1234567'])
+        self.assertIn(b'<code>department_id</code>', resp.data)
+        self.assertEqual(db.session.get(Student, self.existing.id).name, 'Old')
+
+    def test_validate_checks_rows_past_the_import_cap(self):
+        saved = self.app.config['MAX_BULK_IMPORT_ROWS']
+        self.app.config['MAX_BULK_IMPORT_ROWS'] = 2
+        try:
+            csv_text = 'name,email,phone\n' + ''.join(f'N{i},n{i}@school.edu,1234567\n' for i in range(4)) + 'Bad,bad,1\n'
+            self._upload('/import/students', csv_text, mode='validate')
+            result = json.loads(BackgroundJob.query.filter_by(kind='import_csv').one().result)
+            self.assertEqual((result['rows'], result['truncated_from']), (5, None))
+            self.assertEqual(result['diff'], {'new': 4, 'unchanged': 0, 'changed': 0, 'invalid': 1})
+            self._upload('/import/students', csv_text)
+            job = BackgroundJob.query.filter_by(kind='import_csv').order_by(BackgroundJob.id.desc()).first()
+            self.assertEqual(json.loads(job.result)['truncated_from'], 5)
+            self.assertEqual(Student.query.count(), 3)
+        finally:
+            self.app.config['MAX_BULK_IMPORT_ROWS'] = saved
+
+    def test_sync_updates_changed_columns_in_bulk(self):
+        db.session.execute(Student.__table__.insert(), [
+            {'name': f'S{i}', 'email': f'S{i}@school.edu', 'phone': '1234567', 'registration_number': f'R{i}',
+             'section': 'A', 'status': 'active'} for i in range(6)])
+        db.session.commit()
+        rows = [{'name': f'S{i}', 'email': f's{i}@school.edu', 'phone': '1234567', 'registration_number': f'R{i}',
+                 'section': 'B' if i % 2 else ''} for i in range(6)]
+        rows[0]['phone'] = '9999999'
+        rows[4]['name'] = 'Renamed'
+        rows.append({'name': 'Fresh', 'email': 'fresh@school.edu', 'phone': '1234567', 'registration_number': 'R9'})
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            result = StudentImporter(mode='sync').run(rows)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        db.session.commit()
+        self.assertEqual((result.created, result.updated, result.skipped), (1, 5, 1))
+        self.assertEqual(result.diff, {'new': 1, 'unchanged': 1, 'changed': 5, 'invalid': 0})
+        self.assertEqual(result.column_changes, {'section': 3, 'phone': 1, 'name': 1})
+        updates = [st for st in statements if st.startswith('UPDATE')]
+        # one executemany per distinct set of changed columns: {phone}, {section}, {name}
+        self.assertEqual(len(updates), 3)
+        students = {st.registration_number: st for st in Student.query.all()}
+        self.assertEqual(students['R0'].phone, '9999999')
+        self.assertEqual([students[f'R{i}'].section for i in range(6)], ['A', 'B', 'A', 'B', 'A', 'B'])
+        self.assertEqual(students['R4'].name, 'Renamed')
+        self.assertEqual(students['R9'].status, 'active')
+
+    def test_sync_creates_accounts_only_for_new_usernames(self):
+        rows = [{'name': 'Taken', 'email': 'taken@school.edu', 'phone': '1234567'},
+                {'name': 'Old', 'email': 'old@school.edu', 'phone': '7654321'},
+                {'name': 'Fresh', 'email': 'fresh@school.edu', 'phone': '1234567'}]
+        result = StudentImporter(mode='sync', password_strategy='email').run(rows)
+        db.session.commit()
+        self.assertEqual((result.created, result.updated, result.users_created), (2, 1, 1))
+        self.assertEqual(result.errors, [(1, 'User account for taken@school.edu already exists')])
+        self.assertTrue(check_password_hash(User.query.filter_by(username='fresh@school.edu').one().password_hash,
+                                            'fresh@school.edu'))
+
+    def test_sync_matches_on_registration_number(self):
+        csv_text = ('name,email,phone,registration_number\n'
+                    'Old,renamed@school.edu,1234567,REG0\n'
+                    'Thief,old@school.edu,1234567,REG5\n')
+        resp = self._upload('/import/students', csv_text, mode='sync', match_on='registration_number')
+        self.assertIn(b'Synced students: 0 created, 1 updated', resp.data)
+        self.assertIn(b"email &#39;old@school.edu&#39; already exists", resp.data)
+        self.assertEqual(db.session.get(Student, self.existing.id).email, 'renamed@school.edu')
+        resp = self._upload('/import/subjects', 'name,code,faculty_email\nX,CS201,prof@school.edu\n', mode='sync')
+        self.assertIn(b'Subjects cannot be imported in sync mode.', resp.data)
+
+    def test_fixed_password_is_hashed_before_queueing(self):
+        self._upload('/import/faculties', 'name,email,phone\nDr A,a@school.edu,1234567\n',
+                     password_strategy='fixed', fixed_password='Shared#2026')
+        job = BackgroundJob.query.filter_by(kind='import_csv').one()
+        self.assertNotIn('Shared#2026', job.params)
+        self.assertTrue(check_password_hash(User.query.filter_by(username='a@school.edu').one().password_hash,
+                                            'Shared#2026'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+import unittest
+import sys
+import os
+import werkzeug
+from datetime import date
+
+if not hasattr(werkzeug, "__version__"):
+    werkzeug.__version__ = "3.0.0"
+
+os.environ['FLASK_ENV'] = 'testing'
+# Use TEST_DATABASE_URL from environment if available, otherwise default to sqlite memory for speed
+if 'TEST_DATABASE_URL' not in os.environ:
+    os.environ['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from project import app, db
+from project.models import (Attendance, Course, CourseSession, Department, Faculty, Grade, Invoice, Notice,
+                            ParentStudentLink, Student, StudentMetrics)
+from project.parent_overview import parent_overview
+from project.query_stats import capture_queries
+from project.routes import get_recent_notices
+
+class ParentOverviewTests(unittest.TestCase):
+    def setUp(self):
+        self.app = app
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        self.science = Department(name='Science', code='SCI')
+        self.arts = Department(name='Arts', code='ART')
+        db.session.add_all([self.science, self.arts])
+        db.session.flush()
+        teacher = Faculty(name='Dr Rao', email='rao@school.edu', phone='1234567')
+        db.session.add(teacher)
+        db.session.flush()
+        self.courses = [Course(name=f'Course {i}', code=f'C{i}', credits=3, faculty_id=teacher.id)
+                        for i in range(5)]
+        db.session.add_all(self.courses)
+        db.session.flush()
+        session_obj = CourseSession(course_id=self.courses[0].id, session_date=date(2026, 3, 2))
+        db.session.add(session_obj)
+        db.session.flush()
+        self.children = []
+        for i in range(3):
+            child = Student(name=f'Kid {i}', email=f'kid{i}@school.edu', phone='1234567',
+                            department_id=(self.science.id if i else self.arts.id))
+            child.courses.extend(self.courses[:4])
+            db.session.add(child)
+            db.session.flush()
+            for course in self.courses[:4]:
+                db.session.add(Grade(student_id=child.id, course_id=course.id, letter='A' if i else 'B'))
+            db.session.add(Attendance(session_id=session_obj.id, student_id=child.id,
+                                      status='present' if i else 'absent'))
+            db.session.add(Invoice(student_id=child.id, amount_due=100.0 * (i + 1)))
+            db.session.add(ParentStudentLink(parent_username='mum@home.net', student_id=child.id))
+            self.children.append(child)
+        db.session.add_all([
+            Notice(title='Arts trip', content='x', target_role='parent', department_id=self.arts.id),
+            Notice(title='Staff meeting', content='x', target_role='faculty'),
+            Notice(title='Other department', content='x', target_role='all', department_id=None),
+        ])
+        db.session.commit()
+        with self.client.session_transaction() as sess:
+            sess['logged_in'] = True
+            sess['user'] = 'mum@home.net'
+            sess['role'] = 'parent'
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_overview(self):
+        with capture_queries() as stats:
+            overview = parent_overview('mum@home.net')
+            # Lazy attributes the dashboard template reads
+            [c.faculty.name for entry in overview for c in entry['courses']]
+        self.assertEqual(stats.count, 2)
+        self.assertEqual([e['student'].name for e in overview], ['Kid 0', 'Kid 1', 'Kid 2'])
+        self.assertEqual([e['gpa'] for e in overview], [3.0, 4.0, 4.0])
+        self.assertEqual([e['attendance_rate'] for e in overview], [0.0, 100.0, 100.0])
+        self.assertEqual([e['outstanding'] for e in overview], [100.0, 200.0, 300.0])
+        self.assertEqual([c.code for c in overview[0]['courses']], ['C0', 'C1', 'C2'])
+        self.assertEqual(parent_overview('nobody@home.net'), [])
+
+    def test_missing_rollup_rows_computed(self):
+        StudentMetrics.query.filter_by(student_id=self.children[1].id).delete()
+        db.session.commit()
+        overview = parent_overview('mum@home.net')
+        self.assertEqual((overview[1]['gpa'], overview[1]['outstanding']), (4.0, 200.0))
+
+    def test_pages(self):
+        with capture_queries() as stats:
+            resp = self.client.get('/dashboard')
+        self.assertEqual(resp.status_code, 200)
+        html = resp.get_data(as_text=True)
+        for text in ('Kid 2', 'Dr Rao', 'Arts trip', 'Other department'):
+            self.assertIn(text, html)
+        self.assertNotIn('Staff meeting', html)
+        # A fourth child adds no statements
+        extra = Student(name='Kid 3', email='kid3@school.edu', phone='1234567')
+        extra.courses.extend(self.courses)
+        db.session.add(extra)
+        db.session.flush()
+        db.session.add_all([ParentStudentLink(parent_username='mum@home.net', student_id=extra.id),
+                            Invoice(student_id=extra.id, amount_due=10.0)])
+        db.session.commit()
+        with capture_queries() as more:
+            self.assertIn('Kid 3', self.client.get('/dashboard').get_data(as_text=True))
+        self.assertEqual(more.count, stats.count)
+        profile = self.client.get('/profile').get_data(as_text=True)
+        self.assertIn('Kid 0', profile)
+        self.assertIn('Kid 3', profile)
+
+    def test_notice_board(self):
+        resp = self.client.get('/notices')
+        self.assertEqual(resp.status_code, 200)
+        html = resp.get_data(as_text=True)
+        self.assertIn('Arts trip', html)
+        self.assertIn('Other department', html)
+        self.assertNotIn('Staff meeting', html)
+
+    def test_recent_notices(self):
+        titles = [n.title for n in get_recent_notices('parent', 'mum@home.net')]
+        self.assertEqual(sorted(titles), ['Arts trip', 'Other department'])
+        self.assertEqual([n.title for n in get_recent_notices('parent', 'mum@home.net',
+                                                              department_ids=[self.science.id])],
+                         ['Other department'])
+
+if __name__ == '__main__':
+    unittest.main()
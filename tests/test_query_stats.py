@@ -0,0 +1,115 @@
+import unittest
+import sys
+import os
+import werkzeug
+
+if not hasattr(werkzeug, "__version__"):
+    werkzeug.__version__ = "3.0.0"
+
+os.environ['FLASK_ENV'] = 'testing'
+# Use TEST_DATABASE_URL from environment if available, otherwise default to sqlite memory for speed
+if 'TEST_DATABASE_URL' not in os.environ:
+    os.environ['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from project import app, db
+from project.models import Course, Student
+from project.query_stats import capture_queries, statement_shape
+
+# Statement budgets for pages that must not grow with the number of rows
+QUERY_BUDGETS = {
+    '/dashboard': 12,
+    '/students': 4,
+    '/calendar': 3,
+    '/exams': 3,
+}
+
+class QueryStatsTests(unittest.TestCase):
+    def setUp(self):
+        self.app = app
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        self.course = Course(name='Physics')
+        self.course.students.extend(Student(name=f'S{i}', email=f's{i}@school.edu', phone='1234567')
+                                    for i in range(30))
+        db.session.add(self.course)
+        db.session.commit()
+        with self.client.session_transaction() as sess:
+            sess['logged_in'] = True
+            sess['user'] = 'admin'
+            sess['role'] = 'admin'
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_statement_shape(self):
+        self.assertEqual(statement_shape("SELECT * FROM student WHERE id = 7 AND name = 'O''Neil'"),
+                         'SELECT * FROM student WHERE id = ? AND name = ?')
+        self.assertEqual(statement_shape('SELECT * FROM student\n WHERE id IN (?, ?, ?)'),
+                         statement_shape('SELECT * FROM student WHERE id IN (?, ?)'))
+
+    def test_repeated_shapes_detected(self):
+        ids = [s.id for s in self.course.students]
+        with capture_queries() as stats:
+            for student_id in ids:
+                db.session.get(Student, student_id + 1000)
+            Course.query.all()
+        self.assertEqual(stats.count, 31)
+        [(shape, n, _)] = stats.repeated(threshold=5)
+        self.assertEqual(n, 30)
+        self.assertIn('FROM student', shape)
+
+    def test_failed_statement_leaves_no_timer(self):
+        with capture_queries() as stats:
+            with self.assertRaises(OperationalError):
+                db.session.execute(text('SELECT * FROM no_such_table'))
+            db.session.rollback()
+            db.session.execute(text('SELECT 1'))
+        self.assertEqual(stats.count, 1)
+        self.assertFalse(db.session.connection().info.get('query_stats_start'))
+
+    def test_response_headers(self):
+        with capture_queries() as stats:
+            resp = self.client.get('/students')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(int(resp.headers['X-Query-Count']), stats.count)
+        self.assertIn('X-Query-Time-Ms', resp.headers)
+        self.assertEqual(resp.headers['X-Query-Repeats'], '0')
+
+    def test_repeats_logged(self):
+        self.app.config['QUERY_REPEAT_THRESHOLD'] = 1
+        try:
+            with self.assertLogs('project.query_stats', level='WARNING') as logs:
+                resp = self.client.get('/students')
+        finally:
+            self.app.config['QUERY_REPEAT_THRESHOLD'] = 5
+        self.assertNotEqual(resp.headers['X-Query-Repeats'], '0')
+        self.assertIn('Possible N+1 on students', logs.output[0])
+
+    def test_debug_panel(self):
+        self.app.config['QUERY_DEBUG_PANEL'] = True
+        try:
+            body = self.client.get('/students').get_data(as_text=True)
+        finally:
+            self.app.config['QUERY_DEBUG_PANEL'] = False
+        panel = body.index('fa-database')
+        self.assertLess(panel, body.index('</body>'))
+        self.assertIn('FROM student', body[panel:])
+
+    def test_query_budgets(self):
+        for url, budget in QUERY_BUDGETS.items():
+            resp = self.client.get(url)
+            self.assertEqual(resp.status_code, 200, url)
+            self.assertLessEqual(int(resp.headers['X-Query-Count']), budget, url)
+            self.assertEqual(resp.headers['X-Query-Repeats'], '0', url)
+
+if __name__ == '__main__':
+    unittest.main()
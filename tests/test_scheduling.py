@@ -0,0 +1,357 @@
+import unittest
+import sys
+import os
+import werkzeug
+from datetime import date, timedelta
+
+if not hasattr(werkzeug, "__version__"):
+    werkzeug.__version__ = "3.0.0"
+
+os.environ['FLASK_ENV'] = 'testing'
+# Use TEST_DATABASE_URL from environment if available, otherwise default to sqlite memory for speed
+if 'TEST_DATABASE_URL' not in os.environ:
+    os.environ['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import event
+from project import app, db
+from project.models import Faculty, Course, CourseSession, FacultyLeave, Semester, BackgroundJob
+from project.scheduling import CoursePlanner, generate_timetable, save_sessions, apply_semester_plan, StalePlanError
+from project.jobs import submit_job
+
+WEEK = date(2026, 3, 2)  # a Monday
+
+POLICY = {
+    'FACULTY_MAX_SESSIONS_PER_DAY': 2,
+    'FACULTY_MAX_SESSIONS_PER_WEEK': 9,
+    'COURSE_MAX_SESSIONS_PER_WEEK': 3,
+    'LAB_GENERATE_EVERY_N': 3,
+    'PROJECT_GENERATE_EVERY_M': 5,
+    'LAB_MIN_SPACING_DAYS': 3,
+    'PROJECT_MIN_SPACING_DAYS': 7,
+    'ALLOW_WEEKEND_SESSIONS': False,
+}
+
+def legacy_generate(week_start):
+    # The per-course, per-day query loop timetable_generate used to run
+    cfg = app.config
+    week_end = week_start + timedelta(days=6)
+    created, skipped = [], 0
+    courses = Course.query.order_by(Course.faculty_id.asc(), Course.id.asc()).all()
+    for d in [week_start + timedelta(days=i) for i in range(7)]:
+        if not cfg['ALLOW_WEEKEND_SESSIONS'] and d.weekday() >= 5:
+            continue
+        for course in courses:
+            t = course.faculty
+            in_week = (CourseSession.session_date >= week_start, CourseSession.session_date <= week_end)
+            if CourseSession.query.filter(CourseSession.course_id == course.id, *in_week).count() >= cfg['COURSE_MAX_SESSIONS_PER_WEEK']:
+                continue
+            if CourseSession.query.join(Course).filter(Course.faculty_id == t.id, CourseSession.session_date == d).count() >= cfg['FACULTY_MAX_SESSIONS_PER_DAY']:
+                continue
+            if CourseSession.query.join(Course).filter(Course.faculty_id == t.id, *in_week).count() >= cfg['FACULTY_MAX_SESSIONS_PER_WEEK']:
+                continue
+            if FacultyLeave.query.filter_by(faculty_id=t.id, approved=True).filter(FacultyLeave.start_date <= d, FacultyLeave.end_date >= d).first():
+                skipped += 1
+                continue
+            if CourseSession.query.filter_by(course_id=course.id, session_date=d).first():
+                continue
+            total = CourseSession.query.filter_by(course_id=course.id).count()
+            title = None
+            if (total + 1) % cfg['PROJECT_GENERATE_EVERY_M'] == 0:
+                last = CourseSession.query.filter(CourseSession.course_id == course.id, CourseSession.title.ilike('%Project%')).order_by(CourseSession.session_date.desc()).first()
+                if not last or (d - last.session_date).days >= cfg['PROJECT_MIN_SPACING_DAYS']:
+                    title = 'Project'
+            if title is None and (total + 1) % cfg['LAB_GENERATE_EVERY_N'] == 0:
+                last = CourseSession.query.filter(CourseSession.course_id == course.id, CourseSession.title.ilike('%Lab%')).order_by(CourseSession.session_date.desc()).first()
+                if not last or (d - last.session_date).days >= cfg['LAB_MIN_SPACING_DAYS']:
+                    title = 'Lab'
+            db.session.add(CourseSession(course_id=course.id, session_date=d, title=title or 'Lecture'))
+            created.append((course.id, d, title or 'Lecture'))
+    return created, skipped
+
+def legacy_plan_apply(course, start, remaining):
+    # The day-by-day query loop course_plan_apply used to run
+    cfg = app.config
+    lab_kw, proj_kw = cfg['LAB_SESSION_KEYWORD'].lower(), cfg['PROJECT_SESSION_KEYWORD'].lower()
+    created = []
+    d = start
+    for _ in range(365):
+        if remaining <= 0:
+            break
+        week_start = d - timedelta(days=d.weekday())
+        in_week = (CourseSession.session_date >= week_start, CourseSession.session_date <= week_start + timedelta(days=6))
+        ok = (cfg['ALLOW_WEEKEND_SESSIONS'] or d.weekday() < 5) \
+            and CourseSession.query.filter_by(course_id=course.id).filter(*in_week).count() < cfg['COURSE_MAX_SESSIONS_PER_WEEK'] \
+            and CourseSession.query.join(Course).filter(Course.faculty_id == course.faculty_id, CourseSession.session_date == d).count() < cfg['FACULTY_MAX_SESSIONS_PER_DAY'] \
+            and CourseSession.query.join(Course).filter(Course.faculty_id == course.faculty_id, *in_week).count() < cfg['FACULTY_MAX_SESSIONS_PER_WEEK'] \
+            and not FacultyLeave.query.filter_by(faculty_id=course.faculty_id, approved=True).filter(FacultyLeave.start_date <= d, FacultyLeave.end_date >= d).first() \
+            and not CourseSession.query.filter_by(course_id=course.id, session_date=d).first()
+        if ok:
+            title = 'Lecture'
+            last_lab = CourseSession.query.filter(CourseSession.course_id == course.id, CourseSession.title.ilike('%' + lab_kw + '%')).order_by(CourseSession.session_date.desc()).first()
+            if last_lab and (d - last_lab.session_date).days >= cfg['LAB_MIN_SPACING_DAYS']:
+                title = cfg['LAB_SESSION_KEYWORD']
+            last_proj = CourseSession.query.filter(CourseSession.course_id == course.id, CourseSession.title.ilike('%' + proj_kw + '%')).order_by(CourseSession.session_date.desc()).first()
+            if last_proj and (d - last_proj.session_date).days >= cfg['PROJECT_MIN_SPACING_DAYS']:
+                title = cfg['PROJECT_SESSION_KEYWORD']
+            db.session.add(CourseSession(course_id=course.id, session_date=d, title=title))
+            created.append((course.id, d, title))
+            remaining -= 1
+        d += timedelta(days=1)
+    return created
+
+class TimetableGenerateTests(unittest.TestCase):
+    def setUp(self):
+        self.app = app
+        self.app.config['TESTING'] = True
+        self.saved = {k: self.app.config.get(k) for k in POLICY}
+        self.app.config.update(POLICY)
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        faculty = [Faculty(name=f'F{i}', email=f'f{i}@school.edu', phone='1234567') for i in range(3)]
+        db.session.add_all(faculty)
+        db.session.flush()
+        courses = [Course(name=f'C{i}', faculty_id=faculty[i % 3].id) for i in range(7)]
+        db.session.add_all(courses)
+        db.session.flush()
+        # History: earlier labs/projects and sessions already in the target week
+        db.session.add_all([
+            CourseSession(course_id=courses[0].id, session_date=WEEK - timedelta(days=20), title='Lecture'),
+            CourseSession(course_id=courses[0].id, session_date=WEEK - timedelta(days=13), title='Intro lab'),
+            CourseSession(course_id=courses[1].id, session_date=WEEK - timedelta(days=3), title='Project kickoff'),
+            CourseSession(course_id=courses[1].id, session_date=WEEK - timedelta(days=2), title='Lecture'),
+            CourseSession(course_id=courses[1].id, session_date=WEEK - timedelta(days=1), title='Lecture'),
+            CourseSession(course_id=courses[1].id, session_date=WEEK - timedelta(days=4), title='Lecture'),
+            CourseSession(course_id=courses[2].id, session_date=WEEK + timedelta(days=1), title='Lecture'),
+            CourseSession(course_id=courses[3].id, session_date=WEEK + timedelta(days=2), title='Lecture'),
+        ])
+        db.session.add_all([
+            FacultyLeave(faculty_id=faculty[1].id, start_date=WEEK + timedelta(days=1), end_date=WEEK + timedelta(days=2), approved=True),
+            FacultyLeave(faculty_id=faculty[2].id, start_date=WEEK, end_date=WEEK, approved=False),
+        ])
+        db.session.commit()
+        self.courses = courses
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app.config.update(self.saved)
+        self.ctx.pop()
+
+    def test_matches_legacy_generator(self):
+        expected, expected_skipped = legacy_generate(WEEK)
+        db.session.rollback()
+        plan, skipped = generate_timetable(WEEK)
+        got = [(p['course_id'], p['session_date'], p['title']) for p in plan.planned]
+        self.assertEqual(sorted(got), sorted(expected))
+        self.assertEqual(skipped, expected_skipped)
+        self.assertTrue(any(t == 'Lab' for _, _, t in got))
+        self.assertGreater(skipped, 0)
+
+    def test_query_count_independent_of_courses(self):
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            plan, _ = generate_timetable(WEEK)
+            save_sessions(plan.planned)
+            db.session.commit()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        inserts = [s for s in statements if s.lstrip().upper().startswith('INSERT')]
+        self.assertEqual(len(inserts), 1)
+        self.assertLessEqual(len(statements), 6)
+
+    def test_route_persists_plan(self):
+        with self.client.session_transaction() as sess:
+            sess['logged_in'] = True
+            sess['user'] = 'admin'
+            sess['role'] = 'admin'
+        before = CourseSession.query.count()
+        resp = self.client.post('/timetable/generate', data={'week_start': WEEK.isoformat()})
+        self.assertEqual(resp.status_code, 302)
+        self.assertGreater(CourseSession.query.count(), before)
+
+class CoursePlannerTests(unittest.TestCase):
+    def setUp(self):
+        self.app = app
+        self.app.config['TESTING'] = True
+        self.saved = {k: self.app.config.get(k) for k in POLICY}
+        self.app.config.update(POLICY)
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        faculty = Faculty(name='F', email='f@school.edu', phone='1234567')
+        db.session.add(faculty)
+        db.session.flush()
+        self.course = Course(name='Networks', faculty_id=faculty.id, credits=3)
+        other = Course(name='Other', faculty_id=faculty.id)
+        db.session.add_all([self.course, other])
+        db.session.flush()
+        db.session.add_all([
+            CourseSession(course_id=self.course.id, session_date=WEEK - timedelta(days=2), title='Lab 1'),
+            CourseSession(course_id=self.course.id, session_date=WEEK - timedelta(days=9), title='Project brief'),
+            CourseSession(course_id=other.id, session_date=WEEK, title='Lecture'),
+            CourseSession(course_id=other.id, session_date=WEEK + timedelta(days=7), title='Lecture'),
+        ])
+        db.session.add(FacultyLeave(faculty_id=faculty.id, start_date=WEEK + timedelta(days=10),
+                                    end_date=WEEK + timedelta(days=15), approved=True))
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app.config.update(self.saved)
+        self.ctx.pop()
+
+    def test_matches_legacy_apply(self):
+        expected = legacy_plan_apply(self.course, WEEK, 20)
+        db.session.rollback()
+        got = [(p['course_id'], p['session_date'], p['title']) for p in CoursePlanner(self.course, WEEK).plan(20)]
+        self.assertEqual(got, expected)
+        self.assertEqual(len(got), 20)
+        self.assertTrue({'Lab', 'Project'} <= {t for _, _, t in got})
+
+    def test_suggest_query_count_is_constant(self):
+        with self.client.session_transaction() as sess:
+            sess['logged_in'] = True
+            sess['user'] = 'admin'
+            sess['role'] = 'admin'
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            resp = self.client.get(f'/subjects/{self.course.id}/plan/suggest')
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(sum(resp.data.count(f'<td>{t}</td>'.encode()) for t in ('Lecture', 'Lab', 'Project')), 43)
+        self.assertLessEqual(len(statements), 10)
+
+    def test_add_session_rules(self):
+        with self.client.session_transaction() as sess:
+            sess['logged_in'] = True
+            sess['user'] = 'admin'
+            sess['role'] = 'admin'
+        url = f'/subjects/{self.course.id}/sessions/add'
+        resp = self.client.post(url, data={'session_date': (WEEK + timedelta(days=10)).isoformat(), 'title': 'Lecture'})
+        self.assertIn(b'on leave', resp.data)
+        resp = self.client.post(url, data={'session_date': WEEK.isoformat(), 'title': 'Lab 2'})
+        self.assertIn(b'Lab sessions must be spaced', resp.data)
+        resp = self.client.post(url, data={'session_date': (WEEK + timedelta(days=1)).isoformat(), 'title': 'Lab 2'})
+        self.assertEqual(resp.status_code, 302)
+        self.assertEqual(CourseSession.query.filter_by(course_id=self.course.id).count(), 3)
+
+class SemesterTimetableTests(unittest.TestCase):
+    def setUp(self):
+        self.app = app
+        self.app.config['TESTING'] = True
+        self.saved = {k: self.app.config.get(k) for k in POLICY}
+        self.app.config.update(POLICY)
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        faculty = [Faculty(name=f'F{i}', email=f'f{i}@school.edu', phone='1234567') for i in range(2)]
+        db.session.add_all(faculty)
+        db.session.flush()
+        db.session.add_all([Course(name=f'C{i}', faculty_id=faculty[i % 2].id) for i in range(5)])
+        # Starts on a Wednesday so the first week is partial
+        self.semester = Semester(number=1, academic_year='2025-2026', start_date=WEEK + timedelta(days=2),
+                                 end_date=WEEK + timedelta(days=2 + 7 * 4))
+        db.session.add(self.semester)
+        db.session.add(FacultyLeave(faculty_id=faculty[0].id, start_date=WEEK + timedelta(days=14),
+                                    end_date=WEEK + timedelta(days=16), approved=True))
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app.config.update(self.saved)
+        self.ctx.pop()
+
+    def _login(self):
+        with self.client.session_transaction() as sess:
+            sess['logged_in'] = True
+            sess['user'] = 'admin'
+            sess['role'] = 'admin'
+
+    def test_matches_week_by_week_generation(self):
+        start, end = self.semester.start_date, self.semester.end_date
+        expected, expected_skipped = [], 0
+        wk = start - timedelta(days=start.weekday())
+        while wk <= end:
+            plan, skipped = generate_timetable(max(wk, start), min(wk + timedelta(days=6), end), anchor=wk)
+            save_sessions(plan.planned)
+            db.session.flush()
+            expected += [(p['course_id'], p['session_date'], p['title']) for p in plan.planned]
+            expected_skipped += skipped
+            wk += timedelta(days=7)
+        db.session.rollback()
+
+        job = submit_job('timetable_semester', {'semester_id': self.semester.id, 'dry_run': True})
+        self.assertEqual(job.status, 'preview')
+        self.assertEqual(job.progress, job.total)
+        self.assertEqual(CourseSession.query.count(), 0)
+        created = apply_semester_plan(job)
+        db.session.commit()
+        got = [(s.course_id, s.session_date, s.title) for s in CourseSession.query.all()]
+        self.assertEqual(created, len(expected))
+        self.assertEqual(sorted(got), sorted(expected))
+        self.assertGreater(expected_skipped, 0)
+
+    def test_stale_preview_is_refused(self):
+        job = submit_job('timetable_semester', {'semester_id': self.semester.id, 'dry_run': True})
+        db.session.add(CourseSession(course_id=Course.query.first().id, session_date=WEEK))
+        db.session.commit()
+        with self.assertRaises(StalePlanError):
+            apply_semester_plan(job)
+        db.session.rollback()
+        self.assertEqual(CourseSession.query.count(), 1)
+
+    def test_edited_session_or_leave_makes_preview_stale(self):
+        session_obj = CourseSession(course_id=Course.query.first().id, session_date=WEEK + timedelta(days=3))
+        db.session.add(session_obj)
+        db.session.commit()
+        job = submit_job('timetable_semester', {'semester_id': self.semester.id, 'dry_run': True})
+        session_obj.session_date = WEEK + timedelta(days=4)
+        db.session.commit()
+        with self.assertRaises(StalePlanError):
+            apply_semester_plan(job)
+        db.session.rollback()
+
+        job = submit_job('timetable_semester', {'semester_id': self.semester.id, 'dry_run': True})
+        leave = FacultyLeave.query.one()
+        leave.end_date = leave.end_date + timedelta(days=7)
+        db.session.commit()
+        with self.assertRaises(StalePlanError):
+            apply_semester_plan(job)
+        db.session.rollback()
+        self.assertEqual(CourseSession.query.count(), 1)
+
+    def test_routes_preview_poll_and_apply(self):
+        self._login()
+        resp = self.client.post('/timetable/semester', data={'semester_id': self.semester.id, 'mode': 'preview'})
+        self.assertEqual(resp.status_code, 302)
+        job = BackgroundJob.query.one()
+        status = self.client.get(f'/timetable/jobs/{job.id}/status').get_json()
+        self.assertEqual(status['status'], 'preview')
+        self.assertEqual(status['percent'], 100)
+        self.assertEqual(self.client.get(f'/timetable/jobs/{job.id}').status_code, 200)
+        self.assertEqual(CourseSession.query.count(), 0)
+        self.client.post(f'/timetable/jobs/{job.id}/apply')
+        count = CourseSession.query.count()
+        self.assertGreater(count, 0)
+        # A second apply is rejected rather than inserting twice
+        self.client.post(f'/timetable/jobs/{job.id}/apply')
+        self.assertEqual(CourseSession.query.count(), count)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+import unittest
+import sys
+import os
+import tempfile
+import werkzeug
+from unittest import mock
+
+if not hasattr(werkzeug, "__version__"):
+    werkzeug.__version__ = "3.0.0"
+
+os.environ['FLASK_ENV'] = 'testing'
+# Use TEST_DATABASE_URL from environment if available, otherwise default to sqlite memory for speed
+if 'TEST_DATABASE_URL' not in os.environ:
+    os.environ['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import create_engine, inspect, text
+from project import app
+from project import schema
+from project.schema import (MIGRATIONS, QUERY_PATH_INDEXES, SCHEMA_VERSION, SchemaVersionError, bootstrap_schema,
+                            current_version, query_path_indexes, upgrade_schema)
+
+class SchemaTests(unittest.TestCase):
+    def setUp(self):
+        self.ctx = app.app_context()
+        self.ctx.push()
+        fd, self.path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        os.remove(self.path)
+        self.engine = create_engine(f'sqlite:///{self.path}')
+
+    def tearDown(self):
+        self.engine.dispose()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.ctx.pop()
+
+    def test_fresh_database_is_created_and_stamped(self):
+        self.assertEqual(upgrade_schema(self.engine), SCHEMA_VERSION)
+        with self.engine.connect() as conn:
+            self.assertEqual(current_version(conn), SCHEMA_VERSION)
+            self.assertIn('student_metrics', inspect(conn).get_table_names())
+
+    def test_legacy_database_is_adopted(self):
+        with self.engine.begin() as conn:
+            conn.execute(text('CREATE TABLE course (id INTEGER PRIMARY KEY, name VARCHAR(100) NOT NULL)'))
+            conn.execute(text("INSERT INTO course (id, name) VALUES (1, 'Legacy')"))
+        with self.engine.connect() as conn:
+            self.assertEqual(current_version(conn), 0)
+        upgrade_schema(self.engine)
+        with self.engine.connect() as conn:
+            cols = {c['name'] for c in inspect(conn).get_columns('course')}
+            self.assertIn('syllabus_progress', cols)
+            self.assertEqual(conn.execute(text('SELECT syllabus_progress FROM course')).scalar(), 0)
+            self.assertEqual(current_version(conn), SCHEMA_VERSION)
+        # Running again is a no-op
+        self.assertEqual(upgrade_schema(self.engine), SCHEMA_VERSION)
+
+    def test_index_pack_added_to_existing_database(self):
+        upgrade_schema(self.engine)
+        with self.engine.begin() as conn:
+            for index in query_path_indexes():
+                index.drop(conn)
+            conn.execute(text('DELETE FROM schema_version'))
+            conn.execute(text("INSERT INTO schema_version (version, applied_at) VALUES (4, '2026-01-01')"))
+        upgrade_schema(self.engine)
+        with self.engine.connect() as conn:
+            insp = inspect(conn)
+            names = {ix['name'] for t in insp.get_table_names() for ix in insp.get_indexes(t)}
+            self.assertTrue(set(QUERY_PATH_INDEXES) <= names)
+            plan = ' '.join(str(r[-1]) for r in conn.execute(text(
+                'EXPLAIN QUERY PLAN SELECT * FROM grade WHERE student_id = 1 ORDER BY course_id')))
+            self.assertIn('ix_grade_student_course', plan)
+
+    def test_newer_database_is_rejected(self):
+        upgrade_schema(self.engine)
+        with self.engine.begin() as conn:
+            conn.execute(text(f"INSERT INTO schema_version (version, applied_at) VALUES ({SCHEMA_VERSION + 1}, '2030-01-01')"))
+        with self.assertRaises(SchemaVersionError):
+            upgrade_schema(self.engine)
+
+    def test_requests_refused_on_mismatch(self):
+        saved = app.extensions['schema']
+        app.extensions['schema'] = {'expected': SCHEMA_VERSION, 'found': SCHEMA_VERSION - 1, 'error': None}
+        try:
+            resp = app.test_client().get('/login')
+            self.assertEqual(resp.status_code, 503)
+        finally:
+            app.extensions['schema'] = saved
+        self.assertEqual(app.test_client().get('/login').status_code, 200)
+
+    def test_failed_check_refuses_requests(self):
+        def broken(conn):
+            raise RuntimeError('migration failed')
+
+        saved = app.extensions['schema']
+        upgrade_schema(self.engine)
+        try:
+            # A database newer than the code cannot be auto-upgraded
+            with self.engine.begin() as conn:
+                conn.execute(text(f"INSERT INTO schema_version (version, applied_at) VALUES ({SCHEMA_VERSION + 1}, '2030-01-01')"))
+            state = bootstrap_schema(app, self.engine)
+            self.assertIn('newer than this code', state['error'])
+            self.assertEqual(app.test_client().get('/login').status_code, 503)
+            # A migration that fails rolls back and leaves the old schema
+            with self.engine.begin() as conn:
+                conn.execute(text('DELETE FROM schema_version'))
+                conn.execute(text(f"INSERT INTO schema_version (version, applied_at) VALUES ({SCHEMA_VERSION - 1}, '2026-01-01')"))
+            with mock.patch.object(schema, 'MIGRATIONS', MIGRATIONS[:-1] + [(SCHEMA_VERSION, 'Broken', broken)]):
+                state = bootstrap_schema(app, self.engine)
+            self.assertEqual(state['error'], 'migration failed')
+            with self.engine.connect() as conn:
+                self.assertEqual(current_version(conn), SCHEMA_VERSION - 1)
+            resp = app.test_client().get('/login')
+            self.assertEqual(resp.status_code, 503)
+            self.assertIn(b'migration failed', resp.data)
+            # Once SCHEMA_RECHECK_SECONDS have passed the next request checks again (the app's own database)
+            state['checked_at'] -= app.config['SCHEMA_RECHECK_SECONDS']
+            self.assertEqual(app.test_client().get('/login').status_code, 200)
+        finally:
+            app.extensions['schema'] = saved
+
+if __name__ == '__main__':
+    unittest.main()
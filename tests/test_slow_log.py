@@ -0,0 +1,122 @@
+import unittest
+import sys
+import os
+import json
+import tempfile
+import werkzeug
+from unittest import mock
+
+if not hasattr(werkzeug, "__version__"):
+    werkzeug.__version__ = "3.0.0"
+
+os.environ['FLASK_ENV'] = 'testing'
+# Use TEST_DATABASE_URL from environment if available, otherwise default to sqlite memory for speed
+if 'TEST_DATABASE_URL' not in os.environ:
+    os.environ['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from project import app, db, slow_log
+from project.models import Student
+
+class SlowLogTests(unittest.TestCase):
+    def setUp(self):
+        self.app = app
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        fd, self.path = tempfile.mkstemp(suffix='.jsonl')
+        os.close(fd)
+        self.saved = {k: self.app.config[k] for k in ('SLOW_LOG_PATH', 'SLOW_REQUEST_MS', 'SLOW_QUERY_MS',
+                                                  'SLOW_LOG_EXPLAIN_ANALYZE')}
+        self.app.config.update(SLOW_LOG_PATH=self.path, SLOW_REQUEST_MS=0, SLOW_QUERY_MS=0)
+        db.session.add(Student(name='Ann', email='ann@school.edu', phone='1234567'))
+        db.session.commit()
+        with self.client.session_transaction() as sess:
+            sess['logged_in'] = True
+            sess['user'] = 'admin'
+            sess['role'] = 'admin'
+
+    def tearDown(self):
+        self.app.config.update(self.saved)
+        os.remove(self.path)
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def _records(self, kind):
+        with open(self.path, encoding='utf-8') as f:
+            return [r for r in map(json.loads, f) if r['type'] == kind]
+
+    def test_slow_request(self):
+        self.app.config['SLOW_REQUEST_MS'] = 0.001
+        self.assertEqual(self.client.get('/students?page=1').status_code, 200)
+        [rec] = self._records('request')
+        self.assertEqual((rec['endpoint'], rec['path'], rec['status']), ('students', '/students?page=1', 200))
+        self.assertEqual(rec['query_count'], len(rec['statements']))
+        self.assertTrue(any('FROM student' in s['sql'] for s in rec['statements']))
+
+    def test_slow_query_plan_inline(self):
+        self.app.config['SLOW_QUERY_MS'] = 0.001
+        Student.query.filter_by(email='ann@school.edu').all()
+        db.session.add(Student(name='Bob', email='bob@school.edu', phone='1234567'))
+        db.session.commit()
+        self.app.config['SLOW_QUERY_MS'] = 0
+        records = self._records('query')
+        select = next(r for r in records if r['statement'].startswith('SELECT') and 'student.email' in r['statement'])
+        self.assertIn('sqlite_autoindex_student', ' '.join(select['plan']))
+        insert = next(r for r in records if r['statement'].startswith('INSERT'))
+        self.assertNotIn('plan', insert)
+        self.assertNotIn('ann@school.edu', open(self.path, encoding='utf-8').read())
+
+    def test_slow_query_plan_in_background(self):
+        fd, db_path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        engine = create_engine(f'sqlite:///{db_path}')
+        try:
+            with engine.begin() as conn:
+                conn.execute(text('CREATE TABLE t (id INTEGER PRIMARY KEY, v INTEGER)'))
+            self.app.config['SLOW_QUERY_MS'] = 0.001
+            with engine.connect() as conn:
+                conn.execute(text('SELECT v FROM t WHERE id = :id'), {'id': 1}).all()
+            self.app.config['SLOW_QUERY_MS'] = 0
+            slow_log._get_executor().submit(lambda: None).result()
+            [rec] = [r for r in self._records('query') if 'FROM t' in r['statement']]
+            self.assertIn('USING INTEGER PRIMARY KEY', ' '.join(rec['plan']))
+        finally:
+            engine.dispose()
+            os.remove(db_path)
+
+    def test_failed_statement_leaves_no_timer(self):
+        self.app.config['SLOW_QUERY_MS'] = 10000
+        with self.assertRaises(OperationalError):
+            db.session.execute(text('SELECT * FROM no_such_table'))
+        db.session.rollback()
+        self.assertFalse(db.session.connection().info.get('slow_log_start'))
+        self.assertEqual(self._records('query'), [])
+
+    def test_analyze_only_plain_selects(self):
+        self.app.config['SLOW_LOG_EXPLAIN_ANALYZE'] = True
+        conn = mock.Mock()
+        conn.dialect.name = 'postgresql'
+        conn.exec_driver_sql.return_value = [('Seq Scan',)]
+        for statement in ('SELECT * FROM student', 'WITH gone AS (DELETE FROM student RETURNING id) SELECT * FROM gone'):
+            self.assertEqual(slow_log.explain(conn, statement, {}), ['Seq Scan'])
+        self.assertEqual([c.args[0].split(' (')[0] for c in conn.exec_driver_sql.call_args_list],
+                         ['EXPLAIN ANALYZE SELECT * FROM student', 'EXPLAIN WITH gone AS'])
+
+    def test_report(self):
+        self.app.config['SLOW_REQUEST_MS'] = 0.001
+        self.client.get('/students')
+        self.client.get('/students')
+        result = self.app.test_cli_runner().invoke(args=['slow-log-report', '--path', self.path])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn('2 x', result.output)
+        self.assertIn('students', result.output)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import unittest
+import sys
+import os
+import threading
+import werkzeug
+
+if not hasattr(werkzeug, "__version__"):
+    werkzeug.__version__ = "3.0.0"
+
+os.environ['FLASK_ENV'] = 'testing'
+# Use TEST_DATABASE_URL from environment if available, otherwise default to sqlite memory for speed
+if 'TEST_DATABASE_URL' not in os.environ:
+    os.environ['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from project import app, db, snapshots
+from project.models import Invoice, Student
+
+class Counter:
+    """compute() stand-in: counts calls and can be held until released."""
+
+    def __init__(self):
+        self.calls = 0
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self):
+        self.calls += 1
+        self.release.wait(5)
+        return self.calls
+
+class SnapshotTests(unittest.TestCase):
+    def setUp(self):
+        self.ctx = app.app_context()
+        self.ctx.push()
+        db.create_all()
+        snapshots.clear()
+        app.config['JOBS_RUN_INLINE'] = False
+
+    def tearDown(self):
+        app.config['JOBS_RUN_INLINE'] = True
+        snapshots.clear()
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_fresh_snapshot_reused(self):
+        compute = Counter()
+        self.assertEqual(snapshots.get_snapshot('k', compute, ttl=60), 1)
+        self.assertEqual(snapshots.get_snapshot('k', compute, ttl=60), 1)
+        self.assertEqual(snapshots.get_snapshot('k', compute, ttl=0), 2)
+
+    def test_cold_key_computed_once_for_concurrent_readers(self):
+        compute = Counter()
+        compute.release.clear()
+        results = []
+        readers = [threading.Thread(target=lambda: results.append(snapshots.get_snapshot('k', compute, ttl=60)))
+                   for _ in range(5)]
+        for t in readers:
+            t.start()
+        compute.release.set()
+        for t in readers:
+            t.join(5)
+        self.assertEqual(results, [1] * 5)
+        self.assertEqual(compute.calls, 1)
+
+    def test_stale_served_while_one_refresh_runs(self):
+        compute = Counter()
+        snapshots.get_snapshot('k', compute, depends_on=('student',), ttl=60)
+        snapshots.invalidate('invoice')
+        self.assertEqual(snapshots.get_snapshot('k', compute, ttl=60), 1)
+        compute.release.clear()
+        snapshots.invalidate('student')
+        # Every reader gets the old payload; only one refresh is started
+        self.assertEqual([snapshots.get_snapshot('k', compute, ttl=60) for _ in range(3)], [1, 1, 1])
+        compute.release.set()
+        snapshots._get_executor().submit(lambda: None).result()
+        self.assertEqual(compute.calls, 2)
+        self.assertEqual(snapshots.get_snapshot('k', compute, ttl=60), 2)
+
+    def test_too_stale_waits_for_refresh(self):
+        compute = Counter()
+        snapshots.get_snapshot('k', compute, ttl=60)
+        snapshots.invalidate()
+        self.assertEqual(snapshots.get_snapshot('k', compute, ttl=60, max_stale=-60), 2)
+
+    def test_committed_writes_invalidate(self):
+        compute = Counter()
+        app.config['JOBS_RUN_INLINE'] = True
+        snapshots.get_snapshot('k', compute, depends_on=('student',), ttl=60)
+        db.session.add(Invoice(student_id=1, amount_due=10.0))
+        db.session.commit()
+        self.assertEqual(snapshots.get_snapshot('k', compute, ttl=60), 1)
+        db.session.add(Student(name='Ann', email='ann@school.edu', phone='1234567'))
+        db.session.flush()
+        db.session.rollback()
+        self.assertEqual(snapshots.get_snapshot('k', compute, ttl=60), 1)
+        with db.engine.begin() as conn:
+            conn.execute(Student.__table__.insert(), {'name': 'Ann', 'email': 'ann@school.edu', 'phone': '1234567'})
+        self.assertEqual(snapshots.get_snapshot('k', compute, ttl=60), 2)
+
+if __name__ == '__main__':
+    unittest.main()
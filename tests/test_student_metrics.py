@@ -0,0 +1,125 @@
+import unittest
+import sys
+import os
+import werkzeug
+from datetime import date
+
+if not hasattr(werkzeug, "__version__"):
+    werkzeug.__version__ = "3.0.0"
+
+os.environ['FLASK_ENV'] = 'testing'
+# Use TEST_DATABASE_URL from environment if available, otherwise default to sqlite memory for speed
+if 'TEST_DATABASE_URL' not in os.environ:
+    os.environ['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from project import app, db
+from project.models import Student, Course, CourseSession, Attendance, Grade, Invoice, FeePayment, StudentMetrics
+from project.student_metrics import check_student_metrics, rebuild_student_metrics, metrics_for_student
+
+class StudentMetricsTests(unittest.TestCase):
+    def setUp(self):
+        self.app = app
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        self.course = Course(name='Algorithms', credits=4)
+        self.student = Student(name='Ann', email='ann@x.edu', phone='1234567')
+        db.session.add_all([self.course, self.student])
+        db.session.flush()
+        self.sessions = [CourseSession(course_id=self.course.id, session_date=date(2026, 1, d)) for d in (5, 6)]
+        db.session.add_all(self.sessions)
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def _row(self):
+        db.session.expire_all()
+        return StudentMetrics.query.filter_by(student_id=self.student.id).one()
+
+    def test_grade_changes_update_gpa(self):
+        g = Grade(student_id=self.student.id, course_id=self.course.id, letter='B')
+        db.session.add(g)
+        db.session.commit()
+        self.assertAlmostEqual(self._row().gpa, 3.0)
+        g.points = 3.5
+        db.session.commit()
+        self.assertAlmostEqual(self._row().gpa, 3.5)
+        db.session.delete(g)
+        db.session.commit()
+        self.assertIsNone(self._row().gpa)
+
+    def test_course_credit_change_reweights(self):
+        other = Course(name='Seminar', credits=1)
+        db.session.add(other)
+        db.session.flush()
+        db.session.add_all([
+            Grade(student_id=self.student.id, course_id=self.course.id, letter='A'),
+            Grade(student_id=self.student.id, course_id=other.id, letter='C'),
+        ])
+        db.session.commit()
+        self.assertAlmostEqual(self._row().gpa, (4.0 * 4 + 2.0) / 5)
+        other.credits = 4
+        db.session.commit()
+        self.assertAlmostEqual(self._row().gpa, 3.0)
+
+    def test_attendance_and_fees(self):
+        db.session.add_all([
+            Attendance(session_id=self.sessions[0].id, student_id=self.student.id, status='present'),
+            Attendance(session_id=self.sessions[1].id, student_id=self.student.id, status='absent'),
+            Invoice(student_id=self.student.id, amount_due=100.0),
+            FeePayment(student_id=self.student.id, amount=30.0),
+        ])
+        db.session.commit()
+        row = self._row()
+        self.assertAlmostEqual(row.attendance_rate, 50.0)
+        self.assertEqual(row.attendance_counts['absent'], 1)
+        self.assertAlmostEqual(row.outstanding, 70.0)
+
+    def test_dropped_course_attendance_still_counts(self):
+        self.student.courses.append(self.course)
+        db.session.add_all([
+            Attendance(session_id=self.sessions[0].id, student_id=self.student.id, status='present'),
+            Attendance(session_id=self.sessions[1].id, student_id=self.student.id, status='absent'),
+        ])
+        db.session.commit()
+        self.student.courses.remove(self.course)
+        db.session.commit()
+        self.assertEqual(self._row().attendance_total, 2)
+        self.assertAlmostEqual(metrics_for_student(self.student.id).attendance_rate, 50.0)
+
+    def test_delete_session_route_refreshes(self):
+        db.session.add(Attendance(session_id=self.sessions[0].id, student_id=self.student.id, status='present'))
+        db.session.commit()
+        self.assertEqual(self._row().attendance_total, 1)
+        with self.client.session_transaction() as sess:
+            sess['logged_in'] = True
+            sess['user'] = 'admin'
+            sess['role'] = 'admin'
+        self.client.post(f'/sessions/{self.sessions[0].id}/delete')
+        self.assertEqual(self._row().attendance_total, 0)
+
+    def test_rebuild_and_check(self):
+        db.session.add(Grade(student_id=self.student.id, course_id=self.course.id, letter='A'))
+        db.session.commit()
+        db.session.query(StudentMetrics).delete()
+        db.session.commit()
+        self.assertEqual(check_student_metrics(), [self.student.id])
+        # Missing rows are computed on the fly rather than read as zeros
+        self.assertAlmostEqual(metrics_for_student(self.student.id).gpa, 4.0)
+        self.assertEqual(rebuild_student_metrics(), 1)
+        self.assertEqual(check_student_metrics(), [])
+
+    def test_rebuild_cli(self):
+        result = self.app.test_cli_runner().invoke(args=['rebuild-metrics', '--check'])
+        self.assertEqual(result.exit_code, 0, result.output)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import unittest
+import sys
+import os
+import werkzeug
+
+if not hasattr(werkzeug, "__version__"):
+    werkzeug.__version__ = "3.0.0"
+
+os.environ['FLASK_ENV'] = 'testing'
+# Use TEST_DATABASE_URL from environment if available, otherwise default to sqlite memory for speed
+if 'TEST_DATABASE_URL' not in os.environ:
+    os.environ['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from prometheus_client import REGISTRY
+from project import app, db
+from project.models import Student
+from project.jobs import JOB_HANDLERS, submit_job
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+class TelemetryTests(unittest.TestCase):
+    def setUp(self):
+        self.app = app
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        db.session.add_all(Student(name=f'S{i}', email=f's{i}@school.edu', phone='1234567') for i in range(3))
+        db.session.commit()
+        with self.client.session_transaction() as sess:
+            sess['logged_in'] = True
+            sess['user'] = 'admin'
+            sess['role'] = 'admin'
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_request_and_sql_metrics(self):
+        labels = {'endpoint': 'students', 'method': 'GET'}
+        before = sample('http_requests_total', status='200', **labels)
+        statements = sample('db_statements_total', endpoint='students')
+        self.assertEqual(self.client.get('/students').status_code, 200)
+        self.assertEqual(sample('http_requests_total', status='200', **labels), before + 1)
+        self.assertGreater(sample('db_statements_total', endpoint='students'), statements)
+        self.assertGreaterEqual(sample('http_request_duration_seconds_count', **labels), 1)
+        self.client.get('/no/such/page')
+        self.assertGreaterEqual(sample('http_requests_total', endpoint='unmatched', method='GET', status='404'), 1)
+
+    def test_metrics_endpoint(self):
+        self.client.get('/students')
+        resp = self.client.get('/metrics')
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.content_type.startswith('text/plain'))
+        body = resp.get_data(as_text=True)
+        self.assertIn('http_requests_total{endpoint="students",method="GET",status="200"}', body)
+        self.assertIn('db_pool_checkout_seconds_bucket', body)
+
+    def test_metrics_token(self):
+        self.app.config['METRICS_TOKEN'] = 'scrape-me'
+        try:
+            self.assertEqual(self.client.get('/metrics').status_code, 401)
+            resp = self.client.get('/metrics', headers={'Authorization': 'Bearer scrape-me'})
+            self.assertEqual(resp.status_code, 200)
+        finally:
+            self.app.config['METRICS_TOKEN'] = None
+
+    def test_notification_fan_out(self):
+        before = sample('notifications_queued_total', recipient_type='student', source='admin')
+        resp = self.client.post('/admin/notifications', data={
+            'recipient_type': 'student', 'recipient_id': 'all', 'title': 'Hi', 'message': 'Hello'})
+        self.assertEqual(resp.status_code, 302)
+        self.assertEqual(sample('notifications_queued_total', recipient_type='student', source='admin'), before + 3)
+
+    def test_job_outcomes(self):
+        JOB_HANDLERS['telemetry_test'] = lambda progress, params: {'ok': True}
+        try:
+            before = sample('background_jobs_total', kind='telemetry_test', status='done')
+            submit_job('telemetry_test', {})
+        finally:
+            del JOB_HANDLERS['telemetry_test']
+        self.assertEqual(sample('background_jobs_total', kind='telemetry_test', status='done'), before + 1)
+        self.assertEqual(sample('background_job_duration_seconds_count', kind='telemetry_test'), 1)
+
+if __name__ == '__main__':
+    unittest.main()